@@ -0,0 +1,166 @@
+# benchmarks/aktionen_parser.py
+"""
+Durchsatz beim Zerlegen der Aktionszeilen des Spielprotokolls (Zeilen pro Sekunde).
+
+Vergleicht die früheren Funktionen (unkompilierte Muster, Teamnamen pro Zeile neu aufbereitet)
+mit main.AktionsParser und prüft, dass beide für jede Zeile dasselbe Ergebnis liefern.
+Der Korpus stammt aus den Protokollseiten echter Spielberichte (--pdf-dir) oder aus einer
+Textdatei mit einer Zeile "heim<TAB>gast<TAB>aktion" pro Aktion (--korpus).
+
+    python benchmarks/aktionen_parser.py --pdf-dir pfad/zu/pdfs --wiederholungen 20
+"""
+import argparse
+import glob
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import pdfplumber
+import main
+
+def alt_find_best_team_match(name_from_action, full_heim_name, full_gast_name):
+    """Frühere Fassung von main.find_best_team_match (Referenz für Ergebnis und Laufzeit)."""
+    if not name_from_action:
+        return None
+
+    name_action_lower = name_from_action.lower()
+    heim_lower = full_heim_name.lower()
+    gast_lower = full_gast_name.lower()
+
+    if name_action_lower == heim_lower or name_action_lower in heim_lower:
+        return full_heim_name
+    if name_action_lower == gast_lower or name_action_lower in gast_lower:
+        return full_gast_name
+
+    words_action = set(name_action_lower.split())
+    words_heim = set(heim_lower.split())
+    words_gast = set(gast_lower.split())
+
+    score_heim = len(words_action.intersection(words_heim))
+    score_gast = len(words_action.intersection(words_gast))
+
+    if score_heim > score_gast:
+        return full_heim_name
+    if score_gast > score_heim:
+        return full_gast_name
+
+    return None
+
+def alt_parse_aktion(aktion_string):
+    """Frühere Fassung von main.parse_aktion (Referenz für Ergebnis und Laufzeit)."""
+    parsed_data = {"aktionstyp": None, "spieler_name": None, "trikotnummer": None, "mannschaftsname": None}
+    if not aktion_string:
+        return parsed_data
+
+    aktion_string = aktion_string.strip()
+
+    paren_match = re.search(r'\((\d{1,2}),\s*(.*?)\)$', aktion_string)
+    if paren_match:
+        parsed_data["trikotnummer"] = paren_match.group(1)
+        parsed_data["mannschaftsname"] = paren_match.group(2).strip()
+        main_action_part = aktion_string[:paren_match.start()].strip()
+
+        for sep in [" durch ", " für ", " von "]:
+            if sep in main_action_part:
+                parts = main_action_part.split(sep, 1)
+                parsed_data["aktionstyp"] = parts[0].strip()
+                parsed_data["spieler_name"] = parts[1].strip()
+                return parsed_data
+
+        parsed_data["aktionstyp"] = main_action_part
+        return parsed_data
+
+    for sep in [" durch ", " für ", " von "]:
+        if sep in aktion_string:
+            parts = aktion_string.split(sep, 1)
+            parsed_data["aktionstyp"] = parts[0].strip()
+            rest_string = parts[1].strip()
+
+            spieler_match = re.search(r'Spieler\s*(\d{1,2}),\s*(.*)', rest_string)
+            if spieler_match:
+                parsed_data["trikotnummer"] = spieler_match.group(1)
+                parsed_data["mannschaftsname"] = spieler_match.group(2).strip()
+                parsed_data["spieler_name"] = f"Spieler {parsed_data['trikotnummer']}"
+
+            return parsed_data
+
+    parts = aktion_string.split(' ', 1)
+    parsed_data["aktionstyp"] = parts[0]
+    if len(parts) > 1:
+        parsed_data["mannschaftsname"] = parts[1].strip()
+    return parsed_data
+
+def korpus_aus_pdfs(pdf_dir):
+    """Liest pro Spielbericht (heim, gast, [aktionszeilen]) aus den Protokollseiten."""
+    spiele = []
+    for path in sorted(glob.glob(os.path.join(pdf_dir, '*.pdf'))):
+        info = main.parse_pdf_data(path)["spiel_info"]
+        zeilen = []
+        with pdfplumber.open(path) as pdf:
+            for page in pdf.pages[2:]:
+                for table in page.extract_tables():
+                    zeilen.extend(row[3] for row in table if row and len(row) >= 4 and row[3])
+        spiele.append((info["heimmannschaft"], info["gastmannschaft"], zeilen))
+    return spiele
+
+def korpus_aus_datei(path):
+    """Liest Zeilen "heim<TAB>gast<TAB>aktion" und gruppiert sie nach Spielpaarung."""
+    spiele = {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            heim, gast, aktion = line.rstrip('\n').split('\t', 2)
+            spiele.setdefault((heim, gast), []).append(aktion)
+    return [(heim, gast, zeilen) for (heim, gast), zeilen in spiele.items()]
+
+def lauf_alt(spiele):
+    return [[(parsed := alt_parse_aktion(zeile), alt_find_best_team_match(parsed["mannschaftsname"], heim, gast)) for zeile in zeilen]
+            for heim, gast, zeilen in spiele]
+
+def lauf_neu(spiele):
+    ergebnis = []
+    for heim, gast, zeilen in spiele:
+        aktions_parser = main.AktionsParser(heim, gast)
+        ergebnis.append([aktions_parser.parse_zeile(zeile) for zeile in zeilen])
+    return ergebnis
+
+def messen(lauf, spiele, wiederholungen):
+    """Bestes Ergebnis aus mehreren Durchläufen in Zeilen pro Sekunde."""
+    zeilen = sum(len(z) for _, _, z in spiele)
+    beste = min(_dauer(lauf, spiele) for _ in range(wiederholungen))
+    return zeilen / beste if beste else float('inf')
+
+def _dauer(lauf, spiele):
+    start = time.perf_counter()
+    lauf(spiele)
+    return time.perf_counter() - start
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    quelle = parser.add_mutually_exclusive_group(required=True)
+    quelle.add_argument('--pdf-dir', help='Verzeichnis mit Spielbericht-PDFs')
+    quelle.add_argument('--korpus', help='Textdatei mit heim<TAB>gast<TAB>aktion pro Zeile')
+    parser.add_argument('--wiederholungen', type=int, default=10)
+    parser.add_argument('--vervielfachen', type=int, default=1, help='Korpus n-mal aneinanderhängen')
+    args = parser.parse_args()
+
+    spiele = korpus_aus_pdfs(args.pdf_dir) if args.pdf_dir else korpus_aus_datei(args.korpus)
+    spiele = spiele * args.vervielfachen
+    zeilen = sum(len(z) for _, _, z in spiele)
+    if not zeilen:
+        parser.error("Der Korpus enthält keine Aktionszeilen.")
+
+    if lauf_alt(spiele) != lauf_neu(spiele):
+        print("FEHLER: AktionsParser liefert andere Ergebnisse als die bisherigen Funktionen.")
+        raise SystemExit(1)
+
+    alt = messen(lauf_alt, spiele, args.wiederholungen)
+    neu = messen(lauf_neu, spiele, args.wiederholungen)
+    print(f"{zeilen} Aktionszeilen aus {len(spiele)} Spielen, Ergebnisse identisch.")
+    print(f"  bisher:         {alt:12,.0f} Zeilen/s")
+    print(f"  AktionsParser:  {neu:12,.0f} Zeilen/s  ({neu / alt:.2f}x)")
+
+if __name__ == '__main__':
+    main_cli()
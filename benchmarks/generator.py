@@ -0,0 +1,219 @@
+# benchmarks/generator.py
+"""
+Erzeugt synthetische Spielberichte in der Form, die main.parse_pdf_data liefert.
+
+Eine Saison besteht aus mehreren Spielklassen mit je 12 Mannschaften; jede Mannschaft hat einen
+festen Kader, aus dem pro Spiel 14 Spieler antreten. Das Protokoll enthält Tore, 7m, Verwarnungen,
+Zeitstrafen und Auszeiten; Torschützen, 7m-Werte und Endstand passen zum Protokoll.
+
+Mit reportlab (optional) lassen sich die Berichte zusätzlich als PDF im Layout erzeugen, das der
+Parser erwartet; parse_pdf_data liefert für diese PDFs wieder genau das erzeugte Dictionary.
+"""
+import random
+from datetime import date, timedelta
+
+PRAEFIXE = ["TSV", "HSG", "SG", "TV", "HC", "SV", "TuS", "VfL"]
+SILBEN = ["Al", "Bern", "Dorn", "Eich", "Fal", "Gold", "Hart", "Ilm", "Kirch", "Lin", "Mar", "Neu", "Ober", "Ros", "Stein", "Wald"]
+ENDUNGEN = ["bach", "berg", "dorf", "feld", "hausen", "heim", "stadt", "tal"]
+VORNAMEN = ["Jonas", "Lukas", "Finn", "Paul", "Leon", "Noah", "Elias", "Ben", "Tim", "Jan", "Nico", "Max", "Till", "Ole", "Jakob", "Moritz"]
+NACHNAMEN = ["Müller", "Schmidt", "Schneider", "Fischer", "Weber", "Meyer", "Wagner", "Becker", "Schulz", "Hoffmann", "Koch", "Richter", "Klein", "Wolf", "Krüger", "Jäger"]
+LIGEN = ["Oberliga", "Landesliga", "Bezirksoberliga", "Bezirksliga", "Bezirksklasse", "Kreisliga"]
+KLASSEN = [("Männer", "M"), ("Frauen", "F"), ("männliche A-Jugend", "mA"), ("weibliche A-Jugend", "wA")]
+
+MANNSCHAFTEN_PRO_KLASSE = 12
+KADERGROESSE = 18
+SPIELER_PRO_SPIEL = 14
+
+def _orte():
+    """Eindeutige Ortsnamen, damit Kurzformen im Protokoll immer genau einem Team zuzuordnen sind."""
+    for endung in ENDUNGEN:
+        for erste in SILBEN:
+            for zweite in SILBEN:
+                if erste != zweite:
+                    yield f"{erste}{zweite.lower()}{endung}"
+
+class Saison:
+    """Spielklassen, Mannschaften und Kader, aus denen die Spielberichte gezogen werden."""
+
+    def __init__(self, anzahl_spiele, seed=0):
+        self.rnd = random.Random(seed)
+        # Doppelrunde: jede Klasse hat n * (n - 1) Spiele
+        spiele_pro_klasse = MANNSCHAFTEN_PRO_KLASSE * (MANNSCHAFTEN_PRO_KLASSE - 1)
+        anzahl_klassen = max(1, -(-anzahl_spiele // spiele_pro_klasse))
+
+        orte = _orte()
+        self.spielklassen = []
+        for i in range(anzahl_klassen):
+            liga = LIGEN[i % len(LIGEN)]
+            klasse, kuerzel = KLASSEN[(i // len(LIGEN)) % len(KLASSEN)]
+            staffel = i // (len(LIGEN) * len(KLASSEN)) + 1
+            name = f"{liga} {klasse} Staffel {staffel} ({liga[:3].upper()}-{kuerzel}-{staffel})"
+            teams = [f"{self.rnd.choice(PRAEFIXE)} {next(orte)}" for _ in range(MANNSCHAFTEN_PRO_KLASSE)]
+            self.spielklassen.append((name, teams))
+
+        self.kader = {}
+        for _, teams in self.spielklassen:
+            for team in teams:
+                nummern = self.rnd.sample(range(1, 100), KADERGROESSE)
+                self.kader[team] = [(str(nr), self._spielername(), str(self.rnd.randint(1985, 2006))) for nr in nummern]
+
+    def _spielername(self):
+        if self.rnd.random() < 0.05:
+            return "N.N."
+        return f"{self.rnd.choice(VORNAMEN)} {self.rnd.choice(NACHNAMEN)}"
+
+    def paarungen(self):
+        """Alle Paarungen (spielklasse, heim, gast) der Saison, Klasse für Klasse."""
+        for spielklasse, teams in self.spielklassen:
+            for heim in teams:
+                for gast in teams:
+                    if heim != gast:
+                        yield spielklasse, heim, gast
+
+def erzeuge_spielberichte(anzahl_spiele, seed=0, erste_spielnummer=100000):
+    """Liefert anzahl_spiele synthetische Spielberichte im Format von main.parse_pdf_data."""
+    saison = Saison(anzahl_spiele, seed)
+    rnd = random.Random(seed + 1)
+    saisonstart = date(2024, 9, 7)
+    for index, (spielklasse, heim, gast) in enumerate(saison.paarungen()):
+        if index >= anzahl_spiele:
+            return
+        spieldatum = saisonstart + timedelta(days=7 * rnd.randint(0, 30) + rnd.choice([0, 1]))
+        yield erzeuge_spielbericht(str(erste_spielnummer + index), spielklasse, spieldatum, heim, gast,
+                                   saison.kader[heim], saison.kader[gast], rnd)
+
+def _zeit(sekunden):
+    return f"{sekunden // 60:02d}:{sekunden % 60:02d}"
+
+def _spieler(nr, name, jahrgang):
+    return {"trikotnummer": nr, "name": name, "jahrgang": jahrgang, "tore": 0,
+            "sieben_meter_tore": None, "sieben_meter_versuche": None,
+            "verwarnung": "", "hinausstellung_1": "", "hinausstellung_2": "",
+            "hinausstellung_3": "", "disqualifikation": "", "aktionen": []}
+
+def erzeuge_spielbericht(spielnummer, spielklasse, spieldatum, heim, gast, kader_heim, kader_gast, rnd):
+    """Ein Spielbericht mit zum Protokoll passenden Kaderwerten und Endstand."""
+    spieler = {
+        "heim": [_spieler(*eintrag) for eintrag in sorted(rnd.sample(kader_heim, SPIELER_PRO_SPIEL), key=lambda e: int(e[0]))],
+        "gast": [_spieler(*eintrag) for eintrag in sorted(rnd.sample(kader_gast, SPIELER_PRO_SPIEL), key=lambda e: int(e[0]))],
+    }
+    mannschaft = {"heim": heim, "gast": gast}
+    aktionen = {"heim": [], "gast": []}
+    protokoll = []
+    tore = {"heim": 0, "gast": 0}
+    halbzeitstand = None
+    sieben_meter = {}
+    hinausstellungen = {}
+
+    sekunden = 0
+    while True:
+        sekunden += rnd.randint(20, 90)
+        if sekunden >= 3600:
+            break
+        if halbzeitstand is None and sekunden >= 1800:
+            halbzeitstand = f"{tore['heim']}:{tore['gast']}"
+        seite = rnd.choice(("heim", "gast"))
+        art = rnd.choices(["Tor", "7m-Tor", "7m, kein Tor", "Verwarnung", "2-min Strafe", "Auszeit"],
+                          weights=[70, 6, 3, 5, 6, 2])[0]
+        if art == "Auszeit":
+            if sum(1 for a in aktionen[seite] if a["aktion"] == "Auszeit") >= 3:
+                continue
+            stand = f"{tore['heim']}:{tore['gast']}"
+            event = _event(sekunden, art, stand, tore)
+            aktionen[seite].append(event)
+            # Kurzform wie im Protokoll: nur der Ortsname
+            protokoll.append((_zeit(sekunden), stand, f"Auszeit {mannschaft[seite].split(' ', 1)[1]}"))
+            continue
+
+        spieler_eintrag = rnd.choice(spieler[seite])
+        nr = spieler_eintrag["trikotnummer"]
+        if art in ("Tor", "7m-Tor"):
+            tore[seite] += 1
+            spieler_eintrag["tore"] += 1
+        if art in ("7m-Tor", "7m, kein Tor"):
+            versuche, treffer = sieben_meter.get(id(spieler_eintrag), (0, 0))
+            sieben_meter[id(spieler_eintrag)] = (versuche + 1, treffer + (art == "7m-Tor"))
+            spieler_eintrag["sieben_meter_versuche"], spieler_eintrag["sieben_meter_tore"] = sieben_meter[id(spieler_eintrag)]
+        if art == "Verwarnung":
+            if spieler_eintrag["verwarnung"]:
+                continue
+            spieler_eintrag["verwarnung"] = _zeit(sekunden)
+        if art == "2-min Strafe":
+            anzahl = hinausstellungen.get(id(spieler_eintrag), 0)
+            if anzahl == 3:
+                continue
+            hinausstellungen[id(spieler_eintrag)] = anzahl + 1
+            spieler_eintrag[f"hinausstellung_{anzahl + 1}"] = _zeit(sekunden)
+
+        stand = f"{tore['heim']}:{tore['gast']}"
+        spieler_eintrag["aktionen"].append(_event(sekunden, art, stand, tore))
+        if spieler_eintrag["name"] == "N.N." or rnd.random() < 0.1:
+            text = f"{art} durch Spieler {nr}, {mannschaft[seite]}"
+        else:
+            text = f"{art} durch {spieler_eintrag['name']} ({nr}, {mannschaft[seite]})"
+        protokoll.append((_zeit(sekunden), stand, text))
+
+    endstand = f"{tore['heim']}:{tore['gast']}"
+    data = {
+        "spiel_info": {"spielklasse": spielklasse, "spielnummer": spielnummer, "spieldatum": spieldatum.isoformat(),
+                       "heimmannschaft": heim, "gastmannschaft": gast, "endstand": endstand,
+                       "halbzeitstand": halbzeitstand or endstand, "tore_heim": tore["heim"], "tore_gast": tore["gast"]},
+        "spieler_heim": spieler["heim"], "spieler_gast": spieler["gast"],
+        "aktionen_heim": aktionen["heim"], "aktionen_gast": aktionen["gast"],
+    }
+    # Nur für die PDF-Erzeugung; parse_pdf_data liefert diesen Schlüssel nicht
+    data["_protokoll"] = protokoll
+    return data
+
+def _event(sekunden, art, stand, tore):
+    return {"spielzeit": _zeit(sekunden), "aktion": art, "spielstand": stand,
+            "spielzeit_sekunden": sekunden, "tore_heim": tore["heim"], "tore_gast": tore["gast"]}
+
+def ohne_protokoll(data):
+    """Spielbericht ohne den internen Protokollschlüssel, also genau in der Form des Parsers."""
+    return {key: value for key, value in data.items() if key != "_protokoll"}
+
+def schreibe_pdf(data, path):
+    """Erzeugt einen Spielbericht als PDF im Layout, das main.parse_pdf_data erwartet (benötigt reportlab)."""
+    try:
+        from reportlab.lib import colors
+        from reportlab.lib.pagesizes import A4
+        from reportlab.lib.styles import getSampleStyleSheet
+        from reportlab.platypus import PageBreak, Paragraph, SimpleDocTemplate, Table, TableStyle
+    except ImportError:
+        raise RuntimeError("Für die PDF-Erzeugung wird reportlab benötigt (pip install reportlab).") from None
+
+    info = data["spiel_info"]
+    style = getSampleStyleSheet()["Normal"]
+    grid = TableStyle([("GRID", (0, 0), (-1, -1), 0.5, colors.black), ("FONTSIZE", (0, 0), (-1, -1), 7),
+                       ("TOPPADDING", (0, 0), (-1, -1), 1), ("BOTTOMPADDING", (0, 0), (-1, -1), 1)])
+
+    def tabelle(rows, **kwargs):
+        table = Table(rows, **kwargs)
+        table.setStyle(grid)
+        return table
+
+    def kader(spieler):
+        rows = [["Nr", "Name", "Jg", "", "", "Tore", "7m", "V", "H1", "H2", "H3", "D"]]
+        for s in spieler:
+            sieben_meter = f"{s['sieben_meter_versuche']}/{s['sieben_meter_tore']}" if s["sieben_meter_versuche"] else ""
+            rows.append([s["trikotnummer"], s["name"], s["jahrgang"], "", "", str(s["tore"]), sieben_meter,
+                         s["verwarnung"], s["hinausstellung_1"], s["hinausstellung_2"], s["hinausstellung_3"], s["disqualifikation"]])
+        return tabelle(rows)
+
+    spieldatum = date.fromisoformat(info["spieldatum"]).strftime("%d.%m.%Y")
+    elemente = [
+        tabelle([["Spiel/Datum", f"{info['spielnummer']}, Sa am {spieldatum} um 18:00 Uhr"], ["Halle", "Sporthalle"]]),
+        Paragraph("Heimmannschaft", style), kader(data["spieler_heim"]),
+        Paragraph("Gastmannschaft", style), kader(data["spieler_gast"]),
+        PageBreak(),
+        # Der Text der ersten beiden Seiten wird ohne Zeilenumbruch aneinandergehängt, daher ein Füllabsatz
+        Paragraph("Spielinformationen", style),
+        Paragraph(f"Spielklasse: {info['spielklasse']}", style),
+        Paragraph(f"Heim: {info['heimmannschaft']}", style),
+        Paragraph(f"Gast: {info['gastmannschaft']}", style),
+        Paragraph(f"Endstand {info['endstand']} ({info['halbzeitstand']})", style),
+        PageBreak(),
+        tabelle([["Nr", "Zeit", "Stand", "Aktion"]] + [[str(i + 1), *zeile] for i, zeile in enumerate(data["_protokoll"])], repeatRows=1),
+    ]
+    SimpleDocTemplate(path, pagesize=A4).build(elemente)
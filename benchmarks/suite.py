@@ -0,0 +1,236 @@
+# benchmarks/suite.py
+"""
+Benchmark-Suite für Parser, Import und die lesenden Abfragen der Views.
+
+Für jede Größe (Anzahl Spiele) wird eine frische Datenbank mit synthetischen Spielberichten
+(benchmarks/generator.py) gefüllt und gemessen:
+
+    insert           gesammelter Import (database.insert_spielberichte_bulk)
+    detail           Detailseite eines Spiels (database.get_spiel_details)
+    team_statistik   Spielerstatistik, Bilanz und Spielverlauf eines Teams, ohne Lese-Cache
+    spielverlauf     Verlaufsauswertung (spielverlauf.py) über alle Spiele, ohne Cache
+    index            erste und fünfte Seite der Spielliste, mit und ohne Teamfilter, samt Anzahl
+
+Das Parsen wird unabhängig von der Größe an synthetischen PDFs gemessen (benötigt reportlab);
+dabei wird auch geprüft, dass parse_pdf_data genau die erzeugten Daten zurückliefert.
+
+Das Ergebnis wird als JSON geschrieben. Mit --vergleich wird es gegen einen früheren Lauf
+gestellt; Kennzahlen auf _ms sind Laufzeiten (kleiner ist besser), auf _pro_s Durchsätze.
+
+    python benchmarks/suite.py --groessen 100,10000 --ausgabe neu.json --vergleich alt.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from itertools import islice
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCHMARK_DIR, '..'))
+
+import database
+import generator
+import spielverlauf
+
+STANDARD_GROESSEN = (100, 10000, 100000)
+INSERT_BLOCK = 1000
+
+def _ms(func, wiederholungen):
+    """Median und Minimum der Laufzeit in Millisekunden."""
+    dauer = []
+    for _ in range(wiederholungen):
+        start = time.perf_counter()
+        func()
+        dauer.append((time.perf_counter() - start) * 1000)
+    return round(statistics.median(dauer), 3), round(min(dauer), 3)
+
+def _reihe(funcs, wiederholungen):
+    """Misst jede Funktion einer Stichprobe und fasst zu Median/Maximum zusammen."""
+    medianwerte = [_ms(func, wiederholungen)[0] for func in funcs]
+    return {"median_ms": round(statistics.median(medianwerte), 3), "max_ms": round(max(medianwerte), 3)}
+
+def messe_parse(anzahl, seed):
+    """Parst synthetische PDFs; None, wenn reportlab fehlt."""
+    import main
+    try:
+        import reportlab  # noqa: F401
+    except ImportError:
+        return None
+
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        paths = []
+        erwartet = []
+        for i, data in enumerate(generator.erzeuge_spielberichte(anzahl, seed=seed)):
+            path = os.path.join(tmp_dir, f"bericht_{i}.pdf")
+            generator.schreibe_pdf(data, path)
+            paths.append(path)
+            erwartet.append(generator.ohne_protokoll(data))
+
+        dauer, identisch = [], True
+        for path, data in zip(paths, erwartet):
+            start = time.perf_counter()
+            ergebnis = main.parse_pdf_data(path)
+            dauer.append((time.perf_counter() - start) * 1000)
+            identisch = identisch and ergebnis == data
+        return {"pdfs": anzahl, "median_ms": round(statistics.median(dauer), 3),
+                "pdfs_pro_s": round(anzahl / (sum(dauer) / 1000), 2), "identisch": identisch}
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+def messe_groesse(anzahl, seed, stichprobe, wiederholungen):
+    """Füllt eine frische Datenbank mit anzahl Spielen und misst Import und Abfragen."""
+    tmp_dir = tempfile.mkdtemp()
+    alter_db_name = database.DB_NAME
+    database.DB_NAME = os.path.join(tmp_dir, 'benchmark.db')
+    try:
+        database.init_db()
+        ergebnis = {"spiele": anzahl}
+
+        berichte = (generator.ohne_protokoll(data) for data in generator.erzeuge_spielberichte(anzahl, seed=seed))
+        insert_sekunden, zeilen = 0.0, 0
+        while True:
+            block = list(islice(berichte, INSERT_BLOCK))
+            if not block:
+                break
+            start = time.perf_counter()
+            zeilen += database.insert_spielberichte_bulk(block, chunk_size=INSERT_BLOCK)["zeilen"]
+            insert_sekunden += time.perf_counter() - start
+        ergebnis["insert"] = {"zeilen": zeilen, "dauer_ms": round(insert_sekunden * 1000, 1),
+                              "spiele_pro_s": round(anzahl / insert_sekunden, 1),
+                              "zeilen_pro_s": round(zeilen / insert_sekunden, 1)}
+        # Im WAL-Modus liegen noch nicht zurückgeschriebene Seiten in der -wal-Datei
+        groesse = sum(os.path.getsize(p) for p in (database.DB_NAME, database.DB_NAME + '-wal') if os.path.exists(p))
+        ergebnis["db_mb"] = round(groesse / (1024 * 1024), 2)
+
+        rnd = random.Random(seed)
+        conn = database.get_connection()
+        spielnummern = [row[0] for row in conn.execute("SELECT spielnummer FROM spiele")]
+        teams = database.get_all_teams()
+
+        ergebnis["detail"] = _reihe([lambda n=n: database.get_spiel_details(n)
+                                     for n in rnd.sample(spielnummern, min(stichprobe, len(spielnummern)))], wiederholungen)
+
+        def team_statistik(team):
+            database.read_cache.clear()
+            database.get_player_stats_for_team(team)
+            database.get_team_bilanz(team)
+            spielverlauf.verlauf_cache.clear()
+            spielverlauf.get_team_verlauf(team)
+        ergebnis["team_statistik"] = _reihe([lambda t=t: team_statistik(t)
+                                             for t in rnd.sample(teams, min(stichprobe, len(teams)))], wiederholungen)
+
+        ergebnis["spielverlauf"] = {"alle_spiele_ms": _ms(lambda: spielverlauf.berechne_verlauf(spielnummern), wiederholungen)[0]}
+
+        def spielliste(team_filter, seiten):
+            nach = None
+            for _ in range(seiten):
+                _, nach = database.get_spiele_seite(team_filter, None, 'spieldatum', 'DESC', nach=nach)
+                if nach is None:
+                    break
+            database.count_spiele(team_filter, None)
+        team = rnd.choice(teams)
+        ergebnis["index"] = {
+            "erste_seite_ms": _ms(lambda: spielliste(None, 1), wiederholungen)[0],
+            "fuenfte_seite_ms": _ms(lambda: spielliste(None, 5), wiederholungen)[0],
+            "team_filter_ms": _ms(lambda: spielliste(team, 1), wiederholungen)[0],
+        }
+        return ergebnis
+    finally:
+        database.close_connection()
+        database.DB_NAME = alter_db_name
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+def _umgebung():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BENCHMARK_DIR,
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {"python": platform.python_version(), "sqlite": sqlite3.sqlite_version,
+            "plattform": platform.platform(), "commit": commit}
+
+def _kennzahlen(bericht, prefix=''):
+    """Flacht den Bericht zu {"pfad.kennzahl": wert} für alle Kennzahlen auf _ms bzw. _pro_s ab."""
+    werte = {}
+    for key, value in bericht.items():
+        pfad = f"{prefix}{key}"
+        if isinstance(value, dict):
+            werte.update(_kennzahlen(value, pfad + '.'))
+        elif isinstance(value, (int, float)) and (key.endswith('_ms') or key.endswith('_pro_s')):
+            werte[pfad] = value
+    return werte
+
+def vergleiche(alt, neu, toleranz):
+    """Gibt die Veränderung jeder Kennzahl aus; liefert die Anzahl der Verschlechterungen über der Toleranz."""
+    alte_werte = _kennzahlen({"parse": alt.get("parse") or {}, **alt["groessen"]})
+    neue_werte = _kennzahlen({"parse": neu.get("parse") or {}, **neu["groessen"]})
+    schlechter = 0
+    print(f"Vergleich mit Commit {alt['umgebung'].get('commit')} vom {alt['erstellt']}:")
+    for pfad in sorted(set(alte_werte) & set(neue_werte)):
+        vorher, nachher = alte_werte[pfad], neue_werte[pfad]
+        if not vorher:
+            continue
+        # Faktor > 1 bedeutet immer "besser", egal ob Laufzeit oder Durchsatz
+        faktor = vorher / nachher if pfad.endswith('_ms') else nachher / vorher
+        markierung = ''
+        if faktor < 1 - toleranz:
+            markierung = '  <-- langsamer'
+            schlechter += 1
+        elif faktor > 1 + toleranz:
+            markierung = '  schneller'
+        print(f"  {pfad:45} {vorher:>12} -> {nachher:>12}  ({faktor:.2f}x){markierung}")
+    return schlechter
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--groessen', default=','.join(map(str, STANDARD_GROESSEN)),
+                        help='Kommagetrennte Anzahl Spiele pro Lauf (Standard: %(default)s)')
+    parser.add_argument('--pdfs', type=int, default=20, help='Anzahl synthetischer PDFs für die Parser-Messung (0 = auslassen)')
+    parser.add_argument('--stichprobe', type=int, default=50, help='Spiele bzw. Teams pro Abfrage-Messung')
+    parser.add_argument('--wiederholungen', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--ausgabe', help='JSON-Bericht in diese Datei schreiben')
+    parser.add_argument('--vergleich', help='Früheren JSON-Bericht zum Vergleich')
+    parser.add_argument('--toleranz', type=float, default=0.1, help='Erlaubte Verschlechterung, bevor sie markiert wird')
+    args = parser.parse_args()
+
+    bericht = {"erstellt": datetime.now().isoformat(timespec='seconds'), "umgebung": _umgebung(),
+               "parameter": {"stichprobe": args.stichprobe, "wiederholungen": args.wiederholungen, "seed": args.seed},
+               "parse": None, "groessen": {}}
+
+    if args.pdfs > 0:
+        print(f"Parse: {args.pdfs} synthetische PDFs ...")
+        bericht["parse"] = messe_parse(args.pdfs, args.seed)
+        if bericht["parse"] is None:
+            print("  reportlab nicht installiert, Parser-Messung ausgelassen.")
+        else:
+            print(f"  {bericht['parse']}")
+
+    for anzahl in (int(g) for g in args.groessen.split(',') if g.strip()):
+        print(f"{anzahl} Spiele ...")
+        bericht["groessen"][str(anzahl)] = messe_groesse(anzahl, args.seed, args.stichprobe, args.wiederholungen)
+        print(f"  {json.dumps(bericht['groessen'][str(anzahl)], ensure_ascii=False)}")
+
+    if args.ausgabe:
+        with open(args.ausgabe, 'w', encoding='utf-8') as f:
+            json.dump(bericht, f, ensure_ascii=False, indent=2)
+        print(f"Bericht geschrieben: {args.ausgabe}")
+
+    if args.vergleich:
+        with open(args.vergleich, encoding='utf-8') as f:
+            alt = json.load(f)
+        if vergleiche(alt, bericht, args.toleranz):
+            raise SystemExit(1)
+
+if __name__ == '__main__':
+    main()
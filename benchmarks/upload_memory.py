@@ -0,0 +1,100 @@
+# benchmarks/upload_memory.py
+"""
+Spitzen-Speicherverbrauch (ru_maxrss) beim Import eines großen Uploads.
+
+Vergleicht das frühere Vorgehen (jede Datei per read() in den Speicher, Parsen aus BytesIO)
+mit dem aktuellen main.importiere_dateien, das direkt auf den temporären Upload-Dateien arbeitet.
+Jeder Modus läuft in einem eigenen Prozess mit eigener Datenbank, damit sich die Messungen nicht
+beeinflussen. Die PDFs aus --pdf-dir werden reihum verwendet, bis --anzahl Dateien erreicht ist;
+vorhandene Spiele werden ersetzt, damit jede Datei vollständig geparst wird.
+
+    python benchmarks/upload_memory.py --pdf-dir pfad/zu/pdfs --anzahl 300
+"""
+import argparse
+import glob
+import io
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+MODES = ('kopie', 'stream')
+
+def _spool_uploads(pdf_paths, anzahl, tmp_dir):
+    """Legt die Dateien wie Werkzeug als temporäre Dateien ab und liefert (dateiname, stream)."""
+    uploads = []
+    for i in range(anzahl):
+        source = pdf_paths[i % len(pdf_paths)]
+        stream = tempfile.NamedTemporaryFile('wb+', suffix='.upload', dir=tmp_dir)
+        with open(source, 'rb') as f:
+            shutil.copyfileobj(f, stream)
+        stream.seek(0)
+        uploads.append((os.path.basename(source), stream))
+    return uploads
+
+def _run_mode(mode, pdf_paths, anzahl, workers):
+    import database
+    import main
+
+    tmp_dir = tempfile.mkdtemp()
+    database.DB_NAME = os.path.join(tmp_dir, 'benchmark.db')
+    database.init_db()
+    uploads = _spool_uploads(pdf_paths, anzahl, tmp_dir)
+    rss_vorher = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    if mode == 'kopie':
+        # Früheres Vorgehen: alle Dateien als Bytes sammeln, dann aus BytesIO parsen
+        blobs = []
+        for _, stream in uploads:
+            stream.seek(0)
+            blobs.append(stream.read())
+        for pdf_bytes in blobs:
+            data = main.parse_pdf_data(io.BytesIO(pdf_bytes))
+            database.insert_spielbericht_data(data, ersetzen=True)
+    else:
+        main.importiere_dateien(uploads, ersetzen=True, workers=workers)
+
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    return {
+        "modus": mode,
+        "dateien": anzahl,
+        "rss_vorher_kb": rss_vorher,
+        "rss_spitze_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "rss_spitze_kinder_kb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pdf-dir', required=True, help='Verzeichnis mit Spielbericht-PDFs')
+    parser.add_argument('--anzahl', type=int, default=300, help='Anzahl der Dateien im Upload')
+    parser.add_argument('--workers', type=int, default=1, help='Parser-Prozesse im Modus stream')
+    parser.add_argument('--modus', choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    pdf_paths = sorted(glob.glob(os.path.join(args.pdf_dir, '*.pdf')))
+    if not pdf_paths:
+        parser.error(f"Keine PDFs in {args.pdf_dir} gefunden.")
+
+    if args.modus:
+        # Einzelner Modus im Kindprozess; Ausgabe liest der Elternprozess
+        print(json.dumps(_run_mode(args.modus, pdf_paths, args.anzahl, args.workers)))
+        return
+
+    results = []
+    for mode in MODES:
+        output = subprocess.run([sys.executable, __file__, '--pdf-dir', args.pdf_dir, '--anzahl', str(args.anzahl),
+                                 '--workers', str(args.workers), '--modus', mode],
+                                check=True, capture_output=True, text=True).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+
+    for result in results:
+        print(f"{result['modus']:>7}: {result['dateien']} Dateien, Spitze {result['rss_spitze_kb'] / 1024:.1f} MB "
+              f"(vor dem Import {result['rss_vorher_kb'] / 1024:.1f} MB, Parser-Prozesse {result['rss_spitze_kinder_kb'] / 1024:.1f} MB)")
+
+if __name__ == '__main__':
+    main()
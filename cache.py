@@ -0,0 +1,59 @@
+# cache.py
+import threading
+from collections import OrderedDict
+
+class LRUCache:
+    """
+    Begrenzter In-Prozess-Cache mit LRU-Verdrängung.
+    Jeder Eintrag merkt sich die Schreib-Generation der Datenbank, zu der er berechnet wurde;
+    ein Eintrag aus einer älteren Generation gilt als veraltet und wird wie ein Fehltreffer behandelt.
+    """
+
+    MISSING = object()
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+
+    def get(self, key, generation):
+        """Liefert den Wert zu key oder LRUCache.MISSING, wenn er fehlt oder veraltet ist."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return self.MISSING
+            if entry[0] != generation:
+                del self._entries[key]
+                self.stale += 1
+                self.misses += 1
+                return self.MISSING
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, generation, value):
+        with self._lock:
+            self._entries[key] = (generation, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Zähler zur Dimensionierung des Caches."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "groesse": len(self._entries), "maxsize": self.maxsize,
+                "treffer": self.hits, "fehltreffer": self.misses, "veraltet": self.stale,
+                "verdraengt": self.evictions, "trefferquote": round(self.hits / lookups, 4) if lookups else None,
+            }
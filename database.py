@@ -1,271 +1,1692 @@
 # database.py
+import base64
+import copy
+import hashlib
+import json
+import re
 import sqlite3
+import threading
+import time
+import zlib
+from contextlib import closing, contextmanager
+from datetime import datetime
+from functools import wraps
+from itertools import islice
+from flask import g, has_app_context
+from cache import LRUCache
+import metrics
 
 DB_NAME = 'spielberichte.db'
 
-def init_db():
-    """Initialisiert die Datenbank und erstellt die notwendigen Tabellen."""
-    conn = sqlite3.connect(DB_NAME, timeout=10)
+# Werden einmal pro neu geöffneter Verbindung gesetzt
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode = WAL",       # Leser blockieren Schreiber nicht mehr (und umgekehrt)
+    "PRAGMA synchronous = NORMAL",     # im WAL-Modus sicher, spart ein fsync pro Commit
+    "PRAGMA cache_size = -32000",      # ca. 32 MB Seiten-Cache pro Verbindung
+    "PRAGMA mmap_size = 268435456",    # bis zu 256 MB der Datei per mmap lesen
+    "PRAGMA temp_store = MEMORY",
+)
+
+_local = threading.local()
+# Serialisiert Schreibvorgänge innerhalb eines Prozesses; zwischen mehreren Worker-Prozessen
+# sorgt BEGIN IMMEDIATE zusammen mit dem Busy-Timeout für die Reihenfolge.
+_write_lock = threading.RLock()
+
+# Cache vor den lesenden Funktionen der Views, invalidiert über die Schreib-Generation
+read_cache = LRUCache(maxsize=256)
+
+class SpielberichtVorhanden(sqlite3.IntegrityError):
+    """Das Spiel ist bereits in der Datenbank (gleiche Spielnummer bzw. bereits importierte Datei)."""
+    def __init__(self, spielnummer):
+        super().__init__(f"Spiel {spielnummer} ist bereits in der Datenbank vorhanden.")
+        self.spielnummer = spielnummer
+
+    def __reduce__(self):
+        # Wird aus Parser-Prozessen zurückgegeben; ohne dies käme die Meldung als Spielnummer an
+        return (SpielberichtVorhanden, (self.spielnummer,))
+
+# Obergrenze für Platzhalter pro IN-Liste (SQLITE_MAX_VARIABLE_NUMBER älterer SQLite-Versionen ist 999)
+_IN_CHUNK_SIZE = 500
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """
+    Cursor, der Anzahl und Dauer jeder SQL-Anweisung an metrics meldet (inkl. Slow-Query-Log).
+    Bei SELECT läuft ein Großteil der Arbeit erst beim Abholen der Zeilen; für das Slow-Query-Log
+    werden Ausführen und Abholen daher je Anweisung summiert und geprüft, sobald alle Zeilen
+    abgeholt sind, die nächste Anweisung startet oder der Cursor geschlossen wird.
+    """
+    _statement = None
+    _duration = 0.0
+
+    def _finish(self):
+        if self._statement is not None:
+            metrics.check_slow_query(self._duration, self._statement)
+            self._statement = None
+
+    def _fetched(self, start, done):
+        duration = time.perf_counter() - start
+        metrics.record_sql(duration, count=False)
+        self._duration += duration
+        if done:
+            self._finish()
+
+    def execute(self, sql, parameters=()):
+        self._finish()
+        start = time.perf_counter()
+        zeilen = False
+        try:
+            result = super().execute(sql, parameters)
+            zeilen = self.description is not None
+            return result
+        finally:
+            duration = time.perf_counter() - start
+            metrics.record_sql(duration)
+            self._statement, self._duration = sql, duration
+            if not zeilen:
+                # Keine Zeilen abzuholen (Schreibvorgang oder Fehler)
+                self._finish()
+
+    def executemany(self, sql, seq_of_parameters):
+        self._finish()
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            metrics.record_sql(time.perf_counter() - start, sql)
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = None
+        try:
+            row = super().fetchone()
+            return row
+        finally:
+            self._fetched(start, row is None)
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        start = time.perf_counter()
+        rows = []
+        try:
+            rows = super().fetchmany(size)
+            return rows
+        finally:
+            self._fetched(start, len(rows) < size)
+
+    def fetchall(self):
+        start = time.perf_counter()
+        try:
+            return super().fetchall()
+        finally:
+            self._fetched(start, True)
+
+    def close(self):
+        self._finish()
+        super().close()
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Verbindung, deren Cursor (auch bei conn.execute) InstrumentedCursor sind."""
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def commit(self):
+        start = time.perf_counter()
+        try:
+            super().commit()
+        finally:
+            metrics.record_sql(time.perf_counter() - start, "COMMIT")
+
+def _connect():
+    """Öffnet eine neue Verbindung und wendet die Pragmas an."""
+    conn = sqlite3.connect(DB_NAME, timeout=10, factory=InstrumentedConnection)
+    for pragma in CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+    # Für Schreibvorgänge, die Namen direkt in SQL setzen (z. B. apply_roster_to_season)
+    conn.create_function('normalisiere_name', 1, normalisiere_name, deterministic=True)
+    conn.create_function('suchtext', 1, suchtext, deterministic=True)
+    conn.create_function('saison', 1, saison, deterministic=True)
+    return conn
+
+def get_connection():
+    """
+    Liefert die wiederverwendbare Verbindung für die aktuelle Anfrage (Flask-App-Kontext)
+    bzw. außerhalb einer Anfrage für den aktuellen Thread.
+    """
+    if has_app_context():
+        conn = g.get('_db_conn')
+        if conn is None:
+            conn = g._db_conn = _connect()
+        return conn
+
+    conn = getattr(_local, 'conn', None)
+    if conn is None or _local.db_name != DB_NAME:
+        if conn is not None:
+            conn.close()
+        conn = _local.conn = _connect()
+        _local.db_name = DB_NAME
+    return conn
+
+def close_connection(exception=None):
+    """Schließt die Verbindung des App-Kontexts bzw. des aktuellen Threads."""
+    if has_app_context():
+        conn = g.pop('_db_conn', None)
+    else:
+        conn = getattr(_local, 'conn', None)
+        _local.conn = None
+    if conn is not None:
+        conn.close()
+
+def init_app(app):
+    """Registriert das Schließen der Verbindung am Ende jedes App-Kontexts."""
+    app.teardown_appcontext(close_connection)
+
+@contextmanager
+def write_transaction(bump_generation=True):
+    """
+    Führt einen Schreibvorgang als Transaktion aus und liefert einen Cursor.
+    Die Schreibsperre wird mit BEGIN IMMEDIATE sofort geholt, damit parallele Uploads und
+    Umbenennungen warten, statt mitten in der Transaktion an "database is locked" zu scheitern.
+    Verschachtelte Aufrufe laufen in der äußeren Transaktion mit.
+    Vor dem Commit wird die Schreib-Generation erhöht, was alle Cache-Einträge (auch in
+    anderen Worker-Prozessen) ungültig macht.
+    """
+    conn = get_connection()
+    with _write_lock:
+        if conn.in_transaction:
+            yield conn.cursor()
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            cursor = conn.cursor()
+            yield cursor
+            if bump_generation:
+                _bump_write_generation(cursor)
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+
+def _bump_write_generation(cursor):
+    cursor.execute("UPDATE meta SET wert = wert + 1 WHERE schluessel = 'schreib_generation'")
+
+def get_write_generation():
+    """Aktuelle Schreib-Generation; ändert sich mit jedem Commit einer schreibenden Funktion."""
+    cursor = get_connection().cursor()
+    cursor.execute("SELECT wert FROM meta WHERE schluessel = 'schreib_generation'")
+    return cursor.fetchone()[0]
+
+def cached_reader(func):
+    """
+    Legt das Ergebnis einer lesenden Funktion in read_cache ab, bis die Schreib-Generation wechselt.
+    Aufrufer erhalten eine Kopie und können das Ergebnis gefahrlos verändern.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if get_connection().in_transaction:
+            # Nicht committete Daten dürfen nicht in den Cache gelangen
+            return func(*args, **kwargs)
+        key = (DB_NAME, func.__name__, args, tuple(sorted(kwargs.items())))
+        generation = get_write_generation()
+        result = read_cache.get(key, generation)
+        if result is LRUCache.MISSING:
+            result = func(*args, **kwargs)
+            read_cache.set(key, generation, result)
+        return copy.deepcopy(result)
+    return wrapper
+
+def _dict_cursor(conn):
+    """Cursor, der Zeilen als sqlite3.Row liefert, ohne die Row-Factory der Verbindung zu ändern."""
     cursor = conn.cursor()
+    cursor.row_factory = sqlite3.Row
+    return cursor
+
+def zahl_oder_none(text):
+    """Wandelt eine Zahl aus dem Spielbericht in int um; leere oder ungültige Werte ergeben None."""
+    if text is None:
+        return None
+    text = str(text).strip()
+    return int(text) if text.isdigit() else None
+
+_ZEITANGABE_PATTERN = re.compile(r'^\s*(\d+)\s*:\s*(\d+)\s*$')
+
+def spielzeit_in_sekunden(spielzeit):
+    """Wandelt eine Spielzeit "MM:SS" in Sekunden um (None, wenn nicht lesbar)."""
+    match = _ZEITANGABE_PATTERN.match(spielzeit or "")
+    if not match:
+        return None
+    return int(match.group(1)) * 60 + int(match.group(2))
+
+def spielstand_als_tore(spielstand):
+    """Zerlegt einen Spielstand "Heim:Gast" in (tore_heim, tore_gast); (None, None), wenn nicht lesbar."""
+    match = _ZEITANGABE_PATTERN.match(spielstand or "")
+    if not match:
+        return None, None
+    return int(match.group(1)), int(match.group(2))
+
+def spielklasse_kuerzel(spielklasse):
+    """Kürzel einer Spielklasse aus der Klammer, z. B. "Bezirksliga Männer (BL-M)" -> "BL-M"."""
+    match = re.search(r'\((.*?)\)', spielklasse or "")
+    return match.group(1) if match else ""
+
+def anzeige_datum(spieldatum):
+    """Wandelt ein gespeichertes Datum YYYY-MM-DD in DD.MM.YYYY um; andere Werte bleiben unverändert."""
+    try:
+        return datetime.strptime(spieldatum, '%Y-%m-%d').strftime('%d.%m.%Y')
+    except (ValueError, TypeError):
+        return spieldatum
+
+def normalisiere_name(name):
+    """
+    Suchschlüssel eines Spielernamens für die Autovervollständigung: Leerraum zusammengefasst,
+    ohne Groß-/Kleinschreibung. Platzhalter wie "Spieler 7" oder "N.N." ergeben None.
+    """
+    if name is None:
+        return None
+    name = " ".join(name.split()).casefold()
+    if not name or name.startswith('spieler ') or name.startswith('n.n.'):
+        return None
+    return name
+
+_UMLAUTE = str.maketrans({'ä': 'ae', 'ö': 'oe', 'ü': 'ue', 'ß': 'ss'})
+
+def suchtext(text):
+    """
+    Text für den Volltextindex: zusätzlich zur Originalschreibweise die Umschrift der Umlaute,
+    damit "Müller" auch unter "Mueller" gefunden wird. "Muller" findet der Tokenizer
+    (remove_diacritics), der alle übrigen Akzente ebenfalls entfernt.
+    """
+    if not text:
+        return text
+    umschrift = text.lower().translate(_UMLAUTE)
+    return text if umschrift == text.lower() else f"{umschrift} {text}"
+
+def saison(spieldatum):
+    """Saison eines Spiels (Juli bis Juni), z. B. "2024-09-07" -> "2024/25"; None, wenn das Datum nicht lesbar ist."""
+    try:
+        datum = datetime.strptime(spieldatum, '%Y-%m-%d')
+    except (ValueError, TypeError):
+        return None
+    beginn = datum.year if datum.month >= 7 else datum.year - 1
+    return f"{beginn}/{(beginn + 1) % 100:02d}"
+
+def klassifiziere_aktionstyp(bezeichnung):
+    """
+    Bestimmt die Kennzeichen eines Aktionstyps für die Statistik:
+    (ist_tor, ist_7m_tor, ist_7m_versuch, ist_hinausstellung).
+    Die Regeln entsprechen den bisherigen LIKE-Mustern (LIKE ist in SQLite ohne Groß-/Kleinschreibung).
+    """
+    text = (bezeichnung or "").lower()
+    ist_7m_tor = bezeichnung == '7m-Tor'
+    ist_tor = 'tor' in text
+    ist_7m_versuch = (ist_7m_tor or re.search(r'7m.*kein tor', text, re.DOTALL) is not None
+                      or 'fehlwurf' in text or 'verworfen' in text or 'gehalten' in text)
+    ist_hinausstellung = any(marker in text for marker in ('2-min', '2 min', '2min', 'hinausstellung', 'zeitstrafe'))
+    return int(ist_tor), int(ist_7m_tor), int(ist_7m_versuch), int(ist_hinausstellung)
+
+def _aktionstyp_ids(cursor, bezeichnungen):
+    """Liefert {bezeichnung: id} aus der Tabelle aktionstypen und legt unbekannte Typen dabei an."""
+    bezeichnungen = [b for b in dict.fromkeys(bezeichnungen) if b is not None]
+    if not bezeichnungen:
+        return {}
+    cursor.executemany("INSERT OR IGNORE INTO aktionstypen (bezeichnung, ist_tor, ist_7m_tor, ist_7m_versuch, ist_hinausstellung) VALUES (?, ?, ?, ?, ?)",
+                       [(b, *klassifiziere_aktionstyp(b)) for b in bezeichnungen])
+    ids = {}
+    for start in range(0, len(bezeichnungen), _IN_CHUNK_SIZE):
+        chunk = bezeichnungen[start:start + _IN_CHUNK_SIZE]
+        cursor.execute(f"SELECT bezeichnung, id FROM aktionstypen WHERE bezeichnung IN ({', '.join('?' * len(chunk))})", chunk)
+        ids.update(cursor.fetchall())
+    return ids
+
+def _migration_1_grundschema(cursor):
+    """Ursprüngliche Tabellen (bei bestehenden Datenbanken bereits vorhanden)."""
     cursor.execute('CREATE TABLE IF NOT EXISTS spiele (spielnummer TEXT PRIMARY KEY, spielklasse TEXT, spieldatum TEXT, heimmannschaft TEXT, gastmannschaft TEXT, endstand TEXT, halbzeitstand TEXT)')
     cursor.execute('CREATE TABLE IF NOT EXISTS spieler (id INTEGER PRIMARY KEY AUTOINCREMENT, spielnummer TEXT NOT NULL, mannschaftsname TEXT NOT NULL, trikotnummer TEXT, name TEXT, jahrgang TEXT, tore TEXT, sieben_meter_tore TEXT, sieben_meter_versuche TEXT, verwarnung TEXT, hinausstellung_1 TEXT, hinausstellung_2 TEXT, hinausstellung_3 TEXT, disqualifikation TEXT, FOREIGN KEY (spielnummer) REFERENCES spiele (spielnummer))')
     cursor.execute('CREATE TABLE IF NOT EXISTS spieler_aktionen (id INTEGER PRIMARY KEY AUTOINCREMENT, spielnummer TEXT NOT NULL, trikotnummer TEXT NOT NULL, mannschaftsname TEXT NOT NULL, spielzeit TEXT, aktionstyp TEXT, spielstand TEXT, FOREIGN KEY (spielnummer) REFERENCES spiele (spielnummer))')
     cursor.execute('CREATE TABLE IF NOT EXISTS mannschafts_aktionen (id INTEGER PRIMARY KEY AUTOINCREMENT, spielnummer TEXT NOT NULL, mannschaftsname TEXT NOT NULL, spielzeit TEXT, aktionstyp TEXT, spielstand TEXT, FOREIGN KEY (spielnummer) REFERENCES spiele (spielnummer))')
-    conn.commit()
-    conn.close()
+
+def _migration_2_indizes(cursor):
+    """Sekundärindizes für die häufigen Abfragen."""
+    # Spiele eines Teams (Heim- oder Gastseite), sortiert nach Datum
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_spiele_heim ON spiele (heimmannschaft, spieldatum)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_spiele_gast ON spiele (gastmannschaft, spieldatum)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_spiele_spielklasse ON spiele (spielklasse)')
+    # Kader eines Spiels und Spieler eines Teams
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_spieler_spiel ON spieler (spielnummer, mannschaftsname, trikotnummer)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_spieler_team_name ON spieler (mannschaftsname, name)')
+    # Deckt sowohl die Aktionen eines Spielers als auch die Gruppierung der Spielerstatistik ab
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_spieler_aktionen_spieler ON spieler_aktionen (spielnummer, trikotnummer, mannschaftsname, aktionstyp)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_mannschafts_aktionen_spiel ON mannschafts_aktionen (spielnummer)')
+
+def _migration_3_spieler_statistik(cursor):
+    """Vorberechnete Statistik pro Spieler und Spiel (befüllt von migrate())."""
+    cursor.execute('CREATE TABLE IF NOT EXISTS spieler_statistik (spieler_id INTEGER PRIMARY KEY, spielnummer TEXT NOT NULL, mannschaftsname TEXT NOT NULL, trikotnummer TEXT, name TEXT, benannt INTEGER, tore INTEGER NOT NULL, sieben_meter_tore INTEGER NOT NULL, sieben_meter_versuche INTEGER NOT NULL, verwarnungen INTEGER NOT NULL, hinausstellungen INTEGER NOT NULL, disqualifikationen INTEGER NOT NULL)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_spieler_statistik_team ON spieler_statistik (mannschaftsname, benannt)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_spieler_statistik_spiel ON spieler_statistik (spielnummer)')
+
+def _migration_4_typisierte_werte(cursor):
+    """
+    Ganzzahlige Tore im Kader, Spielzeit in Sekunden, Spielstand als Heim-/Gasttore und
+    Aktionstypen als Verweis auf die Nachschlagetabelle aktionstypen. Die Textspalten bleiben
+    für die Anzeige erhalten. Die Strafen-Spalten des Kaders enthalten Zeitpunkte und bleiben Text.
+    """
+    cursor.execute('CREATE TABLE IF NOT EXISTS aktionstypen (id INTEGER PRIMARY KEY, bezeichnung TEXT NOT NULL UNIQUE, ist_tor INTEGER NOT NULL, ist_7m_tor INTEGER NOT NULL, ist_7m_versuch INTEGER NOT NULL, ist_hinausstellung INTEGER NOT NULL)')
+
+    conn = cursor.connection
+    conn.create_function('spielzeit_in_sekunden', 1, spielzeit_in_sekunden, deterministic=True)
+    conn.create_function('spielstand_heim', 1, lambda s: spielstand_als_tore(s)[0], deterministic=True)
+    conn.create_function('spielstand_gast', 1, lambda s: spielstand_als_tore(s)[1], deterministic=True)
+
+    for table in ('spieler_aktionen', 'mannschafts_aktionen'):
+        cursor.execute(f'ALTER TABLE {table} ADD COLUMN aktionstyp_id INTEGER REFERENCES aktionstypen (id)')
+        cursor.execute(f'ALTER TABLE {table} ADD COLUMN spielzeit_sekunden INTEGER')
+        cursor.execute(f'ALTER TABLE {table} ADD COLUMN tore_heim INTEGER')
+        cursor.execute(f'ALTER TABLE {table} ADD COLUMN tore_gast INTEGER')
+        cursor.execute(f"SELECT DISTINCT aktionstyp FROM {table}")
+        _aktionstyp_ids(cursor, [row[0] for row in cursor.fetchall()])
+        cursor.execute(f"""UPDATE {table} SET
+                           aktionstyp_id = (SELECT id FROM aktionstypen WHERE bezeichnung = {table}.aktionstyp),
+                           spielzeit_sekunden = spielzeit_in_sekunden(spielzeit),
+                           tore_heim = spielstand_heim(spielstand),
+                           tore_gast = spielstand_gast(spielstand)""")
+
+    # Spaltentypen lassen sich in SQLite nur durch Neuaufbau der Tabelle ändern
+    cursor.execute('CREATE TABLE spieler_neu (id INTEGER PRIMARY KEY AUTOINCREMENT, spielnummer TEXT NOT NULL, mannschaftsname TEXT NOT NULL, trikotnummer TEXT, name TEXT, jahrgang TEXT, tore INTEGER, sieben_meter_tore INTEGER, sieben_meter_versuche INTEGER, verwarnung TEXT, hinausstellung_1 TEXT, hinausstellung_2 TEXT, hinausstellung_3 TEXT, disqualifikation TEXT, FOREIGN KEY (spielnummer) REFERENCES spiele (spielnummer))')
+    as_int = "CASE WHEN TRIM({0}) != '' AND TRIM({0}) NOT GLOB '*[^0-9]*' THEN CAST(TRIM({0}) AS INTEGER) END"
+    cursor.execute(f"""INSERT INTO spieler_neu SELECT id, spielnummer, mannschaftsname, trikotnummer, name, jahrgang,
+                       {as_int.format('tore')}, {as_int.format('sieben_meter_tore')}, {as_int.format('sieben_meter_versuche')},
+                       verwarnung, hinausstellung_1, hinausstellung_2, hinausstellung_3, disqualifikation FROM spieler""")
+    cursor.execute('DROP TABLE spieler')
+    cursor.execute('ALTER TABLE spieler_neu RENAME TO spieler')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_spieler_spiel ON spieler (spielnummer, mannschaftsname, trikotnummer)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_spieler_team_name ON spieler (mannschaftsname, name)')
+
+    cursor.execute('DROP INDEX IF EXISTS idx_spieler_aktionen_spieler')
+    cursor.execute('CREATE INDEX idx_spieler_aktionen_spieler ON spieler_aktionen (spielnummer, trikotnummer, mannschaftsname, aktionstyp_id)')
+
+def _migration_5_ergebnisspalten(cursor):
+    """Endstand als ganzzahlige Heim-/Gasttore und ein Index für Tabellen pro Spielklasse."""
+    conn = cursor.connection
+    conn.create_function('spielstand_heim', 1, lambda s: spielstand_als_tore(s)[0], deterministic=True)
+    conn.create_function('spielstand_gast', 1, lambda s: spielstand_als_tore(s)[1], deterministic=True)
+    cursor.execute('ALTER TABLE spiele ADD COLUMN tore_heim INTEGER')
+    cursor.execute('ALTER TABLE spiele ADD COLUMN tore_gast INTEGER')
+    cursor.execute('UPDATE spiele SET tore_heim = spielstand_heim(endstand), tore_gast = spielstand_gast(endstand)')
+    # Deckt die Tabellenberechnung einer Spielklasse vollständig ab
+    cursor.execute('DROP INDEX IF EXISTS idx_spiele_spielklasse')
+    cursor.execute('CREATE INDEX idx_spiele_spielklasse ON spiele (spielklasse, heimmannschaft, gastmannschaft, tore_heim, tore_gast)')
+
+def _migration_6_spielliste(cursor):
+    """Vorberechnete Anzeigewerte der Spielliste und Indizes für die seitenweise Sortierung."""
+    conn = cursor.connection
+    conn.create_function('spielklasse_kuerzel', 1, spielklasse_kuerzel, deterministic=True)
+    conn.create_function('anzeige_datum', 1, anzeige_datum, deterministic=True)
+    cursor.execute('ALTER TABLE spiele ADD COLUMN spielklasse_kurz TEXT')
+    cursor.execute('ALTER TABLE spiele ADD COLUMN spieldatum_anzeige TEXT')
+    cursor.execute('UPDATE spiele SET spielklasse_kurz = spielklasse_kuerzel(spielklasse), spieldatum_anzeige = anzeige_datum(spieldatum)')
+    # Ein Index pro Sortierspalte, jeweils mit der Spielnummer als eindeutigem Abschluss für den Keyset-Vergleich
+    for column in ['spieldatum', 'heimmannschaft', 'gastmannschaft', 'endstand', 'spielklasse']:
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_spiele_sort_{column} ON spiele ({column}, spielnummer)')
+
+def _migration_7_schreib_generation(cursor):
+    """Zähler, den jede schreibende Transaktion erhöht (Grundlage für die Cache-Invalidierung)."""
+    cursor.execute('CREATE TABLE IF NOT EXISTS meta (schluessel TEXT PRIMARY KEY, wert INTEGER NOT NULL)')
+    cursor.execute("INSERT OR IGNORE INTO meta (schluessel, wert) VALUES ('schreib_generation', 0)")
+
+def _migration_8_importierte_dateien(cursor):
+    """SHA-256 aller importierten PDF-Dateien, damit bekannte Dateien vor dem Parsen erkannt werden."""
+    cursor.execute('CREATE TABLE IF NOT EXISTS importierte_dateien (sha256 TEXT PRIMARY KEY, spielnummer TEXT NOT NULL, importiert_am TEXT NOT NULL)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_importierte_dateien_spiel ON importierte_dateien (spielnummer)')
+
+def _migration_9_name_norm(cursor):
+    """Normalisierter Spielername mit Index je Team für die Präfixsuche der Autovervollständigung."""
+    cursor.execute('ALTER TABLE spieler ADD COLUMN name_norm TEXT')
+    cursor.execute('UPDATE spieler SET name_norm = normalisiere_name(name)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_spieler_name_norm ON spieler (mannschaftsname, name_norm, name)')
+
+def _migration_10_volltextsuche(cursor):
+    """FTS5-Indizes über Spielernamen, Mannschaften, Spielklasse und Spielnummer für die Suche."""
+    tokenizer = "tokenize = 'unicode61 remove_diacritics 2'"
+    # Eine Zeile je echtem Spielernamen und Mannschaft mit der Zahl der Spiele; Platzhalter wie "Spieler 7" fehlen
+    cursor.execute("""CREATE TABLE IF NOT EXISTS spielernamen (
+                          id INTEGER PRIMARY KEY, mannschaftsname TEXT NOT NULL, name TEXT NOT NULL, spiele INTEGER NOT NULL,
+                          name_suche TEXT, mannschaft_suche TEXT, UNIQUE (mannschaftsname, name))""")
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_spielernamen_leer ON spielernamen (id) WHERE spiele <= 0')
+    cursor.execute(f"""CREATE VIRTUAL TABLE IF NOT EXISTS spieler_suche USING fts5 (
+                           name_suche, mannschaft_suche, content = 'spielernamen', content_rowid = 'id', {tokenizer})""")
+    cursor.execute("""CREATE TRIGGER IF NOT EXISTS spielernamen_ai AFTER INSERT ON spielernamen BEGIN
+                          INSERT INTO spieler_suche (rowid, name_suche, mannschaft_suche) VALUES (new.id, new.name_suche, new.mannschaft_suche);
+                      END""")
+    cursor.execute("""CREATE TRIGGER IF NOT EXISTS spielernamen_ad AFTER DELETE ON spielernamen BEGIN
+                          INSERT INTO spieler_suche (spieler_suche, rowid, name_suche, mannschaft_suche) VALUES ('delete', old.id, old.name_suche, old.mannschaft_suche);
+                      END""")
+    cursor.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS spiele_suche USING fts5 (spielnummer, mannschaften, spielklasse, {tokenizer})")
+    cursor.execute("""INSERT INTO spielernamen (mannschaftsname, name, spiele, name_suche, mannschaft_suche)
+                      SELECT mannschaftsname, name, COUNT(*), suchtext(name), suchtext(mannschaftsname) FROM spieler
+                      WHERE name_norm IS NOT NULL GROUP BY mannschaftsname, name""")
+    cursor.execute("INSERT INTO spiele_suche (spielnummer, mannschaften, spielklasse) SELECT spielnummer, suchtext(heimmannschaft) || ' ' || suchtext(gastmannschaft), suchtext(spielklasse) FROM spiele")
+
+def _migration_11_personen(cursor):
+    """
+    Personen als dauerhafte Identität eines Spielers über Teams und Saisons hinweg.
+    personen_schluessel ordnet (normalisierter Name, Jahrgang) einer Person zu; zusammengeführte
+    Personen behalten so alle Schreibweisen.
+    """
+    cursor.execute('CREATE TABLE IF NOT EXISTS personen (id INTEGER PRIMARY KEY, name TEXT NOT NULL)')
+    cursor.execute('''CREATE TABLE IF NOT EXISTS personen_schluessel (
+                          name_norm TEXT NOT NULL, jahrgang TEXT NOT NULL, person_id INTEGER NOT NULL REFERENCES personen (id),
+                          PRIMARY KEY (name_norm, jahrgang)) WITHOUT ROWID''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_personen_schluessel_person ON personen_schluessel (person_id)')
+    cursor.execute('ALTER TABLE spieler ADD COLUMN person_id INTEGER REFERENCES personen (id)')
+    cursor.execute('ALTER TABLE spieler_statistik ADD COLUMN person_id INTEGER')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_spieler_person ON spieler (person_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_spieler_statistik_person ON spieler_statistik (person_id, spielnummer)')
+    _verknuepfe_personen(cursor)
+
+def _migration_12_rohdaten(cursor):
+    """Komprimierte Rohdaten der PDF-Extraktion je Dateihash, Grundlage für das Neuauswerten ohne PDFs."""
+    cursor.execute('CREATE TABLE IF NOT EXISTS rohdaten (sha256 TEXT PRIMARY KEY, daten BLOB NOT NULL)')
+
+def _migration_13_personen_ohne_jahrgang(cursor):
+    """
+    Personen, die nur ohne Jahrgang bekannt sind, mit der einzigen anderen Person gleichen Namens
+    zusammenführen (Regel von _person_ids, die mit Migration 11 noch fehlte).
+    """
+    cursor.execute("""
+        SELECT name_norm, group_concat(person_id) FROM (
+            SELECT name_norm, person_id, MAX(jahrgang != '') AS mit_jahrgang
+            FROM personen_schluessel GROUP BY name_norm, person_id)
+        GROUP BY name_norm
+        HAVING COUNT(*) = 2 AND SUM(mit_jahrgang) <= 1
+    """)
+    for _, person_ids in cursor.fetchall():
+        ziel_id, quell_id = sorted(int(person_id) for person_id in person_ids.split(','))
+        # Die Person mit Jahrgang bleibt erhalten, sonst die ältere
+        if cursor.execute("SELECT 1 FROM personen_schluessel WHERE person_id = ? AND jahrgang != ''", (quell_id,)).fetchone():
+            ziel_id, quell_id = quell_id, ziel_id
+        _merge_personen(cursor, ziel_id, [quell_id])
+
+def _migration_14_rohdaten_aufraeumen(cursor):
+    """Rohdaten gelöschter Spiele und ersetzter Dateien entfernen; je Spiel bleibt nur die Quelle von neu_auswerten."""
+    cursor.execute(f"DELETE FROM rohdaten WHERE sha256 NOT IN (SELECT sha256 FROM ({_ROHDATEN_QUELLEN_SQL}))")
+
+def _migration_15_spielliste_ohne_null(cursor):
+    """Sortierindizes der Spielliste über die NULL-freien Ausdrücke aus SPIELLISTE_SORTIERUNG."""
+    for column in ['spieldatum', 'heimmannschaft', 'gastmannschaft', 'endstand', 'spielklasse']:
+        cursor.execute(f'DROP INDEX IF EXISTS idx_spiele_sort_{column}')
+    for column, ausdruecke in SPIELLISTE_SORTIERUNG.items():
+        if ausdruecke:
+            cursor.execute(f"CREATE INDEX idx_spiele_sort_{column} ON spiele ({', '.join(ausdruecke)}, spielnummer)")
+
+# Reihenfolge nicht ändern, neue Migrationen nur anhängen.
+# Die Nummer einer Migration ist ihre Position in der Liste (ab 1), der Stand wird in PRAGMA user_version gehalten.
+MIGRATIONS = [
+    _migration_1_grundschema,
+    _migration_2_indizes,
+    _migration_3_spieler_statistik,
+    _migration_4_typisierte_werte,
+    _migration_5_ergebnisspalten,
+    _migration_6_spielliste,
+    _migration_7_schreib_generation,
+    _migration_8_importierte_dateien,
+    _migration_9_name_norm,
+    _migration_10_volltextsuche,
+    _migration_11_personen,
+    _migration_12_rohdaten,
+    _migration_13_personen_ohne_jahrgang,
+    _migration_14_rohdaten_aufraeumen,
+    _migration_15_spielliste_ohne_null,
+]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+def migrate():
+    """Spielt alle noch fehlenden Migrationen in einer Transaktion ein und gibt die neue Schemaversion zurück."""
+    # Die Tabelle meta mit der Schreib-Generation entsteht erst durch eine Migration
+    with write_transaction(bump_generation=False) as cursor:
+        version = cursor.execute("PRAGMA user_version").fetchone()[0]
+        for number in range(version + 1, SCHEMA_VERSION + 1):
+            MIGRATIONS[number - 1](cursor)
+            cursor.execute(f"PRAGMA user_version = {number}")
+            print(f"Datenbank-Migration {number} ({MIGRATIONS[number - 1].__name__}) angewendet.")
+        if version < SCHEMA_VERSION:
+            # Abgeleitete Tabellen nach Schemaänderungen einmalig mit dem aktuellen Code neu berechnen
+            _refresh_spieler_statistik(cursor)
+            _bump_write_generation(cursor)
+    return max(version, SCHEMA_VERSION)
+
+def init_db():
+    """Initialisiert die Datenbank bzw. bringt eine bestehende Datenbank auf den aktuellen Schemastand."""
+    migrate()
     print("Datenbank initialisiert.")
 
-def insert_spielbericht_data(data):
-    """Fügt die Daten eines kompletten Spielberichts in die Datenbank ein."""
+# Berechnet die Zeilen von spieler_statistik aus spieler und spieler_aktionen.
+# {spieler_filter}/{aktionen_filter} schränken die Berechnung optional auf bestimmte Spiele ein.
+_SPIELER_STATISTIK_SELECT = """
+    SELECT
+        s.id, s.spielnummer, s.mannschaftsname, s.trikotnummer, s.name,
+        CASE WHEN s.name LIKE 'Spieler %' OR s.name LIKE 'N.N.%' THEN 0 WHEN s.name IS NOT NULL THEN 1 END,
+        IFNULL(agg_aktionen.total_tore, 0),
+        IFNULL(agg_aktionen.total_7m_tore, 0),
+        IFNULL(agg_aktionen.total_7m_versuche, 0),
+        CASE WHEN s.verwarnung IS NOT NULL AND s.verwarnung != '' THEN 1 ELSE 0 END,
+        CASE WHEN s.hinausstellung_1 IS NOT NULL AND s.hinausstellung_1 != '' THEN 1 ELSE 0 END +
+        CASE WHEN s.hinausstellung_2 IS NOT NULL AND s.hinausstellung_2 != '' THEN 1 ELSE 0 END +
+        CASE WHEN s.hinausstellung_3 IS NOT NULL AND s.hinausstellung_3 != '' THEN 1 ELSE 0 END,
+        CASE WHEN s.disqualifikation IS NOT NULL AND s.disqualifikation != '' THEN 1 ELSE 0 END,
+        s.person_id
+    FROM spieler s
+    LEFT JOIN (
+        SELECT
+            a.spielnummer, a.trikotnummer, a.mannschaftsname,
+            SUM(t.ist_tor) as total_tore,
+            SUM(t.ist_7m_tor) as total_7m_tore,
+            SUM(t.ist_7m_versuch) as total_7m_versuche
+        FROM spieler_aktionen a
+        JOIN aktionstypen t ON t.id = a.aktionstyp_id
+        {aktionen_filter}
+        GROUP BY a.spielnummer, a.trikotnummer, a.mannschaftsname
+    ) AS agg_aktionen ON s.spielnummer = agg_aktionen.spielnummer AND s.trikotnummer = agg_aktionen.trikotnummer AND s.mannschaftsname = agg_aktionen.mannschaftsname
+    {spieler_filter}
+"""
+
+_SPIELER_STATISTIK_COLUMNS = "spieler_id, spielnummer, mannschaftsname, trikotnummer, name, benannt, tore, sieben_meter_tore, sieben_meter_versuche, verwarnungen, hinausstellungen, disqualifikationen, person_id"
+
+def _refresh_spieler_statistik(cursor, spielnummern=None):
+    """
+    Berechnet spieler_statistik für die angegebenen Spiele neu (None = alle Spiele).
+    Läuft im Schreib-Cursor des Aufrufers, damit Rohdaten und Aggregat gemeinsam committet werden.
+    """
+    if spielnummern is None:
+        cursor.execute("DELETE FROM spieler_statistik")
+        cursor.execute(f"INSERT INTO spieler_statistik ({_SPIELER_STATISTIK_COLUMNS}) " + _SPIELER_STATISTIK_SELECT.format(aktionen_filter="", spieler_filter=""))
+        return
+
+    spielnummern = list(dict.fromkeys(spielnummern))
+    for start in range(0, len(spielnummern), _IN_CHUNK_SIZE):
+        chunk = spielnummern[start:start + _IN_CHUNK_SIZE]
+        placeholders = ", ".join("?" * len(chunk))
+        cursor.execute(f"DELETE FROM spieler_statistik WHERE spielnummer IN ({placeholders})", chunk)
+        cursor.execute(f"INSERT INTO spieler_statistik ({_SPIELER_STATISTIK_COLUMNS}) " + _SPIELER_STATISTIK_SELECT.format(
+                           aktionen_filter=f"WHERE a.spielnummer IN ({placeholders})", spieler_filter=f"WHERE s.spielnummer IN ({placeholders})"),
+                       chunk + chunk)
+
+def _fts_phrase(column, text):
+    """FTS5-Ausdruck, der text als Phrase in einer Spalte sucht (Anführungszeichen verdoppelt)."""
+    return f'{column} : "{text.replace(chr(34), chr(34) * 2)}"'
+
+def _zaehle_spielernamen(cursor, spielnummern, vorzeichen, mannschaftsname=None):
+    """
+    Zählt die echten Spielernamen der angegebenen Spiele in spielernamen hinzu (vorzeichen=1) oder ab (-1).
+    Namen, die in keinem Spiel mehr vorkommen, werden gelöscht; die Trigger halten spieler_suche mit.
+    """
+    spielnummern = list(dict.fromkeys(spielnummern))
+    for start in range(0, len(spielnummern), _IN_CHUNK_SIZE):
+        chunk = spielnummern[start:start + _IN_CHUNK_SIZE]
+        team_filter = "" if mannschaftsname is None else "AND mannschaftsname = ?"
+        cursor.execute(f"""INSERT INTO spielernamen (mannschaftsname, name, spiele, name_suche, mannschaft_suche)
+                           SELECT mannschaftsname, name, ? * COUNT(*), suchtext(name), suchtext(mannschaftsname) FROM spieler
+                           WHERE spielnummer IN ({", ".join("?" * len(chunk))}) {team_filter} AND name_norm IS NOT NULL
+                           GROUP BY mannschaftsname, name
+                           ON CONFLICT (mannschaftsname, name) DO UPDATE SET spiele = spiele + excluded.spiele""",
+                       [vorzeichen] + chunk + ([] if mannschaftsname is None else [mannschaftsname]))
+    if vorzeichen < 0:
+        cursor.execute("DELETE FROM spielernamen WHERE spiele <= 0")
+
+def _suchindex_entfernen(cursor, spielnummern, mannschaftsname=None):
+    """
+    Nimmt Spiele aus den Suchindizes, solange ihre Zeilen noch existieren. Mit mannschaftsname
+    wird nur der Kader dieser Mannschaft ausgetragen (vor einer Namensänderung).
+    """
+    _zaehle_spielernamen(cursor, spielnummern, -1, mannschaftsname)
+    if mannschaftsname is None:
+        for spielnummer in dict.fromkeys(spielnummern):
+            # Über den Index der Spalte spielnummer suchen statt die ganze Tabelle zu durchlaufen
+            cursor.execute("DELETE FROM spiele_suche WHERE rowid IN (SELECT rowid FROM spiele_suche WHERE spiele_suche MATCH ? AND spielnummer = ?)",
+                           (_fts_phrase('spielnummer', spielnummer), spielnummer))
+
+def _suchindex_eintragen(cursor, spielnummern, mannschaftsname=None):
+    """Gegenstück zu _suchindex_entfernen, nach dem Schreiben. Läuft im Schreib-Cursor des Aufrufers."""
+    _zaehle_spielernamen(cursor, spielnummern, 1, mannschaftsname)
+    if mannschaftsname is None:
+        spielnummern = list(dict.fromkeys(spielnummern))
+        for start in range(0, len(spielnummern), _IN_CHUNK_SIZE):
+            chunk = spielnummern[start:start + _IN_CHUNK_SIZE]
+            cursor.execute(f"""INSERT INTO spiele_suche (spielnummer, mannschaften, spielklasse)
+                               SELECT spielnummer, suchtext(heimmannschaft) || ' ' || suchtext(gastmannschaft), suchtext(spielklasse)
+                               FROM spiele WHERE spielnummer IN ({', '.join('?' * len(chunk))})""", chunk)
+
+def _personen_schluessel(name, jahrgang):
+    """Schlüssel (normalisierter Name, Jahrgang) einer Kaderzeile; None für Platzhalter."""
+    name_norm = normalisiere_name(name)
+    return None if name_norm is None else (name_norm, (jahrgang or "").strip())
+
+_PERSONEN_SCHLUESSEL_SQL = "SELECT name_norm, jahrgang, person_id FROM personen_schluessel WHERE name_norm IN ({platzhalter})"
+
+def _person_ids(cursor, eintraege):
+    """
+    Löst (name, jahrgang)-Paare in Personen auf und gibt {schluessel: person_id} zurück.
+    Ein unbekannter Schlüssel wird der Person mit demselben Namen zugeordnet, wenn es genau eine gibt
+    und die Jahrgänge nicht widersprechen (einer der beiden fehlt); sonst wird eine Person mit dieser
+    Schreibweise als Anzeigename angelegt. So bleiben Namensvettern mit verschiedenem Jahrgang getrennt.
+    """
+    namen = {}
+    for name, jahrgang in eintraege:
+        schluessel = _personen_schluessel(name, jahrgang)
+        if schluessel is not None:
+            namen.setdefault(schluessel, " ".join(name.split()))
+    # Über den Primärschlüssel nach Namen suchen, der Jahrgang wird danach verglichen
+    name_norms = list(dict.fromkeys(name_norm for name_norm, _ in namen))
+    ids, jahrgaenge = {}, {}
+    for start in range(0, len(name_norms), _IN_CHUNK_SIZE):
+        chunk = name_norms[start:start + _IN_CHUNK_SIZE]
+        cursor.execute(_PERSONEN_SCHLUESSEL_SQL.format(platzhalter=", ".join("?" * len(chunk))), chunk)
+        for name_norm, jahrgang, person_id in cursor.fetchall():
+            jahrgaenge.setdefault(name_norm, {}).setdefault(person_id, set()).add(jahrgang)
+            if (name_norm, jahrgang) in namen:
+                ids[name_norm, jahrgang] = person_id
+    # Schlüssel mit Jahrgang zuerst, damit Einträge ohne Jahrgang im selben Block schon zugeordnet werden können
+    neu = sorted((schluessel for schluessel in namen if schluessel not in ids), key=lambda schluessel: schluessel[1] == "")
+    if not neu:
+        return ids
+    # IDs selbst vergeben, damit alle neuen Personen mit einem executemany angelegt werden;
+    # sicher, weil Schreibvorgänge über BEGIN IMMEDIATE serialisiert sind
+    naechste_id = cursor.execute("SELECT IFNULL(MAX(id), 0) + 1 FROM personen").fetchone()[0]
+    neue_personen = []
+    for name_norm, jahrgang in neu:
+        kandidaten = jahrgaenge.setdefault(name_norm, {})
+        person_id = None
+        if len(kandidaten) == 1:
+            kandidat, bekannte = next(iter(kandidaten.items()))
+            if jahrgang == "" or not bekannte - {""}:
+                person_id = kandidat
+        if person_id is None:
+            person_id = naechste_id
+            naechste_id += 1
+            neue_personen.append((person_id, namen[name_norm, jahrgang]))
+        ids[name_norm, jahrgang] = person_id
+        kandidaten.setdefault(person_id, set()).add(jahrgang)
+    cursor.executemany("INSERT INTO personen (id, name) VALUES (?, ?)", neue_personen)
+    cursor.executemany("INSERT INTO personen_schluessel (name_norm, jahrgang, person_id) VALUES (?, ?, ?)",
+                       [schluessel + (ids[schluessel],) for schluessel in neu])
+    return ids
+
+def _verwaiste_personen_entfernen(cursor, ab_id):
+    """Löscht Personen ab der ID ab_id, auf die keine Kaderzeile verweist, samt ihrer Schlüssel."""
+    verwaist = [row[0] for row in cursor.execute(
+        "SELECT id FROM personen p WHERE id >= ? AND NOT EXISTS (SELECT 1 FROM spieler s WHERE s.person_id = p.id)", (ab_id,)).fetchall()]
+    for start in range(0, len(verwaist), _IN_CHUNK_SIZE):
+        chunk = verwaist[start:start + _IN_CHUNK_SIZE]
+        placeholders = ", ".join("?" * len(chunk))
+        cursor.execute(f"DELETE FROM personen_schluessel WHERE person_id IN ({placeholders})", chunk)
+        cursor.execute(f"DELETE FROM personen WHERE id IN ({placeholders})", chunk)
+
+def _kader_namen(data):
+    """
+    (name, jahrgang) aller Kaderzeilen eines Berichts, um die Personen eines ganzen Blocks auf einmal
+    aufzulösen. Unvollständige Berichte liefern nichts; ihr Fehler wird beim Schreiben gemeldet.
+    """
+    try:
+        eintraege = [(spieler['name'], spieler['jahrgang']) for team_type in ['heim', 'gast'] for spieler in data[f'spieler_{team_type}']]
+    except (KeyError, TypeError):
+        return []
+    return [(name, jahrgang) for name, jahrgang in eintraege if isinstance(name, str) and (jahrgang is None or isinstance(jahrgang, str))]
+
+def _verknuepfe_personen(cursor, spielnummern=None, mannschaftsname=None):
+    """
+    Setzt spieler.person_id der angegebenen Spiele (None = alle) passend zum aktuellen Namen,
+    z. B. nach einer Umbenennung. Muss vor _refresh_spieler_statistik laufen.
+    """
+    if spielnummern is None:
+        chunks = [None]
+    else:
+        spielnummern = list(dict.fromkeys(spielnummern))
+        chunks = [spielnummern[start:start + _IN_CHUNK_SIZE] for start in range(0, len(spielnummern), _IN_CHUNK_SIZE)]
+    for chunk in chunks:
+        bedingungen, params = [], []
+        if chunk is not None:
+            bedingungen.append(f"spielnummer IN ({', '.join('?' * len(chunk))})")
+            params.extend(chunk)
+        if mannschaftsname is not None:
+            bedingungen.append("mannschaftsname = ?")
+            params.append(mannschaftsname)
+        where = f"WHERE {' AND '.join(bedingungen)}" if bedingungen else ""
+        rows = cursor.execute(f"SELECT id, name, jahrgang, person_id FROM spieler {where}", params).fetchall()
+        ids = _person_ids(cursor, [(name, jahrgang) for _, name, jahrgang, _ in rows])
+        aenderungen = []
+        for spieler_id, name, jahrgang, person_id in rows:
+            neu = ids.get(_personen_schluessel(name, jahrgang))
+            if neu != person_id:
+                aenderungen.append((neu, spieler_id))
+        cursor.executemany("UPDATE spieler SET person_id = ? WHERE id = ?", aenderungen)
+
+def _write_spielbericht(cursor, data, person_ids=None):
+    """
+    Schreibt alle Zeilen eines Spielberichts mit gebündelten executemany-Aufrufen.
+    person_ids sind optional bereits aufgelöste Personen (siehe _kader_namen).
+    Gibt die Anzahl der geschriebenen Zeilen zurück. Commit und das Nachziehen der abgeleiteten
+    Tabellen (_aktualisiere_abgeleitete) erfolgen durch den Aufrufer.
+    """
     spielnummer = data['spiel_info']['spielnummer']
     info = data['spiel_info']
-    conn = sqlite3.connect(DB_NAME, timeout=10)
-    cursor = conn.cursor()
 
-    cursor.execute("INSERT OR IGNORE INTO spiele (spielnummer, spielklasse, spieldatum, heimmannschaft, gastmannschaft, endstand, halbzeitstand) VALUES (?, ?, ?, ?, ?, ?, ?)",
-                   (info['spielnummer'], info['spielklasse'], info['spieldatum'], info['heimmannschaft'], info['gastmannschaft'], info['endstand'], info['halbzeitstand']))
+    if 'tore_heim' in info:
+        tore_heim, tore_gast = info['tore_heim'], info['tore_gast']
+    else:
+        tore_heim, tore_gast = spielstand_als_tore(info['endstand'])
+    try:
+        cursor.execute("INSERT INTO spiele (spielnummer, spielklasse, spieldatum, heimmannschaft, gastmannschaft, endstand, halbzeitstand, tore_heim, tore_gast, spielklasse_kurz, spieldatum_anzeige) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                       (info['spielnummer'], info['spielklasse'], info['spieldatum'], info['heimmannschaft'], info['gastmannschaft'], info['endstand'], info['halbzeitstand'], tore_heim, tore_gast,
+                        spielklasse_kuerzel(info['spielklasse']), anzeige_datum(info['spieldatum'])))
+    except sqlite3.IntegrityError:
+        # Ohne diese Prüfung würden Kader und Aktionen ein zweites Mal angehängt
+        raise SpielberichtVorhanden(spielnummer) from None
 
+    if person_ids is None:
+        person_ids = _person_ids(cursor, [(spieler['name'], spieler['jahrgang']) for team_type in ['heim', 'gast'] for spieler in data[f'spieler_{team_type}']])
+    spieler_rows, spieler_aktionen, mannschafts_aktionen = [], [], []
     for team_type in ['heim', 'gast']:
-        team_name = data['spiel_info'][f'{team_type}mannschaft']
+        team_name = info[f'{team_type}mannschaft']
         for spieler in data[f'spieler_{team_type}']:
-            cursor.execute("INSERT INTO spieler (spielnummer, mannschaftsname, trikotnummer, name, jahrgang, tore, sieben_meter_tore, sieben_meter_versuche, verwarnung, hinausstellung_1, hinausstellung_2, hinausstellung_3, disqualifikation) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
-                           (spielnummer, team_name, spieler['trikotnummer'], spieler['name'], spieler['jahrgang'], spieler['tore'], spieler['sieben_meter_versuche'], spieler['sieben_meter_tore'], spieler['verwarnung'], spieler['hinausstellung_1'], spieler['hinausstellung_2'], spieler['hinausstellung_3'], spieler['disqualifikation']))
-            for aktion in spieler['aktionen']:
-                cursor.execute("INSERT INTO spieler_aktionen (spielnummer, trikotnummer, mannschaftsname, spielzeit, aktionstyp, spielstand) VALUES (?, ?, ?, ?, ?, ?)",
-                               (spielnummer, spieler['trikotnummer'], team_name, aktion['spielzeit'], aktion['aktion'], aktion['spielstand']))
-    for aktion in data['aktionen_heim']:
-        cursor.execute("INSERT INTO mannschafts_aktionen (spielnummer, mannschaftsname, spielzeit, aktionstyp, spielstand) VALUES (?, ?, ?, ?, ?)",
-                       (spielnummer, data['spiel_info']['heimmannschaft'], aktion['spielzeit'], aktion['aktion'], aktion['spielstand']))
-    for aktion in data['aktionen_gast']:
-        cursor.execute("INSERT INTO mannschafts_aktionen (spielnummer, mannschaftsname, spielzeit, aktionstyp, spielstand) VALUES (?, ?, ?, ?, ?)",
-                       (spielnummer, data['spiel_info']['gastmannschaft'], aktion['spielzeit'], aktion['aktion'], aktion['spielstand']))
-    conn.commit()
-    conn.close()
-    print(f"Spiel {spielnummer} erfolgreich in die DB eingefügt.")
-
-def get_all_spiele(team_filter=None, spielklasse_filter=None, sort_by='spieldatum', order='DESC'):
-    """
-    Holt eine Liste aller Spiele aus der Datenbank.
-    Kann nach Team und Spielklasse filtern und die Ausgabe sortieren.
-    """
-    conn = sqlite3.connect(DB_NAME, timeout=10)
-    cursor = conn.cursor()
+            name_norm = normalisiere_name(spieler['name'])
+            person_id = None if name_norm is None else person_ids.get((name_norm, (spieler['jahrgang'] or "").strip()))
+            spieler_rows.append((spielnummer, team_name, spieler['trikotnummer'], spieler['name'], name_norm, spieler['jahrgang'], zahl_oder_none(spieler['tore']), zahl_oder_none(spieler['sieben_meter_versuche']), zahl_oder_none(spieler['sieben_meter_tore']), spieler['verwarnung'], spieler['hinausstellung_1'], spieler['hinausstellung_2'], spieler['hinausstellung_3'], spieler['disqualifikation'], person_id))
+            spieler_aktionen.extend((spieler['trikotnummer'], team_name, aktion) for aktion in spieler['aktionen'])
+        mannschafts_aktionen.extend((team_name, aktion) for aktion in data[f'aktionen_{team_type}'])
 
-    valid_sort_columns = ['spielnummer', 'spieldatum', 'heimmannschaft', 'gastmannschaft', 'endstand', 'spielklasse']
-    if sort_by not in valid_sort_columns:
-        sort_by = 'spieldatum'
-    if order.upper() not in ['ASC', 'DESC']:
-        order = 'DESC'
+    aktionstyp_ids = _aktionstyp_ids(cursor, [entry[-1]['aktion'] for entry in spieler_aktionen + mannschafts_aktionen])
+
+    def aktion_values(aktion):
+        # Vom Parser vorberechnete Werte verwenden, ältere Datensätze aus dem Text umrechnen
+        if 'spielzeit_sekunden' in aktion:
+            typed = (aktion['spielzeit_sekunden'], aktion['tore_heim'], aktion['tore_gast'])
+        else:
+            typed = (spielzeit_in_sekunden(aktion['spielzeit']), *spielstand_als_tore(aktion['spielstand']))
+        return (aktion['spielzeit'], aktion['aktion'], aktion['spielstand'], aktionstyp_ids.get(aktion['aktion'])) + typed
+
+    spieler_aktionen_rows = [(spielnummer, trikotnummer, team_name) + aktion_values(aktion) for trikotnummer, team_name, aktion in spieler_aktionen]
+    mannschafts_aktionen_rows = [(spielnummer, team_name) + aktion_values(aktion) for team_name, aktion in mannschafts_aktionen]
+
+    cursor.executemany("INSERT INTO spieler (spielnummer, mannschaftsname, trikotnummer, name, name_norm, jahrgang, tore, sieben_meter_tore, sieben_meter_versuche, verwarnung, hinausstellung_1, hinausstellung_2, hinausstellung_3, disqualifikation, person_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                       spieler_rows)
+    cursor.executemany("INSERT INTO spieler_aktionen (spielnummer, trikotnummer, mannschaftsname, spielzeit, aktionstyp, spielstand, aktionstyp_id, spielzeit_sekunden, tore_heim, tore_gast) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                       spieler_aktionen_rows)
+    cursor.executemany("INSERT INTO mannschafts_aktionen (spielnummer, mannschaftsname, spielzeit, aktionstyp, spielstand, aktionstyp_id, spielzeit_sekunden, tore_heim, tore_gast) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                       mannschafts_aktionen_rows)
+    return 1 + len(spieler_rows) + len(spieler_aktionen_rows) + len(mannschafts_aktionen_rows)
+
+def _aktualisiere_abgeleitete(cursor, spielnummern):
+    """Berechnet spieler_statistik und Suchindex für neu geschriebene Spiele (beim Bulk-Import einmal pro Block)."""
+    _refresh_spieler_statistik(cursor, spielnummern)
+    _suchindex_eintragen(cursor, spielnummern)
+
+def datei_hash(file_stream):
+    """SHA-256 einer Datei als Hex-String. Liest den Stream blockweise und spult ihn danach zurück."""
+    sha256 = hashlib.sha256()
+    file_stream.seek(0)
+    for block in iter(lambda: file_stream.read(1024 * 1024), b''):
+        sha256.update(block)
+    file_stream.seek(0)
+    return sha256.hexdigest()
+
+def find_importierte_datei(sha256):
+    """Spielnummer, unter der eine Datei mit diesem Hash importiert wurde, sonst None."""
+    row = get_connection().execute("SELECT spielnummer FROM importierte_dateien WHERE sha256 = ?", (sha256,)).fetchone()
+    return row[0] if row else None
+
+def spiel_existiert(spielnummer, db_name=None):
+    """
+    Prüft über den Primärschlüssel, ob ein Spiel bereits gespeichert ist. Mit db_name über eine eigene,
+    kurzlebige Verbindung, z. B. in Parser-Prozessen, die keine Verbindung des Elternprozesses verwenden dürfen.
+    """
+    if db_name is None:
+        return get_connection().execute("SELECT 1 FROM spiele WHERE spielnummer = ?", (spielnummer,)).fetchone() is not None
+    with closing(sqlite3.connect(db_name, timeout=10)) as conn:
+        return conn.execute("SELECT 1 FROM spiele WHERE spielnummer = ?", (spielnummer,)).fetchone() is not None
+
+def register_importierte_datei(sha256, spielnummer):
+    """Merkt sich den Hash einer Datei, deren Spiel bereits gespeichert ist."""
+    with write_transaction(bump_generation=False) as cursor:
+        _register_importierte_datei(cursor, sha256, spielnummer)
+
+def _register_importierte_datei(cursor, sha256, spielnummer, rohdaten=None):
+    cursor.execute("INSERT OR REPLACE INTO importierte_dateien (sha256, spielnummer, importiert_am) VALUES (?, ?, ?)",
+                   (sha256, spielnummer, datetime.now().isoformat(timespec='seconds')))
+    if rohdaten is not None:
+        cursor.execute("INSERT OR REPLACE INTO rohdaten (sha256, daten) VALUES (?, ?)", (sha256, rohdaten))
+
+def packe_rohdaten(rohdaten):
+    """Rohdaten der PDF-Extraktion als kompaktes, zlib-komprimiertes JSON."""
+    return zlib.compress(json.dumps(rohdaten, ensure_ascii=False, separators=(',', ':')).encode('utf-8'), 9)
+
+def entpacke_rohdaten(gepackt):
+    return json.loads(zlib.decompress(gepackt))
 
-    query = "SELECT spielnummer, spieldatum, heimmannschaft, gastmannschaft, endstand, spielklasse FROM spiele"
-    params = []
-    where_clauses = []
+def get_rohdaten(sha256):
+    """Komprimierte Rohdaten einer Datei oder None."""
+    row = get_connection().execute("SELECT daten FROM rohdaten WHERE sha256 = ?", (sha256,)).fetchone()
+    return row[0] if row else None
 
+# Je Spiel die zuletzt importierte Datei mit Rohdaten
+_ROHDATEN_QUELLEN_SQL = """
+    SELECT spielnummer, sha256 FROM (
+        SELECT d.spielnummer, d.sha256, ROW_NUMBER() OVER (PARTITION BY d.spielnummer ORDER BY d.importiert_am DESC, d.sha256) AS nr
+        FROM importierte_dateien d JOIN rohdaten r ON r.sha256 = d.sha256
+        WHERE d.spielnummer IN (SELECT spielnummer FROM spiele))
+    WHERE nr = 1
+"""
+
+def get_rohdaten_quellen():
+    """
+    [(spielnummer, sha256)] aller Spiele, für die Rohdaten gespeichert sind. Gibt es mehrere
+    Dateien zu einem Spiel, gilt die zuletzt importierte. Rohdaten gelöschter Spiele bleiben unberücksichtigt.
+    """
+    cursor = get_connection().cursor()
+    cursor.execute(_ROHDATEN_QUELLEN_SQL + " ORDER BY spielnummer")
+    return cursor.fetchall()
+
+def _rohdaten_entfernen(cursor, spielnummer, ausser=None):
+    """
+    Löscht die Rohdaten aller Dateien eines Spiels bis auf die Datei ausser, z. B. nach dem Ersetzen.
+    Die Hashes bleiben vermerkt, damit die Dateien weiterhin vor dem Parsen erkannt werden.
+    """
+    cursor.execute("DELETE FROM rohdaten WHERE sha256 IN (SELECT sha256 FROM importierte_dateien WHERE spielnummer = ? AND sha256 IS NOT ?)",
+                   (spielnummer, ausser))
+
+def get_spielernamen(spielnummern):
+    """Gespeicherte Namen der Kaderzeilen als {(spielnummer, mannschaftsname, trikotnummer): name}."""
+    cursor = get_connection().cursor()
+    spielnummern = list(dict.fromkeys(spielnummern))
+    namen = {}
+    for start in range(0, len(spielnummern), _IN_CHUNK_SIZE):
+        chunk = spielnummern[start:start + _IN_CHUNK_SIZE]
+        cursor.execute(f"SELECT spielnummer, mannschaftsname, trikotnummer, name FROM spieler WHERE spielnummer IN ({', '.join('?' * len(chunk))})", chunk)
+        namen.update(((spielnummer, mannschaftsname, trikotnummer), name) for spielnummer, mannschaftsname, trikotnummer, name in cursor.fetchall())
+    return namen
+
+def _delete_spiel_rows(cursor, spielnummer):
+    """
+    Entfernt ein Spiel mit allen abhängigen Zeilen. Die vermerkten Dateien bleiben erhalten, damit sie
+    beim Ersetzen weiter vor dem Parsen erkannt werden (siehe delete_spiel). Commit erfolgt durch den Aufrufer.
+    """
+    _suchindex_entfernen(cursor, [spielnummer])
+    cursor.execute("DELETE FROM mannschafts_aktionen WHERE spielnummer = ?", (spielnummer,))
+    cursor.execute("DELETE FROM spieler_aktionen WHERE spielnummer = ?", (spielnummer,))
+    cursor.execute("DELETE FROM spieler_statistik WHERE spielnummer = ?", (spielnummer,))
+    cursor.execute("DELETE FROM spieler WHERE spielnummer = ?", (spielnummer,))
+    cursor.execute("DELETE FROM spiele WHERE spielnummer = ?", (spielnummer,))
+
+def insert_spielbericht_data(data, datei_sha256=None, ersetzen=False):
+    """
+    Fügt die Daten eines kompletten Spielberichts in die Datenbank ein.
+
+    Ist das Spiel schon vorhanden, wird es mit ersetzen=True in derselben Transaktion gelöscht und
+    neu geschrieben, sonst bleibt es unverändert und es wird SpielberichtVorhanden ausgelöst.
+    Der Hash der Datei wird in beiden Fällen vermerkt, damit sie beim nächsten Mal vor dem Parsen
+    erkannt wird.
+    """
+    spielnummer = data['spiel_info']['spielnummer']
+    start = time.perf_counter()
+    with write_transaction() as cursor:
+        vorhanden = cursor.execute("SELECT 1 FROM spiele WHERE spielnummer = ?", (spielnummer,)).fetchone() is not None
+        if vorhanden and ersetzen:
+            _delete_spiel_rows(cursor, spielnummer)
+        if not vorhanden or ersetzen:
+            _write_spielbericht(cursor, data)
+            _aktualisiere_abgeleitete(cursor, [spielnummer])
+        if datei_sha256:
+            # Rohdaten nur zum geschriebenen Bericht, sonst würde neu_auswerten das abgelehnte Duplikat auswerten
+            _register_importierte_datei(cursor, datei_sha256, spielnummer, data.get('_rohdaten') if not vorhanden or ersetzen else None)
+        if vorhanden and ersetzen:
+            _rohdaten_entfernen(cursor, spielnummer, datei_sha256)
+    metrics.IMPORT_STAGE_SECONDS.observe(time.perf_counter() - start, stage='insert')
+    if vorhanden and not ersetzen:
+        raise SpielberichtVorhanden(spielnummer)
+    if vorhanden:
+        print(f"Spiel {spielnummer} in der DB ersetzt.")
+    else:
+        print(f"Spiel {spielnummer} erfolgreich in die DB eingefügt.")
+
+def insert_spielberichte_bulk(reports, chunk_size=500, ersetzen=False, datei_hashes=None):
+    """
+    Fügt viele Spielberichte über die gemeinsame Verbindung ein und committet nach jeweils
+    chunk_size Berichten. Jeder Bericht läuft in einem eigenen Savepoint, ein fehlerhafter
+    Bericht wird zurückgerollt, ohne die übrigen Berichte seines Blocks zu verwerfen.
+    Bereits vorhandene Spiele werden mit ersetzen=True neu geschrieben, sonst als
+    SpielberichtVorhanden in den Fehlern gemeldet. datei_hashes enthält optional in derselben
+    Reihenfolge den SHA-256 der Quelldatei jedes Berichts, der mit dem Bericht vermerkt wird
+    (auch bei SpielberichtVorhanden, damit die Datei künftig vor dem Parsen erkannt wird).
+
+    Gibt ein Dictionary mit den importierten Spielnummern, der Zeilenzahl und den
+    Fehlern als Liste von (Index, Spielnummer, Fehler) zurück.
+    """
+    result = {"importiert": [], "zeilen": 0, "fehler": []}
+    reports = iter(reports)
+    hashes = iter(datei_hashes) if datei_hashes is not None else None
+    index = 0
+    while True:
+        chunk = list(islice(reports, chunk_size))
+        if not chunk:
+            break
+        with write_transaction() as cursor:
+            # Personen, Spielerstatistik und Suchindex einmal für den ganzen Block statt pro Bericht
+            erste_neue_person = cursor.execute("SELECT IFNULL(MAX(id), 0) + 1 FROM personen").fetchone()[0]
+            person_ids = _person_ids(cursor, [eintrag for data in chunk for eintrag in _kader_namen(data)])
+            geschrieben, zurueckgerollt = [], False
+            for data in chunk:
+                spielnummer = None
+                sha256 = next(hashes) if hashes is not None else None
+                cursor.execute("SAVEPOINT spielbericht")
+                start = time.perf_counter()
+                try:
+                    spielnummer = data['spiel_info']['spielnummer']
+                    if ersetzen:
+                        if spielnummer in geschrieben:
+                            # Derselbe Bericht zweimal im Block: das Löschen braucht den vollständigen Stand
+                            _aktualisiere_abgeleitete(cursor, [spielnummer])
+                            geschrieben.remove(spielnummer)
+                        _delete_spiel_rows(cursor, spielnummer)
+                    result["zeilen"] += _write_spielbericht(cursor, data, person_ids)
+                    if sha256:
+                        _register_importierte_datei(cursor, sha256, spielnummer, data.get('_rohdaten'))
+                    if ersetzen:
+                        _rohdaten_entfernen(cursor, spielnummer, sha256)
+                except Exception as e:
+                    cursor.execute("ROLLBACK TO spielbericht")
+                    if sha256 and isinstance(e, SpielberichtVorhanden):
+                        # Wie insert_spielbericht_data: die Datei beim nächsten Mal vor dem Parsen erkennen
+                        _register_importierte_datei(cursor, sha256, spielnummer)
+                    result["fehler"].append((index, spielnummer, e))
+                    zurueckgerollt = True
+                else:
+                    result["importiert"].append(spielnummer)
+                    geschrieben.append(spielnummer)
+                    metrics.IMPORT_STAGE_SECONDS.observe(time.perf_counter() - start, stage='insert')
+                cursor.execute("RELEASE spielbericht")
+                index += 1
+            if zurueckgerollt:
+                # Die vorab angelegten Personen zurückgerollter Berichte nicht als leere Identitäten behalten
+                _verwaiste_personen_entfernen(cursor, erste_neue_person)
+            _aktualisiere_abgeleitete(cursor, geschrieben)
+    print(f"{len(result['importiert'])} Spielberichte gesammelt eingefügt, {len(result['fehler'])} fehlgeschlagen.")
+    return result
+
+# Sortierschlüssel je Spalte der Spielliste, vor der Spielnummer als eindeutigem Abschluss.
+# NULL ist im Zeilenwert-Vergleich des Keysets nie kleiner oder größer, daher COALESCE; der Endstand
+# wird numerisch über die Tore sortiert statt als Text ("10:9" vor "9:8"). Die Indizes legt
+# _migration_15_spielliste_ohne_null über genau diese Ausdrücke an.
+SPIELLISTE_SORTIERUNG = {
+    'spielnummer': [],
+    'spieldatum': ["COALESCE(spieldatum, '')"],
+    'heimmannschaft': ["COALESCE(heimmannschaft, '')"],
+    'gastmannschaft': ["COALESCE(gastmannschaft, '')"],
+    'endstand': ["COALESCE(tore_heim, -1)", "COALESCE(tore_gast, -1)"],
+    'spielklasse': ["COALESCE(spielklasse, '')"],
+}
+SPIELLISTE_SORT_COLUMNS = list(SPIELLISTE_SORTIERUNG)
+
+def _encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode('utf-8')).decode('ascii')
+
+def _decode_cursor(cursor_token):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor_token.encode('ascii')))
+    except (ValueError, UnicodeError):
+        return None
+    return values if isinstance(values, list) else None
+
+def _spielliste_filter(team_filter, spielklasse_filter):
+    where_clauses, params = [], []
     if team_filter:
         where_clauses.append("(heimmannschaft = ? OR gastmannschaft = ?)")
         params.extend([team_filter, team_filter])
-
     if spielklasse_filter:
         where_clauses.append("spielklasse = ?")
         params.append(spielklasse_filter)
+    return where_clauses, params
+
+def _spiele_seite_abfrage(team_filter, spielklasse_filter, sort_by, order, nach, limit):
+    """Baut die Abfrage von get_spiele_seite; gibt (query, params, sort_by, key_columns) zurück."""
+    if sort_by not in SPIELLISTE_SORT_COLUMNS:
+        sort_by = 'spieldatum'
+    order = order.upper() if order.upper() in ['ASC', 'DESC'] else 'DESC'
+    key_columns = SPIELLISTE_SORTIERUNG[sort_by] + ['spielnummer']
+
+    where_clauses, params = _spielliste_filter(team_filter, spielklasse_filter)
+    last_key = _decode_cursor(nach) if nach else None
+    if last_key is not None and len(last_key) == len(key_columns):
+        comparison = '<' if order == 'DESC' else '>'
+        if len(key_columns) == 1:
+            where_clauses.append(f"{key_columns[0]} {comparison} ?")
+        else:
+            # Ausgeschrieben statt (a, b) < (?, ?): nur so sucht SQLite im Ausdrucksindex ab dem ersten Schlüssel
+            erster, rest = key_columns[0], key_columns[1:]
+            where_clauses.append(f"{erster} {comparison}= ? AND ({erster} {comparison} ? OR ({', '.join(rest)}) {comparison} ({', '.join('?' * len(rest))}))")
+            last_key = [last_key[0]] + last_key
+        params.extend(last_key)
 
+    query = f"SELECT {', '.join(['spielnummer, spieldatum_anzeige, heimmannschaft, gastmannschaft, endstand, spielklasse_kurz'] + key_columns[:-1])} FROM spiele"
     if where_clauses:
         query += " WHERE " + " AND ".join(where_clauses)
+    query += " ORDER BY " + ", ".join(f"{column} {order}" for column in key_columns) + " LIMIT ?"
+    params.append(limit + 1)
+    return query, params, sort_by, key_columns
 
-    query += f" ORDER BY {sort_by} {order}"
+def get_spiele_seite(team_filter=None, spielklasse_filter=None, sort_by='spieldatum', order='DESC', nach=None, limit=50):
+    """
+    Holt eine Seite der Spielliste per Keyset-Paginierung: Statt OFFSET wird ab dem Sortierwert
+    und der Spielnummer der letzten Zeile der vorherigen Seite (Cursor "nach") weitergelesen,
+    sodass auch tiefe Seiten direkt über den Index gefunden werden.
 
+    Gibt (spiele, naechster_cursor) zurück. Jede Zeile hat die Form
+    (spielnummer, spieldatum_anzeige, heimmannschaft, gastmannschaft, endstand, spielklasse_kurz);
+    naechster_cursor ist None auf der letzten Seite.
+    """
+    query, params, sort_by, key_columns = _spiele_seite_abfrage(team_filter, spielklasse_filter, sort_by, order, nach, limit)
+    cursor = get_connection().cursor()
     cursor.execute(query, params)
-    spiele = cursor.fetchall()
-    conn.close()
-    return spiele
+    rows = cursor.fetchall()
 
-def get_spiel_details(spielnummer):
-    """Stellt die Daten für ein einzelnes Spiel aus der DB wieder her."""
-    conn = sqlite3.connect(DB_NAME, timeout=10)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
+    naechster_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        naechster_cursor = _encode_cursor(list(last[6:]) + [last[0]])
+    return [row[:6] for row in rows], naechster_cursor
+
+def count_spiele(team_filter=None, spielklasse_filter=None):
+    """Zählt die Spiele, die den Filtern der Spielliste entsprechen."""
+    where_clauses, params = _spielliste_filter(team_filter, spielklasse_filter)
+    query = "SELECT COUNT(*) FROM spiele"
+    if where_clauses:
+        query += " WHERE " + " AND ".join(where_clauses)
+    cursor = get_connection().cursor()
+    cursor.execute(query, params)
+    return cursor.fetchone()[0]
+
+def _fetch_dicts(cursor, query, params=()):
+    """Führt eine Abfrage aus und liefert alle Zeilen direkt als Dictionaries."""
+    cursor.execute(query, params)
+    columns = [column[0] for column in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
 
-    cursor.execute("SELECT * FROM spiele WHERE spielnummer = ?", (spielnummer,))
-    spiel_info_raw = cursor.fetchone()
-    if not spiel_info_raw: return None
-    spiel_info = dict(spiel_info_raw)
+# Exportierbare Tabellen mit ihren Spalten in Ausgabereihenfolge
+EXPORT_SPALTEN = {
+    "spiele": ("spielnummer", "spielklasse", "spieldatum", "heimmannschaft", "gastmannschaft", "endstand", "halbzeitstand",
+               "tore_heim", "tore_gast"),
+    "spieler": ("id", "spielnummer", "mannschaftsname", "trikotnummer", "name", "jahrgang", "tore", "sieben_meter_tore",
+                "sieben_meter_versuche", "verwarnung", "hinausstellung_1", "hinausstellung_2", "hinausstellung_3", "disqualifikation"),
+    "spieler_aktionen": ("id", "spielnummer", "trikotnummer", "mannschaftsname", "spielzeit", "spielzeit_sekunden", "aktionstyp",
+                         "spielstand", "tore_heim", "tore_gast"),
+    "mannschafts_aktionen": ("id", "spielnummer", "mannschaftsname", "spielzeit", "spielzeit_sekunden", "aktionstyp",
+                             "spielstand", "tore_heim", "tore_gast"),
+}
 
-    data = {"spiel_info": spiel_info, "spieler_heim": [], "spieler_gast": [], "aktionen_heim": [], "aktionen_gast": []}
+def iter_export_bloecke(tabelle, team=None, spielklasse=None, von=None, bis=None, blockgroesse=1000):
+    """
+    Liest eine Tabelle aus EXPORT_SPALTEN blockweise (Listen von Zeilentupeln) mit fetchmany,
+    sodass der Speicherbedarf unabhängig von der Größe des Archivs bleibt. Die Filter beziehen sich
+    auf die Spiele (Team als Heim- oder Gastmannschaft, Spielklasse, spieldatum von/bis); bei den
+    übrigen Tabellen werden alle Zeilen der passenden Spiele geliefert.
+    """
+    where_clauses, params = _spielliste_filter(team, spielklasse)
+    if von:
+        where_clauses.append("spieldatum >= ?")
+        params.append(von)
+    if bis:
+        where_clauses.append("spieldatum <= ?")
+        params.append(bis)
+    where = " AND ".join(where_clauses)
 
-    cursor.execute("SELECT * FROM spieler WHERE spielnummer = ?", (spielnummer,))
-    alle_spieler = [dict(p) for p in cursor.fetchall()]
+    query = f"SELECT {', '.join(EXPORT_SPALTEN[tabelle])} FROM {tabelle}"
+    if tabelle == "spiele":
+        query += (f" WHERE {where}" if where else "") + " ORDER BY spielnummer"
+    elif where:
+        # Ohne ORDER BY, damit SQLite nicht das ganze Ergebnis zum Sortieren zwischenspeichert
+        query += f" WHERE spielnummer IN (SELECT spielnummer FROM spiele WHERE {where})"
 
-    for spieler in alle_spieler:
-        cursor.execute("SELECT * FROM spieler_aktionen WHERE spielnummer = ? AND trikotnummer = ? AND mannschaftsname = ?",
-                       (spielnummer, spieler['trikotnummer'], spieler['mannschaftsname']))
-        spieler['aktionen'] = [dict(a) for a in cursor.fetchall()]
+    cursor = get_connection().cursor()
+    cursor.execute(query, params)
+    try:
+        while True:
+            rows = cursor.fetchmany(blockgroesse)
+            if not rows:
+                break
+            yield rows
+    finally:
+        cursor.close()
 
-        if spieler['mannschaftsname'] == spiel_info['heimmannschaft']:
-            data['spieler_heim'].append(spieler)
-        else:
-            data['spieler_gast'].append(spieler)
+_SPIELE_DETAILS_SQL = "SELECT * FROM spiele WHERE spielnummer IN ({platzhalter})"
+# Ganzzahlige Kaderspalten, deren leere Werte (NULL) in der Anzeige leer bleiben sollen
+_KADER_ZAHLEN = ('tore', 'sieben_meter_versuche', 'sieben_meter_tore')
+# Kader und Aktionen der Spiele in Einfügereihenfolge ({tabelle}: spieler, spieler_aktionen, mannschafts_aktionen)
+_SPIEL_ZEILEN_SQL = "SELECT * FROM {tabelle} WHERE spielnummer IN ({platzhalter}) ORDER BY id"
 
-    cursor.execute("SELECT * FROM mannschafts_aktionen WHERE spielnummer = ?", (spielnummer,))
-    for aktion in [dict(a) for a in cursor.fetchall()]:
-        if aktion['mannschaftsname'] == spiel_info['heimmannschaft']:
-            data['aktionen_heim'].append(aktion)
-        else:
-            data['aktionen_gast'].append(aktion)
+def get_spiele_details(spielnummern):
+    """
+    Stellt die Daten mehrerer Spiele mit einer festen Anzahl von Abfragen wieder her
+    (vier Abfragen pro 500 Spiele, unabhängig von der Kadergröße).
+    Gibt ein Dictionary {spielnummer: daten} zurück; unbekannte Spielnummern fehlen darin.
+    Leere Tor- und 7m-Werte des Kaders werden wie im Spielbericht als '' geliefert.
+    """
+    spielnummern = list(dict.fromkeys(spielnummern))
+    cursor = get_connection().cursor()
+    result = {}
+
+    for start in range(0, len(spielnummern), _IN_CHUNK_SIZE):
+        chunk = spielnummern[start:start + _IN_CHUNK_SIZE]
+        placeholders = ", ".join("?" * len(chunk))
+
+        for spiel_info in _fetch_dicts(cursor, _SPIELE_DETAILS_SQL.format(platzhalter=placeholders), chunk):
+            result[spiel_info['spielnummer']] = {"spiel_info": spiel_info, "spieler_heim": [], "spieler_gast": [], "aktionen_heim": [], "aktionen_gast": []}
+
+        aktionen_by_spieler = {}
+        for aktion in _fetch_dicts(cursor, _SPIEL_ZEILEN_SQL.format(tabelle='spieler_aktionen', platzhalter=placeholders), chunk):
+            aktionen_by_spieler.setdefault((aktion['spielnummer'], aktion['trikotnummer'], aktion['mannschaftsname']), []).append(aktion)
+
+        for spieler in _fetch_dicts(cursor, _SPIEL_ZEILEN_SQL.format(tabelle='spieler', platzhalter=placeholders), chunk):
+            data = result.get(spieler['spielnummer'])
+            if data is None:
+                continue
+            for spalte in _KADER_ZAHLEN:
+                if spieler[spalte] is None:
+                    spieler[spalte] = ''
+            spieler['aktionen'] = list(aktionen_by_spieler.get((spieler['spielnummer'], spieler['trikotnummer'], spieler['mannschaftsname']), []))
+            if spieler['mannschaftsname'] == data['spiel_info']['heimmannschaft']:
+                data['spieler_heim'].append(spieler)
+            else:
+                data['spieler_gast'].append(spieler)
+
+        for aktion in _fetch_dicts(cursor, _SPIEL_ZEILEN_SQL.format(tabelle='mannschafts_aktionen', platzhalter=placeholders), chunk):
+            data = result.get(aktion['spielnummer'])
+            if data is None:
+                continue
+            if aktion['mannschaftsname'] == data['spiel_info']['heimmannschaft']:
+                data['aktionen_heim'].append(aktion)
+            else:
+                data['aktionen_gast'].append(aktion)
+
+    return result
 
-    conn.close()
-    return data
+def get_spiel_details(spielnummer):
+    """Stellt die Daten für ein einzelnes Spiel aus der DB wieder her."""
+    return get_spiele_details([spielnummer]).get(spielnummer)
 
 def delete_spiel(spielnummer):
-    """Löscht ein Spiel und alle zugehörigen Einträge."""
-    conn = sqlite3.connect(DB_NAME, timeout=10)
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM mannschafts_aktionen WHERE spielnummer = ?", (spielnummer,))
-    cursor.execute("DELETE FROM spieler_aktionen WHERE spielnummer = ?", (spielnummer,))
-    cursor.execute("DELETE FROM spieler WHERE spielnummer = ?", (spielnummer,))
-    cursor.execute("DELETE FROM spiele WHERE spielnummer = ?", (spielnummer,))
-    conn.commit()
-    conn.close()
+    """Löscht ein Spiel und alle zugehörigen Einträge einschließlich der vermerkten Dateien und ihrer Rohdaten."""
+    with write_transaction() as cursor:
+        _delete_spiel_rows(cursor, spielnummer)
+        _rohdaten_entfernen(cursor, spielnummer)
+        cursor.execute("DELETE FROM importierte_dateien WHERE spielnummer = ?", (spielnummer,))
     print(f"Spiel {spielnummer} wurde aus der Datenbank gelöscht.")
 
+_SPIELERNAMEN_TEAM_SQL = "SELECT DISTINCT name FROM spieler WHERE mannschaftsname = ? AND name_norm IS NOT NULL ORDER BY name"
+
+@cached_reader
 def get_unique_player_names_by_team(mannschaftsname):
     """Holt eine Liste aller einzigartigen, echten Spielernamen für ein Team."""
-    conn = sqlite3.connect(DB_NAME, timeout=10)
-    cursor = conn.cursor()
-    cursor.execute("SELECT DISTINCT name FROM spieler WHERE mannschaftsname = ? AND name NOT LIKE 'Spieler %' AND name NOT LIKE 'N.N.%' ORDER BY name", (mannschaftsname,))
+    cursor = get_connection().cursor()
+    cursor.execute(_SPIELERNAMEN_TEAM_SQL, (mannschaftsname,))
     names = [row[0] for row in cursor.fetchall()]
-    conn.close()
     return names
 
+# Bereichsabfrage statt LIKE, damit der Index auch für Präfixe mit % oder _ greift
+_SUCHE_SPIELERNAMEN_SQL = """
+    SELECT name, COUNT(*) AS spiele FROM spieler
+    WHERE mannschaftsname = ? AND name_norm >= ? AND name_norm < ?
+    GROUP BY name ORDER BY spiele DESC, name LIMIT ?
+"""
+
+@cached_reader
+def suche_spielernamen(mannschaftsname, praefix, limit=10):
+    """
+    Autovervollständigung: bis zu limit echte Spielernamen eines Teams, deren normalisierter Name
+    mit praefix beginnt, die häufigsten zuerst. Nutzt den Index auf (mannschaftsname, name_norm).
+    """
+    praefix = " ".join((praefix or "").split()).casefold()
+    cursor = get_connection().cursor()
+    cursor.execute(_SUCHE_SPIELERNAMEN_SQL, (mannschaftsname, praefix, praefix + '\U0010ffff', limit))
+    return [{"name": name, "spiele": spiele} for name, spiele in cursor.fetchall()]
+
 def update_player_name(spielnummer, trikotnummer, mannschaftsname, new_name):
     """Aktualisiert den Namen eines bestimmten Spielers in einem bestimmten Spiel."""
-    conn = sqlite3.connect(DB_NAME, timeout=10)
-    cursor = conn.cursor()
-    cursor.execute("UPDATE spieler SET name = ? WHERE spielnummer = ? AND trikotnummer = ? AND mannschaftsname = ?",
-                   (new_name, spielnummer, trikotnummer, mannschaftsname))
-    conn.commit()
-    conn.close()
+    with write_transaction() as cursor:
+        _suchindex_entfernen(cursor, [spielnummer], mannschaftsname)
+        cursor.execute("UPDATE spieler SET name = ?, name_norm = ? WHERE spielnummer = ? AND trikotnummer = ? AND mannschaftsname = ?",
+                       (new_name, normalisiere_name(new_name), spielnummer, trikotnummer, mannschaftsname))
+        _verknuepfe_personen(cursor, [spielnummer], mannschaftsname)
+        _refresh_spieler_statistik(cursor, [spielnummer])
+        _suchindex_eintragen(cursor, [spielnummer], mannschaftsname)
     print(f"Spieler #{trikotnummer} in Spiel {spielnummer} zu '{new_name}' umbenannt.")
 
+_ROSTER_SQL = "SELECT trikotnummer, name FROM spieler WHERE spielnummer = ? AND mannschaftsname = ? AND name NOT LIKE 'Spieler %' AND name NOT LIKE 'N.N.%'"
+
 def get_roster(spielnummer, mannschaftsname):
     """Holt den Kader (Trikotnummer -> Name) für ein bestimmtes Spiel/Team."""
-    conn = sqlite3.connect(DB_NAME, timeout=10)
-    cursor = conn.cursor()
-    cursor.execute("SELECT trikotnummer, name FROM spieler WHERE spielnummer = ? AND mannschaftsname = ? AND name NOT LIKE 'Spieler %' AND name NOT LIKE 'N.N.%'", 
-                   (spielnummer, mannschaftsname))
+    cursor = get_connection().cursor()
+    cursor.execute(_ROSTER_SQL, (spielnummer, mannschaftsname))
     roster = {row[0]: row[1] for row in cursor.fetchall()}
-    conn.close()
     return roster
 
 def apply_roster(target_spielnummer, mannschaftsname, source_roster):
     """Wendet einen Quell-Kader auf ein Ziel-Spiel an."""
-    conn = sqlite3.connect(DB_NAME, timeout=10)
-    cursor = conn.cursor()
-    for trikotnummer, name in source_roster.items():
-        cursor.execute("UPDATE spieler SET name = ? WHERE spielnummer = ? AND mannschaftsname = ? AND trikotnummer = ?",
-                       (name, target_spielnummer, mannschaftsname, trikotnummer))
-    conn.commit()
-    conn.close()
+    with write_transaction() as cursor:
+        _suchindex_entfernen(cursor, [target_spielnummer], mannschaftsname)
+        for trikotnummer, name in source_roster.items():
+            cursor.execute("UPDATE spieler SET name = ?, name_norm = ? WHERE spielnummer = ? AND mannschaftsname = ? AND trikotnummer = ?",
+                           (name, normalisiere_name(name), target_spielnummer, mannschaftsname, trikotnummer))
+        _verknuepfe_personen(cursor, [target_spielnummer], mannschaftsname)
+        _refresh_spieler_statistik(cursor, [target_spielnummer])
+        _suchindex_eintragen(cursor, [target_spielnummer], mannschaftsname)
     print(f"Kader auf Spiel {target_spielnummer} für Team {mannschaftsname} angewendet.")
 
+_PLATZHALTER_BEDINGUNG = "(name IS NULL OR name = '' OR name LIKE 'Spieler %' OR name LIKE 'N.N.%')"
+
+def apply_roster_to_season(mannschaftsname, source_roster, von=None, bis=None, spielklasse=None, nur_platzhalter=False, probelauf=False):
+    """
+    Wendet einen Kader (Trikotnummer -> Name) auf alle Spiele eines Teams an, optional beschränkt auf
+    einen Zeitraum (spieldatum von/bis, YYYY-MM-DD) oder eine Spielklasse. Der Kader wird als JSON
+    übergeben und mit einem einzigen UPDATE über json_each angewendet; mit nur_platzhalter werden nur
+    "Spieler 7"/"N.N."-Einträge benannt. Mit probelauf wird nichts geschrieben.
+
+    Gibt {"zeilen": geänderte Kaderzeilen, "spiele": betroffene Spielnummern} zurück.
+    """
+    kader = json.dumps({str(trikotnummer): name for trikotnummer, name in source_roster.items()})
+    spiele_bedingungen = ["(heimmannschaft = :team OR gastmannschaft = :team)"]
+    if von:
+        spiele_bedingungen.append("spieldatum >= :von")
+    if bis:
+        spiele_bedingungen.append("spieldatum <= :bis")
+    if spielklasse:
+        spiele_bedingungen.append("spielklasse = :spielklasse")
+    where = f"""mannschaftsname = :team
+        AND spielnummer IN (SELECT spielnummer FROM spiele WHERE {' AND '.join(spiele_bedingungen)})
+        AND trikotnummer IN (SELECT key FROM json_each(:kader))
+        AND name IS NOT (SELECT value FROM json_each(:kader) WHERE key = spieler.trikotnummer)"""
+    if nur_platzhalter:
+        where += f" AND {_PLATZHALTER_BEDINGUNG}"
+    params = {"team": mannschaftsname, "von": von, "bis": bis, "spielklasse": spielklasse, "kader": kader}
+    auswahl = f"SELECT spielnummer, COUNT(*) FROM spieler WHERE {where} GROUP BY spielnummer"
+
+    if probelauf:
+        betroffen = dict(get_connection().execute(auswahl, params).fetchall())
+        return {"zeilen": sum(betroffen.values()), "spiele": sorted(betroffen)}
+
+    with write_transaction() as cursor:
+        betroffen = dict(cursor.execute(auswahl, params).fetchall())
+        if betroffen:
+            _suchindex_entfernen(cursor, betroffen, mannschaftsname)
+            cursor.execute(f"""UPDATE spieler SET name = (SELECT value FROM json_each(:kader) WHERE key = spieler.trikotnummer),
+                               name_norm = normalisiere_name((SELECT value FROM json_each(:kader) WHERE key = spieler.trikotnummer))
+                               WHERE {where}""", params)
+            _verknuepfe_personen(cursor, betroffen, mannschaftsname)
+            _refresh_spieler_statistik(cursor, betroffen)
+            _suchindex_eintragen(cursor, betroffen, mannschaftsname)
+    print(f"Kader für Team {mannschaftsname} auf {len(betroffen)} Spiel(e) angewendet ({sum(betroffen.values())} Namen).")
+    return {"zeilen": sum(betroffen.values()), "spiele": sorted(betroffen)}
+
+def _fts_abfrage(eingabe):
+    """Macht aus einer Sucheingabe eine FTS5-Abfrage: jedes Wort als Präfix, alle Wörter müssen vorkommen."""
+    woerter = re.findall(r'\w+', (eingabe or "").lower().translate(_UMLAUTE))
+    return " ".join(f'"{wort}"*' for wort in woerter)
+
+_SUCHE_SPIELER_SQL = """
+    SELECT n.name, n.mannschaftsname, n.spiele
+    FROM spieler_suche JOIN spielernamen n ON n.id = spieler_suche.rowid
+    WHERE spieler_suche MATCH ?
+    ORDER BY n.spiele DESC, n.name LIMIT ?
+"""
+_SUCHE_SPIELE_SQL = """
+    SELECT sp.spielnummer, sp.spieldatum_anzeige AS spieldatum, sp.heimmannschaft, sp.gastmannschaft, sp.endstand, sp.spielklasse
+    FROM spiele_suche JOIN spiele sp ON sp.spielnummer = spiele_suche.spielnummer
+    WHERE spiele_suche MATCH ?
+    ORDER BY sp.spieldatum DESC LIMIT ?
+"""
+
+@cached_reader
+def suche(eingabe, limit=20):
+    """
+    Volltextsuche über Spieler (Name, Mannschaft) und Spiele (Mannschaften, Spielklasse, Spielnummer).
+    Jedes Wort wird als Präfix gesucht, Groß-/Kleinschreibung und Akzente spielen keine Rolle.
+    Spieler werden je Mannschaft zusammengefasst (häufigste zuerst), Spiele nach Datum absteigend.
+    """
+    abfrage = _fts_abfrage(eingabe)
+    if not abfrage:
+        return {"spieler": [], "spiele": []}
+    cursor = get_connection().cursor()
+    spieler = _fetch_dicts(cursor, _SUCHE_SPIELER_SQL, (abfrage, limit))
+    spiele = _fetch_dicts(cursor, _SUCHE_SPIELE_SQL, (abfrage, limit))
+    return {"spieler": spieler, "spiele": spiele}
+
+_SPIELE_BY_TEAM_SQL = "SELECT * FROM spiele WHERE heimmannschaft = ? OR gastmannschaft = ? ORDER BY spieldatum DESC"
+
+@cached_reader
 def get_spiele_by_team(mannschaftsname):
     """Holt alle Spiele, an denen ein bestimmtes Team beteiligt war."""
-    conn = sqlite3.connect(DB_NAME, timeout=10)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM spiele WHERE heimmannschaft = ? OR gastmannschaft = ? ORDER BY spieldatum DESC",
-                   (mannschaftsname, mannschaftsname))
+    cursor = _dict_cursor(get_connection())
+    cursor.execute(_SPIELE_BY_TEAM_SQL, (mannschaftsname, mannschaftsname))
     spiele = [dict(row) for row in cursor.fetchall()]
-    conn.close()
     return spiele
 
+@cached_reader
 def get_all_teams():
     """Holt eine alphabetisch sortierte Liste aller einzigartigen Mannschaftsnamen."""
-    conn = sqlite3.connect(DB_NAME, timeout=10)
-    cursor = conn.cursor()
+    cursor = get_connection().cursor()
     cursor.execute("SELECT DISTINCT heimmannschaft FROM spiele UNION SELECT DISTINCT gastmannschaft FROM spiele ORDER BY heimmannschaft")
     teams = [row[0] for row in cursor.fetchall()]
-    conn.close()
     return teams
 
+@cached_reader
 def get_all_spielklassen():
     """Holt eine Liste aller einzigartigen Spielklassen."""
-    conn = sqlite3.connect(DB_NAME, timeout=10)
-    cursor = conn.cursor()
+    cursor = get_connection().cursor()
     cursor.execute("SELECT DISTINCT spielklasse FROM spiele WHERE spielklasse IS NOT NULL AND spielklasse != '' ORDER BY spielklasse")
     spielklassen = [row[0] for row in cursor.fetchall()]
-    conn.close()
     return spielklassen
 
-def get_team_game_results(mannschaftsname):
-    """Holt die Ergebnisse aller Spiele eines Teams für die Sieg/Niederlage-Berechnung."""
-    conn = sqlite3.connect(DB_NAME, timeout=10)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    cursor.execute("SELECT heimmannschaft, gastmannschaft, endstand FROM spiele WHERE heimmannschaft = ? OR gastmannschaft = ?",
-                   (mannschaftsname, mannschaftsname))
-    results = [dict(row) for row in cursor.fetchall()]
-    conn.close()
-    return results
+_TEAM_BILANZ_SQL = """
+    SELECT
+        COUNT(*) as spiele,
+        IFNULL(SUM(eigene > fremde), 0) as siege,
+        IFNULL(SUM(eigene = fremde), 0) as unentschieden,
+        IFNULL(SUM(eigene < fremde), 0) as niederlagen,
+        IFNULL(SUM(eigene), 0) as tore_geschossen,
+        IFNULL(SUM(fremde), 0) as tore_kassiert
+    FROM (
+        SELECT tore_heim as eigene, tore_gast as fremde FROM spiele WHERE heimmannschaft = ?
+        UNION ALL
+        SELECT tore_gast, tore_heim FROM spiele WHERE gastmannschaft = ? AND heimmannschaft != ?
+    )
+"""
+
+@cached_reader
+def get_team_bilanz(mannschaftsname):
+    """
+    Berechnet Spiele, Siege, Unentschieden, Niederlagen und Tore eines Teams mit einer Abfrage
+    über die gespeicherten Ergebnisspalten. Spiele ohne lesbaren Endstand zählen nur als Spiel.
+    """
+    cursor = get_connection().cursor()
+    rows = _fetch_dicts(cursor, _TEAM_BILANZ_SQL, (mannschaftsname, mannschaftsname, mannschaftsname))
+    return rows[0]
 
+_TABELLE_SQL = """
+    WITH ergebnisse AS (
+        SELECT heimmannschaft as mannschaft, tore_heim as eigene, tore_gast as fremde
+        FROM spiele WHERE spielklasse = ? AND tore_heim IS NOT NULL AND tore_gast IS NOT NULL
+        UNION ALL
+        SELECT gastmannschaft, tore_gast, tore_heim
+        FROM spiele WHERE spielklasse = ? AND tore_heim IS NOT NULL AND tore_gast IS NOT NULL
+    ), bilanz AS (
+        SELECT
+            mannschaft,
+            COUNT(*) as spiele,
+            SUM(eigene > fremde) as siege,
+            SUM(eigene = fremde) as unentschieden,
+            SUM(eigene < fremde) as niederlagen,
+            SUM(eigene) as tore,
+            SUM(fremde) as gegentore,
+            SUM(eigene) - SUM(fremde) as tordifferenz,
+            2 * SUM(eigene > fremde) + SUM(eigene = fremde) as punkte,
+            2 * SUM(eigene < fremde) + SUM(eigene = fremde) as minuspunkte
+        FROM ergebnisse
+        GROUP BY mannschaft
+    )
+    SELECT RANK() OVER (ORDER BY punkte DESC, tordifferenz DESC, tore DESC) as platz, *
+    FROM bilanz
+    ORDER BY platz, mannschaft
+"""
+
+@cached_reader
+def get_tabelle(spielklasse):
+    """
+    Berechnet die Tabelle einer Spielklasse (2 Punkte pro Sieg, 1 pro Unentschieden) mit einer Abfrage.
+    Sortiert nach Punkten, Tordifferenz und erzielten Toren; gleichplatzierte Teams erhalten denselben Platz.
+    """
+    cursor = get_connection().cursor()
+    return _fetch_dicts(cursor, _TABELLE_SQL, (spielklasse, spielklasse))
+
+_SPIELER_STATISTIK_TEAM_SQL = """
+    SELECT
+        CASE WHEN benannt = 1 THEN MAX(st.name) ELSE st.trikotnummer END as group_key,
+        benannt,
+        st.person_id,
+        NOT EXISTS (SELECT 1 FROM personen_schluessel ps WHERE ps.person_id = st.person_id AND ps.jahrgang != '') as ohne_jahrgang,
+        COUNT(DISTINCT spielnummer) as spiele,
+        SUM(tore) as total_tore,
+        SUM(sieben_meter_tore) as total_7m_tore,
+        SUM(sieben_meter_versuche) as total_7m_versuche,
+        SUM(verwarnungen) as total_verwarnungen,
+        SUM(hinausstellungen) as total_hinausstellungen,
+        SUM(disqualifikationen) as total_disqualifikationen
+    FROM spieler_statistik st
+    WHERE mannschaftsname = ? AND benannt IS NOT NULL
+    GROUP BY benannt, CASE WHEN benannt = 1 THEN IFNULL(st.person_id, st.name) ELSE st.trikotnummer END
+    ORDER BY benannt DESC, group_key
+"""
+
+@cached_reader
 def get_player_stats_for_team(mannschaftsname):
     """
     Aggregiert Spielerstatistiken für ein Team über alle Spiele.
-    Tore und 7m-Werte werden präzise aus der Aktionen-Tabelle berechnet.
+    Liest nur die vorberechneten Zeilen aus spieler_statistik; benannte Spieler werden
+    nach Person (alle Schreibweisen), Platzhalter ("Spieler 7", "N.N.") nach Trikotnummer zusammengefasst.
     """
-    conn = sqlite3.connect(DB_NAME, timeout=10)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
+    cursor = get_connection().cursor()
+    all_stats = _fetch_dicts(cursor, _SPIELER_STATISTIK_TEAM_SQL, (mannschaftsname,))
+
+    # Personen ohne Jahrgang sind über den Namen allein nicht eindeutig; gibt es im Team genau eine
+    # andere Person mit demselben Namen, gehören die Zeilen zu ihr (z. B. nach einer Umbenennung)
+    je_name = {}
+    for row in all_stats:
+        if row['benannt'] and row['person_id'] is not None:
+            je_name.setdefault(normalisiere_name(row['group_key']), []).append(row)
+    for gruppen in je_name.values():
+        ohne = [row for row in gruppen if row['ohne_jahrgang']]
+        mit = [row for row in gruppen if not row['ohne_jahrgang']]
+        if len(ohne) == 1 and len(mit) == 1:
+            ziel = mit[0]
+            for key, value in ohne[0].items():
+                if key == 'spiele' or key.startswith('total_'):
+                    ziel[key] = (ziel[key] or 0) + (value or 0)
+            all_stats.remove(ohne[0])
+
+    for row in all_stats:
+        benannt = row.pop('benannt')
+        row.pop('ohne_jahrgang')
+        row['name'] = row['group_key'] if benannt else f"N.N. (Trikot Nr. {row['group_key']})"
 
-    base_query = """
-        SELECT
-            s.{group_by_columns} as group_key,
-            COUNT(DISTINCT s.spielnummer) as spiele,
-            SUM(IFNULL(agg_aktionen.total_tore, 0)) as total_tore,
-            SUM(IFNULL(agg_aktionen.total_7m_tore, 0)) as total_7m_tore,
-            SUM(IFNULL(agg_aktionen.total_7m_versuche, 0)) as total_7m_versuche,
-            SUM(CASE WHEN s.verwarnung IS NOT NULL AND s.verwarnung != '' THEN 1 ELSE 0 END) as total_verwarnungen,
-            SUM(CASE WHEN s.hinausstellung_1 IS NOT NULL AND s.hinausstellung_1 != '' THEN 1 ELSE 0 END +
-                CASE WHEN s.hinausstellung_2 IS NOT NULL AND s.hinausstellung_2 != '' THEN 1 ELSE 0 END +
-                CASE WHEN s.hinausstellung_3 IS NOT NULL AND s.hinausstellung_3 != '' THEN 1 ELSE 0 END) as total_hinausstellungen,
-            SUM(CASE WHEN s.disqualifikation IS NOT NULL AND s.disqualifikation != '' THEN 1 ELSE 0 END) as total_disqualifikationen
-        FROM spieler s
-        LEFT JOIN (
-            SELECT
-                spielnummer, trikotnummer, mannschaftsname,
-                SUM(CASE WHEN aktionstyp LIKE '%Tor%' THEN 1 ELSE 0 END) as total_tore,
-                SUM(CASE WHEN aktionstyp = '7m-Tor' THEN 1 ELSE 0 END) as total_7m_tore,
-                SUM(CASE 
-                    WHEN aktionstyp = '7m-Tor' THEN 1
-                    WHEN aktionstyp LIKE '%7m%kein Tor%' THEN 1
-                    WHEN aktionstyp LIKE '%Fehlwurf%' THEN 1
-                    WHEN aktionstyp LIKE '%verworfen%' THEN 1
-                    WHEN aktionstyp LIKE '%gehalten%' THEN 1
-                    ELSE 0
-                END) as total_7m_versuche
-            FROM spieler_aktionen
-            GROUP BY spielnummer, trikotnummer, mannschaftsname
-        ) AS agg_aktionen ON s.spielnummer = agg_aktionen.spielnummer AND s.trikotnummer = agg_aktionen.trikotnummer AND s.mannschaftsname = agg_aktionen.mannschaftsname
-        WHERE s.mannschaftsname = ? AND {where_clause}
-        GROUP BY group_key
-    """
-
-    named_query = base_query.format(group_by_columns="name", where_clause="s.name NOT LIKE 'Spieler %' AND s.name NOT LIKE 'N.N.%'")
-    cursor.execute(named_query, (mannschaftsname,))
-    named_player_stats = [dict(row) for row in cursor.fetchall()]
-    for p in named_player_stats: p['name'] = p['group_key']
-
-    unnamed_query = base_query.format(group_by_columns="trikotnummer", where_clause="(s.name LIKE 'Spieler %' OR s.name LIKE 'N.N.%')")
-    cursor.execute(unnamed_query, (mannschaftsname,))
-    unnamed_player_stats_raw = [dict(row) for row in cursor.fetchall()]
-
-    unnamed_player_stats = []
-    for row in unnamed_player_stats_raw:
-        row['name'] = f"N.N. (Trikot Nr. {row['group_key']})"
-        unnamed_player_stats.append(row)
-
-    conn.close()
-
-    all_stats = named_player_stats + unnamed_player_stats
     all_stats.sort(key=lambda x: x.get('total_tore', 0) or 0, reverse=True)
 
-    return all_stats
\ No newline at end of file
+    return all_stats
+
+_KARRIERE_SQL = """
+    SELECT
+        saison(sp.spieldatum) as saison,
+        st.mannschaftsname,
+        sp.spielklasse,
+        COUNT(*) as spiele,
+        SUM(st.tore) as total_tore,
+        SUM(st.sieben_meter_tore) as total_7m_tore,
+        SUM(st.sieben_meter_versuche) as total_7m_versuche,
+        SUM(st.verwarnungen) as total_verwarnungen,
+        SUM(st.hinausstellungen) as total_hinausstellungen,
+        SUM(st.disqualifikationen) as total_disqualifikationen
+    FROM spieler_statistik st
+    JOIN spiele sp ON sp.spielnummer = st.spielnummer
+    WHERE st.person_id = ?
+    GROUP BY saison, st.mannschaftsname, sp.spielklasse
+    ORDER BY saison, st.mannschaftsname, sp.spielklasse
+"""
+_KARRIERE_SCHREIBWEISEN_SQL = "SELECT name, COUNT(*) AS spiele FROM spieler WHERE person_id = ? GROUP BY name ORDER BY spiele DESC, name"
+
+@cached_reader
+def get_karriere(person_id):
+    """
+    Karrierestatistik einer Person über alle Teams, Saisons und Spielklassen.
+    Liest spieler_statistik über den Index auf person_id. Gibt None zurück, wenn es die Person nicht gibt.
+    """
+    cursor = get_connection().cursor()
+    person = _fetch_dicts(cursor, "SELECT id, name FROM personen WHERE id = ?", (person_id,))
+    if not person:
+        return None
+    person = person[0]
+    person['schreibweisen'] = _fetch_dicts(cursor, _KARRIERE_SCHREIBWEISEN_SQL, (person_id,))
+    stationen = _fetch_dicts(cursor, _KARRIERE_SQL, (person_id,))
+    summen = ('spiele', 'total_tore', 'total_7m_tore', 'total_7m_versuche', 'total_verwarnungen', 'total_hinausstellungen', 'total_disqualifikationen')
+    gesamt = {key: sum(station[key] or 0 for station in stationen) for key in summen}
+    return {"person": person, "stationen": stationen, "gesamt": gesamt}
+
+def _merge_personen(cursor, ziel_id, quell_ids):
+    """Hängt Schlüssel, Kader- und Statistikzeilen der quell_ids an ziel_id um und löscht die Quellpersonen."""
+    placeholders = ", ".join("?" * len(quell_ids))
+    cursor.execute(f"UPDATE personen_schluessel SET person_id = ? WHERE person_id IN ({placeholders})", [ziel_id] + quell_ids)
+    cursor.execute(f"UPDATE spieler SET person_id = ? WHERE person_id IN ({placeholders})", [ziel_id] + quell_ids)
+    zeilen = cursor.rowcount
+    cursor.execute(f"UPDATE spieler_statistik SET person_id = ? WHERE person_id IN ({placeholders})", [ziel_id] + quell_ids)
+    cursor.execute(f"DELETE FROM personen WHERE id IN ({placeholders})", quell_ids)
+    return zeilen
+
+def merge_personen(ziel_id, quell_ids):
+    """
+    Führt doppelt angelegte Personen (z. B. Schreibvarianten) in einer Transaktion zusammen:
+    Kaderzeilen, Statistikzeilen und Namensschlüssel der quell_ids zeigen danach auf ziel_id,
+    die Quellpersonen werden gelöscht. Gibt die Anzahl der umgehängten Kaderzeilen zurück.
+    """
+    quell_ids = [person_id for person_id in dict.fromkeys(quell_ids) if person_id != ziel_id]
+    if not quell_ids:
+        return 0
+    placeholders = ", ".join("?" * len(quell_ids))
+    with write_transaction() as cursor:
+        vorhanden = {row[0] for row in cursor.execute(f"SELECT id FROM personen WHERE id IN (?, {placeholders})", [ziel_id] + quell_ids)}
+        unbekannt = [person_id for person_id in [ziel_id] + quell_ids if person_id not in vorhanden]
+        if unbekannt:
+            raise ValueError(f"Unbekannte Person(en): {', '.join(map(str, unbekannt))}")
+        zeilen = _merge_personen(cursor, ziel_id, quell_ids)
+    print(f"{len(quell_ids)} Person(en) mit Person {ziel_id} zusammengeführt ({zeilen} Kaderzeilen).")
+    return zeilen
+
+def verify_spieler_statistik():
+    """
+    Vergleicht spieler_statistik mit einer Neuberechnung aus den Rohdaten.
+    Gibt die sortierte Liste der Spielnummern zurück, deren Aggregat abweicht.
+    """
+    cursor = get_connection().cursor()
+    expected = _SPIELER_STATISTIK_SELECT.format(aktionen_filter="", spieler_filter="")
+    cursor.execute(f"""
+        SELECT spielnummer FROM (SELECT * FROM ({expected}) EXCEPT SELECT {_SPIELER_STATISTIK_COLUMNS} FROM spieler_statistik)
+        UNION
+        SELECT spielnummer FROM (SELECT {_SPIELER_STATISTIK_COLUMNS} FROM spieler_statistik EXCEPT SELECT * FROM ({expected}))
+        ORDER BY 1
+    """)
+    return [row[0] for row in cursor.fetchall()]
+
+def rebuild_spieler_statistik(spielnummern=None):
+    """Baut spieler_statistik für die angegebenen bzw. alle Spiele aus den Rohdaten neu auf."""
+    with write_transaction() as cursor:
+        _refresh_spieler_statistik(cursor, spielnummern)
+    print("Spielerstatistik neu aufgebaut.")
+
+# Aktionen gelten als gleich, wenn alle Spalten aus dem Spielbericht übereinstimmen
+_AKTIONEN_SCHLUESSEL = {
+    'spieler_aktionen': 'spielnummer, trikotnummer, mannschaftsname, spielzeit, aktionstyp, spielstand',
+    'mannschafts_aktionen': 'spielnummer, mannschaftsname, spielzeit, aktionstyp, spielstand',
+}
+
+def remove_duplicate_rows():
+    """
+    Entfernt Kader- und Aktionszeilen, die durch mehrfaches Importieren desselben Spielberichts
+    entstanden sind (vor der Duplikatprüfung wurden sie bei jedem Import erneut angehängt).
+
+    Pro Import gibt es je Mannschaft und Spieler genau eine Kaderzeile; die höchste Anzahl gleicher
+    Kaderzeilen eines Spiels ist daher die Zahl seiner Importe. Von gleichen Aktionen bleibt der
+    entsprechende Anteil erhalten, damit tatsächlich mehrfach protokollierte Aktionen nicht verloren gehen.
+    Gibt die Anzahl der gelöschten Zeilen je Tabelle und die betroffenen Spielnummern zurück.
+    """
+    result = {}
+    with write_transaction() as cursor:
+        cursor.execute("DROP TABLE IF EXISTS temp.import_faktor")
+        cursor.execute("""CREATE TEMP TABLE import_faktor AS
+                          SELECT spielnummer, MAX(anzahl) AS faktor
+                          FROM (SELECT spielnummer, COUNT(*) AS anzahl FROM spieler
+                                GROUP BY spielnummer, mannschaftsname, trikotnummer, name, jahrgang)
+                          GROUP BY spielnummer HAVING MAX(anzahl) > 1""")
+        spielnummern = [row[0] for row in cursor.execute("SELECT spielnummer FROM import_faktor ORDER BY spielnummer")]
+        _suchindex_entfernen(cursor, spielnummern)
+
+        cursor.execute("""DELETE FROM spieler
+                          WHERE spielnummer IN (SELECT spielnummer FROM import_faktor)
+                            AND id NOT IN (SELECT MIN(id) FROM spieler
+                                           WHERE spielnummer IN (SELECT spielnummer FROM import_faktor)
+                                           GROUP BY spielnummer, mannschaftsname, trikotnummer, name, jahrgang)""")
+        result['spieler'] = cursor.rowcount
+
+        for table, key in _AKTIONEN_SCHLUESSEL.items():
+            cursor.execute(f"""DELETE FROM {table} WHERE id IN (
+                                   SELECT id FROM (
+                                       SELECT a.id, f.faktor,
+                                              ROW_NUMBER() OVER (PARTITION BY {key} ORDER BY a.id) AS nr,
+                                              COUNT(*) OVER (PARTITION BY {key}) AS anzahl
+                                       FROM {table} a JOIN import_faktor f USING (spielnummer))
+                                   WHERE nr > anzahl / faktor)""")
+            result[table] = cursor.rowcount
+
+        if spielnummern:
+            _refresh_spieler_statistik(cursor, spielnummern)
+            _suchindex_eintragen(cursor, spielnummern)
+        cursor.execute("DROP TABLE temp.import_faktor")
+    result['spiele'] = spielnummern
+    return result
+
+# Häufige Abfragen der Views mit Beispielparametern, deren Abfrageplan keinen vollständigen Tabellenscan
+# enthalten darf; die Texte sind dieselben Konstanten bzw. Abfrage-Builder, die die Funktionen ausführen
+HOT_QUERIES = {
+    "get_spiele_by_team": (_SPIELE_BY_TEAM_SQL, ('x', 'x')),
+    "get_team_bilanz": (_TEAM_BILANZ_SQL, ('x', 'x', 'x')),
+    "get_tabelle": (_TABELLE_SQL, ('x', 'x')),
+    "get_spiele_seite": _spiele_seite_abfrage('x', None, 'spieldatum', 'DESC', _encode_cursor(['x', 'x']), 50)[:2],
+    "get_spiele_seite_spielklasse": _spiele_seite_abfrage(None, 'x', 'spielnummer', 'ASC', _encode_cursor(['x']), 50)[:2],
+    "get_spiele_seite_endstand": _spiele_seite_abfrage(None, None, 'endstand', 'DESC', _encode_cursor([0, 0, 'x']), 50)[:2],
+    "get_spiele_details": (_SPIELE_DETAILS_SQL.format(platzhalter="?, ?"), ('x', 'y')),
+    "get_spiele_details_spieler": (_SPIEL_ZEILEN_SQL.format(tabelle='spieler', platzhalter="?, ?"), ('x', 'y')),
+    "get_spiele_details_aktionen": (_SPIEL_ZEILEN_SQL.format(tabelle='spieler_aktionen', platzhalter="?, ?"), ('x', 'y')),
+    "get_spiele_details_mannschaft": (_SPIEL_ZEILEN_SQL.format(tabelle='mannschafts_aktionen', platzhalter="?, ?"), ('x', 'y')),
+    "get_roster": (_ROSTER_SQL, ('x', 'x')),
+    "get_unique_player_names_by_team": (_SPIELERNAMEN_TEAM_SQL, ('x',)),
+    "suche_spielernamen": (_SUCHE_SPIELERNAMEN_SQL, ('x', 'm', 'm\U0010ffff', 10)),
+    "suche_spieler": (_SUCHE_SPIELER_SQL, ('"m"*', 20)),
+    "suche_spiele": (_SUCHE_SPIELE_SQL, ('"m"*', 20)),
+    "get_player_stats_for_team": (_SPIELER_STATISTIK_TEAM_SQL, ('x',)),
+    "get_karriere": (_KARRIERE_SQL, (1,)),
+    "get_karriere_schreibweisen": (_KARRIERE_SCHREIBWEISEN_SQL, (1,)),
+    "_person_ids": (_PERSONEN_SCHLUESSEL_SQL.format(platzhalter="?, ?"), ('a', 'b')),
+}
+
+def check_query_plans():
+    """
+    Prüft mit EXPLAIN QUERY PLAN, ob die häufigen Abfragen Indizes nutzen.
+    Gibt ein Dictionary {Abfrage: Planzeilen} der Abfragen zurück, die eine Tabelle ohne Index durchsuchen.
+    """
+    cursor = get_connection().cursor()
+    full_scans = {}
+    for name, (query, params) in HOT_QUERIES.items():
+        plan = _full_scan_plan(cursor, query, params)
+        if plan is not None:
+            full_scans[name] = plan
+    return full_scans
+
+_TABELLEN_ALIAS_PATTERN = re.compile(r'\b(?:FROM|JOIN)\s+(\w+)\s+(?:AS\s+)?(?!WHERE|JOIN|ON|LEFT|INNER|CROSS|GROUP|ORDER|LIMIT|UNION)(\w+)', re.IGNORECASE)
+
+def _full_scan_plan(cursor, query, params=()):
+    """Planzeilen von query, falls dabei eine Tabelle ohne Index durchsucht wird, sonst None."""
+    tables = {row[0] for row in cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    # Der Plan nennt Tabellen mit Alias nur beim Alias ("SCAN st"), CTEs und Unterabfragen zählen nicht
+    tables |= {alias for table, alias in _TABELLEN_ALIAS_PATTERN.findall(query) if table in tables}
+    plan = [row[3] for row in cursor.execute("EXPLAIN QUERY PLAN " + query, params)]
+    if any(line.startswith("SCAN ") and line.split()[1] in tables and " INDEX " not in line for line in plan):
+        return plan
+    return None
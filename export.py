@@ -0,0 +1,76 @@
+# export.py
+"""
+Export der Spiele, Kader und Aktionen als CSV (zeilenweise gestreamt) oder Parquet (spaltenweise).
+
+Beide Formate verarbeiten die Daten blockweise aus database.iter_export_bloecke, der Speicherbedarf
+hängt also nur von der Blockgröße ab. Parquet benötigt pyarrow; ohne pyarrow steht nur CSV zur Verfügung.
+"""
+import csv
+import io
+
+import database
+
+FORMATE = ('csv', 'parquet')
+
+# Ganzzahlige Spalten; alle übrigen werden als Text exportiert
+_INTEGER_SPALTEN = {"id", "tore_heim", "tore_gast", "tore", "sieben_meter_tore", "sieben_meter_versuche", "spielzeit_sekunden"}
+
+class ExportFehler(ValueError):
+    """Unbekannte Tabelle oder nicht verfügbares Format."""
+
+def pruefe(tabelle, format):
+    if tabelle not in database.EXPORT_SPALTEN:
+        raise ExportFehler(f"Unbekannte Tabelle '{tabelle}' (möglich: {', '.join(database.EXPORT_SPALTEN)}).")
+    if format not in FORMATE:
+        raise ExportFehler(f"Unbekanntes Format '{format}' (möglich: {', '.join(FORMATE)}).")
+    if format == 'parquet':
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ExportFehler("Für den Parquet-Export muss pyarrow installiert sein.") from None
+
+def csv_stream(tabelle, **filter):
+    """Erzeugt die CSV-Datei stückweise: Kopfzeile, dann ein Textblock pro gelesenem Zeilenblock."""
+    puffer = io.StringIO()
+    writer = csv.writer(puffer)
+    writer.writerow(database.EXPORT_SPALTEN[tabelle])
+    yield puffer.getvalue()
+    for rows in database.iter_export_bloecke(tabelle, **filter):
+        puffer.seek(0)
+        puffer.truncate()
+        writer.writerows(rows)
+        yield puffer.getvalue()
+
+def schreibe_csv(tabelle, datei, **filter):
+    """Schreibt die Tabelle als CSV in eine geöffnete Textdatei. Gibt die Anzahl der Zeilen zurück."""
+    writer = csv.writer(datei)
+    writer.writerow(database.EXPORT_SPALTEN[tabelle])
+    zeilen = 0
+    for rows in database.iter_export_bloecke(tabelle, **filter):
+        writer.writerows(rows)
+        zeilen += len(rows)
+    return zeilen
+
+def schreibe_parquet(tabelle, ziel, blockgroesse=50000, **filter):
+    """
+    Schreibt die Tabelle als Parquet (zstd-komprimiert) nach ziel (Pfad oder Binärdatei).
+    Jeder gelesene Block wird zu einer eigenen Row Group. Gibt die Anzahl der Zeilen zurück.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    spalten = database.EXPORT_SPALTEN[tabelle]
+    schema = pa.schema([(name, pa.int64() if name in _INTEGER_SPALTEN else pa.string()) for name in spalten])
+    zeilen = 0
+    with pq.ParquetWriter(ziel, schema, compression='zstd') as writer:
+        for rows in database.iter_export_bloecke(tabelle, blockgroesse=blockgroesse, **filter):
+            arrays = []
+            for name, werte in zip(spalten, zip(*rows)):
+                if name in _INTEGER_SPALTEN:
+                    arrays.append(pa.array(werte, type=pa.int64()))
+                else:
+                    # SQLite-Spalten sind nicht streng typisiert, vereinzelte Zahlen in Textspalten umwandeln
+                    arrays.append(pa.array([w if w is None or isinstance(w, str) else str(w) for w in werte], type=pa.string()))
+            writer.write_batch(pa.record_batch(arrays, schema=schema))
+            zeilen += len(rows)
+    return zeilen
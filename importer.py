@@ -0,0 +1,183 @@
+# importer.py
+"""
+Import ganzer PDF-Archive ohne laufenden Webserver.
+
+Durchsucht ein Verzeichnis rekursiv nach Spielbericht-PDFs, parst sie mit mehreren Prozessen
+und schreibt sie blockweise in die Datenbank. Nach jedem Block werden die verarbeiteten Dateien
+in der Checkpoint-Datei vermerkt; ein abgebrochener Import wird mit demselben Aufruf fortgesetzt.
+
+    python importer.py /pfad/zum/archiv --workers 8 --block 500
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import database
+import main
+
+# Zustände in der Checkpoint-Datei
+IMPORTIERT, VORHANDEN, FEHLER = 'importiert', 'vorhanden', 'fehler'
+
+def finde_pdfs(wurzel):
+    """Alle PDF-Dateien unterhalb von wurzel als absolute Pfade, in stabiler Reihenfolge."""
+    pfade = []
+    for verzeichnis, unterverzeichnisse, dateien in os.walk(wurzel):
+        unterverzeichnisse.sort()
+        pfade.extend(os.path.abspath(os.path.join(verzeichnis, name)) for name in sorted(dateien) if name.lower().endswith('.pdf'))
+    return pfade
+
+def lade_checkpoint(pfad):
+    """Liest die Checkpoint-Datei (eine JSON-Zeile pro Datei); spätere Einträge überschreiben frühere."""
+    stand = {}
+    if not os.path.exists(pfad):
+        return stand
+    with open(pfad, encoding='utf-8') as f:
+        for zeile in f:
+            try:
+                eintrag = json.loads(zeile)
+            except ValueError:
+                continue # Unvollständige letzte Zeile nach einem Abbruch
+            stand[eintrag['datei']] = eintrag
+    return stand
+
+class Checkpoint:
+    """Hängt Einträge an die Checkpoint-Datei an und schreibt sie sofort auf die Platte."""
+
+    def __init__(self, pfad):
+        self._datei = open(pfad, 'a', encoding='utf-8')
+
+    def schreibe(self, eintraege):
+        for eintrag in eintraege:
+            self._datei.write(json.dumps(eintrag, ensure_ascii=False) + '\n')
+        self._datei.flush()
+        os.fsync(self._datei.fileno())
+
+    def close(self):
+        self._datei.close()
+
+class Importlauf:
+    """Zählt Dateien, Zeilen und Fehler eines Laufs für den Abschlussbericht."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.anzahl = {IMPORTIERT: 0, VORHANDEN: 0, FEHLER: 0}
+        self.zeilen = 0
+        self.fehler = []
+
+    def erfasse(self, eintrag):
+        self.anzahl[eintrag['status']] += 1
+        if eintrag['status'] == FEHLER:
+            self.fehler.append(eintrag)
+
+    def bericht(self, uebersprungen):
+        dauer = time.perf_counter() - self.start
+        verarbeitet = sum(self.anzahl.values())
+        print(f"\n{verarbeitet} Datei(en) in {dauer:.1f} s verarbeitet ({uebersprungen} laut Checkpoint bereits erledigt).")
+        print(f"  importiert: {self.anzahl[IMPORTIERT]}, bereits vorhanden: {self.anzahl[VORHANDEN]}, fehlgeschlagen: {self.anzahl[FEHLER]}")
+        if dauer > 0:
+            print(f"  Durchsatz: {verarbeitet / dauer:.1f} Dateien/s, {self.zeilen / dauer:.0f} Zeilen/s")
+        if self.fehler:
+            print("Fehlgeschlagene Dateien:")
+            for eintrag in self.fehler:
+                print(f"  {eintrag['datei']}: {eintrag['grund']}")
+
+def schreibe_block(block, ersetzen, checkpoint, lauf):
+    """Schreibt einen Block geparster Berichte in einer Transaktion und vermerkt ihn im Checkpoint."""
+    eintraege = [eintrag for eintrag, _ in block]
+    zu_schreiben = [(eintrag, data) for eintrag, data in block if data is not None]
+    if zu_schreiben:
+        result = database.insert_spielberichte_bulk([data for _, data in zu_schreiben], chunk_size=len(zu_schreiben),
+                                                    ersetzen=ersetzen, datei_hashes=[e['sha256'] for e, _ in zu_schreiben])
+        lauf.zeilen += result['zeilen']
+        fehler = {index: e for index, _, e in result['fehler']}
+        for index, (eintrag, data) in enumerate(zu_schreiben):
+            eintrag['spielnummer'] = data['spiel_info']['spielnummer']
+            if index not in fehler:
+                eintrag['status'] = IMPORTIERT
+            elif isinstance(fehler[index], database.SpielberichtVorhanden):
+                eintrag['status'] = VORHANDEN
+            else:
+                eintrag['status'], eintrag['grund'] = FEHLER, str(fehler[index])
+    # Erst nach dem Commit vermerken, damit ein Abbruch keine Datei als erledigt hinterlässt
+    checkpoint.schreibe(eintraege)
+    for eintrag in eintraege:
+        lauf.erfasse(eintrag)
+
+def importiere(wurzel, workers, blockgroesse, checkpoint_pfad, ersetzen=False, fehler_wiederholen=False, fehlerbericht=None):
+    pfade = finde_pdfs(wurzel)
+    stand = lade_checkpoint(checkpoint_pfad)
+    erledigt = {pfad for pfad, eintrag in stand.items() if eintrag['status'] != FEHLER or not fehler_wiederholen}
+    offen = [pfad for pfad in pfade if pfad not in erledigt]
+    print(f"{len(pfade)} PDF(s) gefunden, {len(offen)} offen.")
+
+    lauf = Importlauf()
+    checkpoint = Checkpoint(checkpoint_pfad)
+    try:
+        # Bekannte Dateien über den Hash erkennen, ohne sie zu parsen
+        zu_parsen, bekannt = [], []
+        for pfad in offen:
+            with open(pfad, 'rb') as f:
+                sha256 = database.datei_hash(f)
+            spielnummer = None if ersetzen else database.find_importierte_datei(sha256)
+            if spielnummer is not None:
+                bekannt.append({'datei': pfad, 'sha256': sha256, 'status': VORHANDEN, 'spielnummer': spielnummer, 'grund': None})
+            else:
+                zu_parsen.append({'datei': pfad, 'sha256': sha256, 'status': None, 'spielnummer': None, 'grund': None})
+        if bekannt:
+            checkpoint.schreibe(bekannt)
+            for eintrag in bekannt:
+                lauf.erfasse(eintrag)
+
+        block = []
+        ergebnisse = main.parse_pdf_batch([e['datei'] for e in zu_parsen], workers, mit_rohdaten=True,
+                                          bekannte_in=None if ersetzen else database.DB_NAME)
+        for eintrag, (data, fehler) in zip(zu_parsen, ergebnisse):
+            if isinstance(fehler, database.SpielberichtVorhanden):
+                # Am Kopf der ersten Seite erkannt; Hash vermerken, damit der nächste Lauf nicht mehr parst
+                database.register_importierte_datei(eintrag['sha256'], fehler.spielnummer)
+                eintrag['status'], eintrag['spielnummer'] = VORHANDEN, fehler.spielnummer
+            elif fehler is not None:
+                eintrag['status'], eintrag['grund'] = FEHLER, f"{fehler.__class__.__name__}: {fehler}"
+            block.append((eintrag, data))
+            if len(block) >= blockgroesse:
+                schreibe_block(block, ersetzen, checkpoint, lauf)
+                block = []
+        if block:
+            schreibe_block(block, ersetzen, checkpoint, lauf)
+    except KeyboardInterrupt:
+        print("\nAbgebrochen. Der Import wird mit demselben Aufruf ab dem letzten geschriebenen Block fortgesetzt.")
+        lauf.bericht(len(pfade) - len(offen))
+        return 130
+    finally:
+        checkpoint.close()
+
+    lauf.bericht(len(pfade) - len(offen))
+    if fehlerbericht:
+        with open(fehlerbericht, 'w', encoding='utf-8') as f:
+            json.dump(lauf.fehler, f, ensure_ascii=False, indent=2)
+        print(f"Fehlerbericht geschrieben: {fehlerbericht}")
+    return 1 if lauf.fehler else 0
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('archiv', help='Verzeichnis, das rekursiv nach PDFs durchsucht wird')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Parser-Prozesse (Standard: Anzahl CPUs)')
+    parser.add_argument('--block', type=int, default=500, help='Berichte pro Transaktion (Standard: %(default)s)')
+    parser.add_argument('--checkpoint', default='import_checkpoint.jsonl', help='Checkpoint-Datei (Standard: %(default)s)')
+    parser.add_argument('--db', default=database.DB_NAME, help='SQLite-Datenbank (Standard: %(default)s)')
+    parser.add_argument('--ersetzen', action='store_true', help='Bereits vorhandene Spiele neu schreiben statt überspringen')
+    parser.add_argument('--fehler-wiederholen', action='store_true', help='Im Checkpoint als fehlgeschlagen vermerkte Dateien erneut versuchen')
+    parser.add_argument('--fehlerbericht', help='Fehlgeschlagene Dateien zusätzlich als JSON in diese Datei schreiben')
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.archiv):
+        parser.error(f"{args.archiv} ist kein Verzeichnis.")
+    database.DB_NAME = args.db
+    database.init_db()
+    return importiere(args.archiv, args.workers, args.block, args.checkpoint, args.ersetzen, args.fehler_wiederholen,
+                      args.fehlerbericht)
+
+if __name__ == '__main__':
+    sys.exit(main_cli())
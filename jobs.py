@@ -0,0 +1,264 @@
+# jobs.py
+import hashlib
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+import metrics
+
+try:
+    import fcntl
+except ImportError: # Windows: nur ein Serverprozess, Aufträge werden nicht gesperrt
+    fcntl = None
+try:
+    import resource
+except ImportError: # Windows: keine Speichergrenze für Parser-Prozesse
+    resource = None
+
+# Zustände einer einzelnen Datei
+QUEUED, PARSING, INSERTED, DUPLICATE, FAILED = 'queued', 'parsing', 'inserted', 'duplicate', 'failed'
+FINAL_STATES = (INSERTED, DUPLICATE, FAILED)
+
+def begrenze_speicher(limit_bytes):
+    """
+    Initializer für Parser-Prozesse: begrenzt den Adressraum des Prozesses auf limit_bytes.
+    Ein PDF, dessen Auswertung mehr braucht, scheitert dann mit MemoryError, statt den Server
+    in den Swap zu treiben. None oder ein System ohne resource lassen den Prozess unbegrenzt.
+    """
+    if limit_bytes and resource is not None:
+        resource.setrlimit(resource.RLIMIT_AS, (limit_bytes, resource.getrlimit(resource.RLIMIT_AS)[1]))
+
+class ImportQueue:
+    """
+    Hintergrund-Import von Spielberichten.
+
+    Hochgeladene Dateien werden unter <spool_dir>/<job_id>/ abgelegt, der Zustand jedes Auftrags
+    steht in <spool_dir>/<job_id>/job.json. Worker-Threads parsen die Dateien (bei parse_workers > 1
+    in einem Prozesspool) und schreiben sie über insert in die Datenbank. Nach einem Neustart
+    setzt resume() alle nicht abgeschlossenen Dateien wieder in die Warteschlange.
+
+    Mit memory_limit (Bytes) wird immer in einem Prozesspool geparst, dessen Prozesse per
+    begrenze_speicher beschränkt sind, auch bei parse_workers=1.
+
+    Vor dem Parsen entscheidet precheck(sha256), ob die Datei bereits importiert ist; insert
+    erhält die geparsten Daten zusammen mit dem SHA-256 der Datei. Bricht schon parse mit einer
+    sqlite3.IntegrityError ab (Spiel bereits gespeichert), gilt die Datei als Duplikat und
+    duplicate(sha256, fehler) wird aufgerufen.
+
+    Mit workers=0 werden keine Threads gestartet; run_pending() arbeitet die Warteschlange dann
+    im aufrufenden Thread ab (z. B. für Tests).
+
+    Laufen mehrere Serverprozesse auf demselben Spool (ein ImportQueue je WSGI-Worker), bearbeitet
+    jeder nur die Aufträge, deren Sperre (flock auf <job_id>/lock) er hält. Die Sperre bleibt bis zum
+    Abschluss des Auftrags offen; stirbt der Prozess, gibt das Betriebssystem sie frei und resume()
+    eines anderen Prozesses übernimmt den Auftrag.
+    """
+
+    def __init__(self, spool_dir, parse, insert, precheck=None, workers=1, parse_workers=1, duplicate=None, memory_limit=None):
+        self.spool_dir = spool_dir
+        self.parse = parse
+        self.insert = insert
+        self.precheck = precheck
+        self.duplicate = duplicate
+        self.workers = workers
+        self.parse_workers = parse_workers
+        self.memory_limit = memory_limit
+        self._queue = queue.Queue()
+        self._jobs = {}
+        self._claims = {}
+        self._lock = threading.Lock()
+        self._threads = []
+        self._executor = None
+        self._started = False
+
+    def start(self):
+        """Startet die Worker-Threads und übernimmt unterbrochene Aufträge aus dem Spool (idempotent)."""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+            if self.workers > 0 and (self.parse_workers > 1 or self.memory_limit):
+                self._executor = ProcessPoolExecutor(max_workers=max(self.parse_workers, 1), initializer=begrenze_speicher,
+                                                     initargs=(self.memory_limit,))
+            for _ in range(self.workers):
+                thread = threading.Thread(target=self._worker_loop, name='import-worker', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        self.resume()
+
+    def submit(self, uploads):
+        """
+        Legt einen Auftrag an. uploads ist eine Liste von (dateiname, stream); die Streams werden in
+        den Spool kopiert. Gibt die Job-ID sofort zurück, die Verarbeitung läuft im Hintergrund.
+        """
+        job_id = uuid.uuid4().hex
+        job_dir = os.path.join(self.spool_dir, job_id)
+        os.makedirs(job_dir)
+        self._claim(job_id)
+
+        job = {"id": job_id, "status": "running", "erstellt": time.time(), "beendet": None, "dateien": []}
+        for index, (filename, stream) in enumerate(uploads):
+            entry = {"name": filename, "datei": None, "sha256": None, "status": QUEUED, "grund": None, "parse_ms": None, "insert_ms": None}
+            if filename and filename.endswith('.pdf'):
+                entry["datei"] = f"{index:05d}.pdf"
+                sha256 = hashlib.sha256()
+                with open(os.path.join(job_dir, entry["datei"]), 'wb') as target:
+                    for block in iter(lambda: stream.read(1024 * 1024), b''):
+                        sha256.update(block)
+                        target.write(block)
+                entry["sha256"] = sha256.hexdigest()
+            else:
+                entry["status"], entry["grund"] = FAILED, "Keine PDF-Datei"
+            job["dateien"].append(entry)
+
+        with self._lock:
+            self._jobs[job_id] = job
+            self._finish_if_done(job)
+            self._save(job)
+        for index, entry in enumerate(job["dateien"]):
+            if entry["status"] == QUEUED:
+                self._queue.put((job_id, index))
+        return job_id
+
+    def status(self, job_id):
+        """Aktueller Zustand eines Auftrags (Kopie) oder None, wenn er unbekannt ist."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                # Auftrag eines anderen Prozesses: jedes Mal aus dem Spool lesen, er ändert sich dort
+                return self._load(job_id)
+            return json.loads(json.dumps(job))
+
+    def resume(self):
+        """Setzt alle nicht abgeschlossenen Dateien aus dem Spool erneut in die Warteschlange."""
+        if not os.path.isdir(self.spool_dir):
+            return 0
+        resumed = 0
+        for job_id in sorted(os.listdir(self.spool_dir)):
+            with self._lock:
+                if job_id in self._jobs or not self._claim(job_id):
+                    continue
+                job = self._load(job_id)
+                if job is None or job["status"] != "running":
+                    self._release(job_id)
+                    continue
+                self._jobs[job_id] = job
+                pending = [i for i, entry in enumerate(job["dateien"]) if entry["status"] not in FINAL_STATES]
+                for index in pending:
+                    job["dateien"][index]["status"] = QUEUED
+                self._finish_if_done(job)
+                self._save(job)
+            for index in pending:
+                self._queue.put((job_id, index))
+            resumed += len(pending)
+        if resumed:
+            print(f"{resumed} Datei(en) aus unterbrochenen Importaufträgen wieder eingeplant.")
+        return resumed
+
+    def run_pending(self):
+        """Verarbeitet alle wartenden Dateien im aufrufenden Thread."""
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            self._process(*item)
+
+    def _worker_loop(self):
+        while True:
+            item = self._queue.get()
+            try:
+                self._process(*item)
+            except Exception as e:
+                print(f"Import-Worker: unerwarteter Fehler bei {item}: {e}")
+
+    def _process(self, job_id, index):
+        with self._lock:
+            job = self._jobs[job_id]
+            entry = job["dateien"][index]
+            entry["status"] = PARSING
+            self._save(job)
+        path = os.path.join(self.spool_dir, job_id, entry["datei"])
+
+        status, grund, parse_ms, insert_ms = INSERTED, None, None, None
+        started = time.perf_counter()
+        try:
+            if self.precheck is not None and self.precheck(entry["sha256"]):
+                status, grund = DUPLICATE, "Bereits importiert (Vorprüfung)"
+            else:
+                try:
+                    if self._executor is not None:
+                        data = metrics.run_recorded(self._executor, self.parse, path)
+                    else:
+                        data = self.parse(path)
+                except sqlite3.IntegrityError as e:
+                    data = None
+                    status, grund = DUPLICATE, "Bereits importiert (Spielkopf)"
+                    if self.duplicate is not None:
+                        self.duplicate(entry["sha256"], e)
+                parse_ms = round((time.perf_counter() - started) * 1000, 1)
+                if data is not None:
+                    started = time.perf_counter()
+                    try:
+                        self.insert(data, entry["sha256"])
+                    except sqlite3.IntegrityError:
+                        status = DUPLICATE
+                    insert_ms = round((time.perf_counter() - started) * 1000, 1)
+        except Exception as e:
+            status, grund = FAILED, str(e) or e.__class__.__name__
+            print(f"Fehler bei Datei {entry['name']}: {e}")
+
+        with self._lock:
+            entry.update(status=status, grund=grund, parse_ms=parse_ms, insert_ms=insert_ms)
+            self._finish_if_done(job)
+            self._save(job)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def _finish_if_done(self, job):
+        if job["status"] == "running" and all(entry["status"] in FINAL_STATES for entry in job["dateien"]):
+            job["status"], job["beendet"] = "done", time.time()
+
+    def _claim(self, job_id):
+        """Sperrt den Auftrag für diesen Prozess; False, wenn ein anderer Prozess ihn bearbeitet."""
+        if fcntl is None:
+            return True
+        try:
+            lock = open(os.path.join(self.spool_dir, job_id, 'lock'), 'a')
+        except OSError:
+            return False
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock.close()
+            return False
+        self._claims[job_id] = lock
+        return True
+
+    def _release(self, job_id):
+        lock = self._claims.pop(job_id, None)
+        if lock is not None:
+            lock.close()
+
+    def _job_file(self, job_id):
+        return os.path.join(self.spool_dir, job_id, 'job.json')
+
+    def _save(self, job):
+        # Erst vollständig schreiben, dann ersetzen, damit ein Absturz keine halbe Datei hinterlässt
+        path = self._job_file(job["id"])
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(job, f, ensure_ascii=False)
+        os.replace(path + '.tmp', path)
+        if job["status"] != "running":
+            self._release(job["id"])
+
+    def _load(self, job_id):
+        try:
+            with open(self._job_file(job_id), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
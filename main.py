@@ -1,93 +1,172 @@
 # main.py
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify
+from flask import Flask, Request, Response, render_template, request, redirect, url_for, flash, jsonify, g, send_file, stream_with_context
+import atexit
+import click
+import functools
 import pdfplumber
-import io
 import re
 import os
 import sqlite3
+import tempfile
+import threading
+import time
 import database
+import export
+import jobs
+import metrics
+import spielverlauf
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
 
+class SpoolRequest(Request):
+    """
+    Legt jede hochgeladene Datei als benannte temporäre Datei ab (statt kleine Dateien im Speicher zu
+    halten), damit Vorprüfung und Parser-Prozesse sie direkt über den Pfad öffnen können.
+    """
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return tempfile.NamedTemporaryFile('wb+', suffix='.upload')
+
 app = Flask(__name__)
+app.request_class = SpoolRequest
 app.config['SECRET_KEY'] = 'dein-super-geheimer-schluessel-12345'
-
-def find_best_team_match(name_from_action, full_heim_name, full_gast_name):
+# Anzahl der Prozesse, auf die das Parsen mehrerer hochgeladener PDFs verteilt wird (1 = sequenziell)
+app.config['PARSE_WORKERS'] = int(os.environ.get('PARSE_WORKERS', os.cpu_count() or 1))
+app.config['SPIELE_PRO_SEITE'] = int(os.environ.get('SPIELE_PRO_SEITE', 50))
+app.config['READ_CACHE_SIZE'] = int(os.environ.get('READ_CACHE_SIZE', 256))
+# Hintergrund-Import: Spool-Verzeichnis und Anzahl der Worker-Threads
+app.config['SPOOL_DIR'] = os.environ.get('SPOOL_DIR', 'import_spool')
+app.config['IMPORT_WORKERS'] = int(os.environ.get('IMPORT_WORKERS', 2))
+# Obergrenze für die Größe eines Uploads (alle Dateien zusammen), größere Anfragen werden mit 413 abgewiesen.
+# Begrenzt nur die Anfrage, nicht den Speicher beim Parsen, dafür PARSE_MEMORY_MB.
+app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get('MAX_UPLOAD_MB', 512)) * 1024 * 1024
+# Adressraum je Parser-Prozess in MB; gesetzt wird immer in eigenen Prozessen geparst. Leer = unbegrenzt
+app.config['PARSE_MEMORY_MB'] = int(os.environ['PARSE_MEMORY_MB']) if os.environ.get('PARSE_MEMORY_MB') else None
+# SQL-Anweisungen ab dieser Dauer (ms) werden über den Logger handball.slow_query gemeldet; leer = aus
+app.config['SLOW_QUERY_MS'] = float(os.environ['SLOW_QUERY_MS']) if os.environ.get('SLOW_QUERY_MS') else None
+database.init_app(app)
+database.read_cache.maxsize = app.config['READ_CACHE_SIZE']
+if app.config['SLOW_QUERY_MS'] is not None:
+    metrics.slow_query_threshold = app.config['SLOW_QUERY_MS'] / 1000
+
+# Muster der Aktionszeilen, einmal kompiliert
+_AKTION_KLAMMER_PATTERN = re.compile(r'\((\d{1,2}),\s*(.*?)\)$')
+_AKTION_SPIELER_PATTERN = re.compile(r'Spieler\s*(\d{1,2}),\s*(.*)')
+_AKTION_TRENNER = (" durch ", " für ", " von ")
+
+class AktionsParser:
     """
-    Findet die beste Übereinstimmung für einen potenziell verkürzten Mannschaftsnamen.
-    Gibt den vollständigen Namen des Heim- oder Gastteams zurück.
+    Zerlegt die Aktionszeilen eines Spiels und ordnet sie Heim- oder Gastmannschaft zu.
+    Kleinschreibung und Wortmengen der beiden Mannschaftsnamen werden einmal pro Spiel berechnet,
+    die Zuordnung eines (verkürzten) Namens aus dem Protokoll wird gemerkt.
     """
-    if not name_from_action:
-        return None
 
-    name_action_lower = name_from_action.lower()
-    heim_lower = full_heim_name.lower()
-    gast_lower = full_gast_name.lower()
-
-    if name_action_lower == heim_lower or name_action_lower in heim_lower:
-        return full_heim_name
-    if name_action_lower == gast_lower or name_action_lower in gast_lower:
-        return full_gast_name
+    def __init__(self, heim_name, gast_name):
+        self.heim_name = heim_name
+        self.gast_name = gast_name
+        self._heim_lower = heim_name.lower()
+        self._gast_lower = gast_name.lower()
+        self._heim_words = set(self._heim_lower.split())
+        self._gast_words = set(self._gast_lower.split())
+        self._team_cache = {}
+
+    def team(self, name_from_action):
+        """Vollständiger Name des Heim- oder Gastteams für einen Namen aus dem Protokoll (oder None)."""
+        if not name_from_action:
+            return None
+        try:
+            return self._team_cache[name_from_action]
+        except KeyError:
+            team = self._team_cache[name_from_action] = self._match_team(name_from_action)
+            return team
+
+    def _match_team(self, name_from_action):
+        name_action_lower = name_from_action.lower()
+        if name_action_lower in self._heim_lower:
+            return self.heim_name
+        if name_action_lower in self._gast_lower:
+            return self.gast_name
+
+        words_action = set(name_action_lower.split())
+        score_heim = len(words_action & self._heim_words)
+        score_gast = len(words_action & self._gast_words)
+
+        if score_heim > score_gast:
+            return self.heim_name
+        if score_gast > score_heim:
+            return self.gast_name
+        return None
 
-    words_action = set(name_action_lower.split())
-    words_heim = set(heim_lower.split())
-    words_gast = set(gast_lower.split())
+    @staticmethod
+    def parse(aktion_string):
+        """
+        Zerlegt eine Aktions-Zeichenkette in ihre Bestandteile.
+        Kann Formate wie "(17, Team)" und "Spieler 7, Team" verarbeiten.
+        """
+        parsed_data = {"aktionstyp": None, "spieler_name": None, "trikotnummer": None, "mannschaftsname": None}
+        if not aktion_string:
+            return parsed_data
 
-    score_heim = len(words_action.intersection(words_heim))
-    score_gast = len(words_action.intersection(words_gast))
+        aktion_string = aktion_string.strip()
 
-    if score_heim > score_gast:
-        return full_heim_name
-    if score_gast > score_heim:
-        return full_gast_name
+        paren_match = _AKTION_KLAMMER_PATTERN.search(aktion_string)
+        if paren_match:
+            parsed_data["trikotnummer"] = paren_match.group(1)
+            parsed_data["mannschaftsname"] = paren_match.group(2).strip()
+            main_action_part = aktion_string[:paren_match.start()].strip()
 
-    return None
+            for sep in _AKTION_TRENNER:
+                if sep in main_action_part:
+                    parts = main_action_part.split(sep, 1)
+                    parsed_data["aktionstyp"] = parts[0].strip()
+                    parsed_data["spieler_name"] = parts[1].strip()
+                    return parsed_data
 
-def parse_aktion(aktion_string):
-    """
-    Zerlegt eine Aktions-Zeichenkette in ihre Bestandteile.
-    Kann Formate wie "(17, Team)" und "Spieler 7, Team" verarbeiten.
-    """
-    parsed_data = {"aktionstyp": None, "spieler_name": None, "trikotnummer": None, "mannschaftsname": None}
-    if not aktion_string:
-        return parsed_data
+            parsed_data["aktionstyp"] = main_action_part
+            return parsed_data
 
-    aktion_string = aktion_string.strip()
+        for sep in _AKTION_TRENNER:
+            if sep in aktion_string:
+                parts = aktion_string.split(sep, 1)
+                parsed_data["aktionstyp"] = parts[0].strip()
+                rest_string = parts[1].strip()
 
-    paren_match = re.search(r'\((\d{1,2}),\s*(.*?)\)$', aktion_string)
-    if paren_match:
-        parsed_data["trikotnummer"] = paren_match.group(1)
-        parsed_data["mannschaftsname"] = paren_match.group(2).strip()
-        main_action_part = aktion_string[:paren_match.start()].strip()
+                spieler_match = _AKTION_SPIELER_PATTERN.search(rest_string)
+                if spieler_match:
+                    parsed_data["trikotnummer"] = spieler_match.group(1)
+                    parsed_data["mannschaftsname"] = spieler_match.group(2).strip()
+                    parsed_data["spieler_name"] = f"Spieler {parsed_data['trikotnummer']}"
 
-        for sep in [" durch ", " für ", " von "]:
-            if sep in main_action_part:
-                parts = main_action_part.split(sep, 1)
-                parsed_data["aktionstyp"] = parts[0].strip()
-                parsed_data["spieler_name"] = parts[1].strip()
                 return parsed_data
 
-        parsed_data["aktionstyp"] = main_action_part
+        parts = aktion_string.split(' ', 1)
+        parsed_data["aktionstyp"] = parts[0]
+        if len(parts) > 1:
+            parsed_data["mannschaftsname"] = parts[1].strip()
         return parsed_data
 
-    for sep in [" durch ", " für ", " von "]:
-        if sep in aktion_string:
-            parts = aktion_string.split(sep, 1)
-            parsed_data["aktionstyp"] = parts[0].strip()
-            rest_string = parts[1].strip()
+    def parse_zeile(self, aktion_string):
+        """Zerlegt eine Aktionszeile und liefert (bestandteile, vollständiger mannschaftsname oder None)."""
+        parsed_data = self.parse(aktion_string)
+        return parsed_data, self.team(parsed_data["mannschaftsname"])
 
-            spieler_match = re.search(r'Spieler\s*(\d{1,2}),\s*(.*)', rest_string)
-            if spieler_match:
-                parsed_data["trikotnummer"] = spieler_match.group(1)
-                parsed_data["mannschaftsname"] = spieler_match.group(2).strip()
-                parsed_data["spieler_name"] = f"Spieler {parsed_data['trikotnummer']}"
-
-            return parsed_data
+def find_best_team_match(name_from_action, full_heim_name, full_gast_name):
+    """
+    Findet die beste Übereinstimmung für einen potenziell verkürzten Mannschaftsnamen.
+    Gibt den vollständigen Namen des Heim- oder Gastteams zurück.
+    Für viele Zeilen eines Spiels AktionsParser verwenden, der die Teamnamen nur einmal aufbereitet.
+    """
+    if not name_from_action:
+        return None
+    return AktionsParser(full_heim_name, full_gast_name).team(name_from_action)
 
-    parts = aktion_string.split(' ', 1)
-    parsed_data["aktionstyp"] = parts[0]
-    if len(parts) > 1:
-        parsed_data["mannschaftsname"] = parts[1].strip()
-    return parsed_data
+def parse_aktion(aktion_string):
+    """
+    Zerlegt eine Aktions-Zeichenkette in ihre Bestandteile.
+    Kann Formate wie "(17, Team)" und "Spieler 7, Team" verarbeiten.
+    """
+    return AktionsParser.parse(aktion_string)
 
 def parse_player_row(row):
     """Verarbeitet eine einzelne Spielerzeile aus einer Tabelle."""
@@ -95,123 +174,509 @@ def parse_player_row(row):
         return None
 
     sieben_meter_komplett = row[6] or ""
-    sieben_meter_tore, sieben_meter_versuche = ("", "")
+    sieben_meter_tore, sieben_meter_versuche = (None, None)
     if '/' in sieben_meter_komplett:
         teile = sieben_meter_komplett.split('/')
-        sieben_meter_versuche = teile[0].strip()
-        sieben_meter_tore = teile[1].strip()
+        sieben_meter_versuche = database.zahl_oder_none(teile[0])
+        sieben_meter_tore = database.zahl_oder_none(teile[1])
 
     return {
-        "trikotnummer": row[0], "name": row[1], "jahrgang": row[2], "tore": row[5],
+        "trikotnummer": row[0], "name": row[1], "jahrgang": row[2], "tore": database.zahl_oder_none(row[5]),
         "sieben_meter_tore": sieben_meter_tore, "sieben_meter_versuche": sieben_meter_versuche,
         "verwarnung": row[7], "hinausstellung_1": row[8], "hinausstellung_2": row[9],
         "hinausstellung_3": row[10], "disqualifikation": row[11], "aktionen": []
     }
 
-def parse_pdf_data(file_stream):
-    """Extrahiert alle relevanten Daten aus dem PDF-Stream zu einem Dictionary."""
+class PageAnalysis:
+    """
+    Analysiert eine PDF-Seite höchstens einmal pro Extraktionsart.
+    Tabellen, Text und Wörter werden erst beim ersten Zugriff berechnet und danach
+    von allen Extraktionsschritten wiederverwendet.
+    """
+
+    def __init__(self, page, stages):
+        self.page = page
+        self.stages = stages
+        self._tables = None
+        self._table_data = None
+        self._text = None
+        self._words = None
+
+    @property
+    def tables(self):
+        """Gefundene Tabellen (mit Bounding-Box) – ein einziger Lauf des TableFinders."""
+        if self._tables is None:
+            with self.stages.stage('tabellen'):
+                self._tables = self.page.find_tables()
+        return self._tables
+
+    @property
+    def table_data(self):
+        """Zelleninhalte der gefundenen Tabellen, entspricht page.extract_tables()."""
+        if self._table_data is None:
+            tables = self.tables
+            with self.stages.stage('tabellen'):
+                self._table_data = [table.extract() for table in tables]
+        return self._table_data
+
+    @property
+    def text(self):
+        if self._text is None:
+            with self.stages.stage('text'):
+                self._text = self.page.extract_text(x_tolerance=2, y_tolerance=2) or ""
+        return self._text
+
+    @property
+    def words(self):
+        if self._words is None:
+            with self.stages.stage('text'):
+                self._words = self.page.extract_words(use_text_flow=True)
+        return self._words
+
+# Version des Rohdatenformats; erhöhen, wenn extrahiere_rohdaten andere oder zusätzliche Daten liefert
+EXTRAKTION_VERSION = 1
+# Kopf, Spielerlisten und Spielinfos stehen auf den ersten beiden Seiten, danach folgt nur noch das Spielprotokoll
+KOPF_SEITEN = 2
+
+def kopf_spielnummer(tabellen):
+    """Spielnummer aus der Zeile "Spiel/Datum" der Tabellen der ersten Seite, sonst None."""
+    for table in tabellen:
+        for row in table["zeilen"]:
+            if row and row[0] and "Spiel/Datum" in row[0] and row[1]:
+                return row[1].split(',')[0].strip() or None
+    return None
+
+def extrahiere_rohdaten(file_stream, stages=None, kopf_pruefung=None):
+    """
+    Erste Stufe des Parsers: liest mit pdfplumber alles, was die Auswertung benötigt, als
+    JSON-fähiges Dictionary. Kopfseiten mit Tabellen (samt Bounding-Box), Text und Wortpositionen,
+    Protokollseiten nur mit Tabellen. Die Rohdaten werden zum Dateihash gespeichert, damit
+    interpretiere_rohdaten nach Regeländerungen ohne die PDFs erneut laufen kann.
+    kopf_pruefung(tabellen) wird mit den Tabellen der ersten Seite aufgerufen, bevor der Rest
+    gelesen wird, und kann das Parsen mit einer Ausnahme abbrechen.
+    """
+    stages = stages or metrics.Stages()
+    seiten = []
+    with pdfplumber.open(file_stream) as pdf:
+        for nummer, page in enumerate(pdf.pages):
+            analyse = PageAnalysis(page, stages)
+            seite = {"tabellen": [{"bbox": list(table.bbox), "zeilen": zeilen} for table, zeilen in zip(analyse.tables, analyse.table_data)]}
+            if nummer == 0 and kopf_pruefung is not None:
+                kopf_pruefung(seite["tabellen"])
+            if nummer < KOPF_SEITEN:
+                seite["text"] = analyse.text
+                seite["woerter"] = [[word['text'], word['x0'], word['top']] for word in analyse.words]
+            seiten.append(seite)
+    return {"version": EXTRAKTION_VERSION, "seiten": seiten}
+
+def interpretiere_rohdaten(rohdaten, stages=None):
+    """
+    Zweite Stufe des Parsers: baut aus den Rohdaten von extrahiere_rohdaten das Dictionary
+    des Spielberichts (Spielinfos, Kader, Aktionen). Benötigt weder PDF noch pdfplumber.
+    """
+    if rohdaten.get("version") != EXTRAKTION_VERSION:
+        raise ValueError(f"Rohdaten im Format {rohdaten.get('version')}, erwartet {EXTRAKTION_VERSION}; PDF neu importieren.")
+    stages = stages or metrics.Stages()
     data = {
         "spiel_info": {"spielklasse": "n.g.", "spielnummer": "n.g.", "spieldatum": "n.g.", "heimmannschaft": "n.g.", "gastmannschaft": "n.g.", "endstand": "n.g.", "halbzeitstand": "n.g."},
         "spieler_heim": [], "spieler_gast": [], "aktionen_heim": [], "aktionen_gast": [],
     }
-    with pdfplumber.open(file_stream) as pdf:
-        if pdf.pages:
-            try:
-                for table in pdf.pages[0].extract_tables():
-                    for row in table:
-                        if row and row[0] and "Spiel/Datum" in row[0] and row[1]:
-                            parts = row[1].split(',')
-                            data["spiel_info"]["spielnummer"] = parts[0].strip()
-                            # Datumsformat für korrekte Sortierung anpassen
-                            raw_date = parts[1].split(' am ')[1].split(' um')[0].strip()
-                            dt_object = None
+    pages = rohdaten["seiten"]
+    kopf_seiten, protokoll_seiten = pages[:KOPF_SEITEN], pages[KOPF_SEITEN:]
+
+    if pages:
+        try:
+            for table in pages[0]["tabellen"]:
+                for row in table["zeilen"]:
+                    if row and row[0] and "Spiel/Datum" in row[0] and row[1]:
+                        parts = row[1].split(',')
+                        data["spiel_info"]["spielnummer"] = parts[0].strip()
+                        # Datumsformat für korrekte Sortierung anpassen
+                        raw_date = parts[1].split(' am ')[1].split(' um')[0].strip()
+                        dt_object = None
+                        try:
+                            dt_object = datetime.strptime(raw_date, '%d.%m.%Y')
+                        except ValueError:
                             try:
-                                dt_object = datetime.strptime(raw_date, '%d.%m.%Y')
+                                dt_object = datetime.strptime(raw_date, '%d.%m.%y')
                             except ValueError:
-                                try:
-                                    dt_object = datetime.strptime(raw_date, '%d.%m.%y')
-                                except ValueError:
-                                    pass # dt_object bleibt None
-
-                            if dt_object:
-                                data["spiel_info"]["spieldatum"] = dt_object.strftime('%Y-%m-%d')
-                            else:
-                                data["spiel_info"]["spieldatum"] = "n.g."
-                            break
-                    if data["spiel_info"]["spielnummer"] != "n.g.":
+                                pass # dt_object bleibt None
+
+                        if dt_object:
+                            data["spiel_info"]["spieldatum"] = dt_object.strftime('%Y-%m-%d')
+                        else:
+                            data["spiel_info"]["spieldatum"] = "n.g."
                         break
-            except (ValueError, IndexError):
-                pass
+                if data["spiel_info"]["spielnummer"] != "n.g.":
+                    break
+        except (ValueError, IndexError):
+            pass
+
+    full_text = "".join([p["text"] for p in kopf_seiten])
+
+    for page in kopf_seiten:
+        gast_y_pos = None
+        for text, _, top in page["woerter"]:
+            if 'gast' in text.lower():
+                gast_y_pos = top
+                break
+
+        for table in page["tabellen"]:
+            is_guest_table = gast_y_pos is not None and table["bbox"][1] > gast_y_pos
+            target_list = data["spieler_gast"] if is_guest_table else data["spieler_heim"]
+            for row in table["zeilen"]:
+                player_data = parse_player_row(row)
+                if player_data and not any(p['trikotnummer'] == player_data['trikotnummer'] for p in target_list):
+                    target_list.append(player_data)
+
+    for line in full_text.splitlines():
+        line_strip = line.strip()
+        if line_strip.startswith('Spielklasse'):
+            data["spiel_info"]["spielklasse"] = line.split(':', 1)[1].strip()
+        elif line_strip.startswith('Heim:'):
+            data["spiel_info"]["heimmannschaft"] = line.split(':', 1)[1].strip()
+        elif line_strip.startswith('Gast:'):
+            data["spiel_info"]["gastmannschaft"] = line.split(':', 1)[1].strip()
+        elif 'Endstand' in line:
+            match = re.search(r'Endstand\s*([\d\s:]+)\s*\((\d+:\d+)\)', line)
+            if match:
+                data["spiel_info"]["endstand"], data["spiel_info"]["halbzeitstand"] = match.group(1).strip(), match.group(2).strip()
+
+    data["spiel_info"]["tore_heim"], data["spiel_info"]["tore_gast"] = database.spielstand_als_tore(data["spiel_info"]["endstand"])
+
+    player_map, heim_name, gast_name = {}, data["spiel_info"]["heimmannschaft"], data["spiel_info"]["gastmannschaft"]
+    for p in data["spieler_heim"]:
+        player_map[(heim_name, p["trikotnummer"])] = p
+    for p in data["spieler_gast"]:
+        player_map[(gast_name, p["trikotnummer"])] = p
+
+    aktions_parser = AktionsParser(heim_name, gast_name)
+    with stages.stage('aktionen'):
+        for page in protokoll_seiten:
+            for table in page["tabellen"]:
+                for row in table["zeilen"]:
+                    if not row or len(row) < 4 or not row[3]:
+                        continue
+                    spielzeit, spielstand, aktion_string = row[1], row[2], row[3]
+                    parsed_details, team_context = aktions_parser.parse_zeile(aktion_string)
+                    if not team_context:
+                        continue
+
+                    tore_heim, tore_gast = database.spielstand_als_tore(spielstand)
+                    event = {"spielzeit": spielzeit, "aktion": parsed_details["aktionstyp"], "spielstand": spielstand,
+                             "spielzeit_sekunden": database.spielzeit_in_sekunden(spielzeit), "tore_heim": tore_heim, "tore_gast": tore_gast}
+                    if parsed_details["trikotnummer"]:
+                        player_to_update = player_map.get((team_context, parsed_details["trikotnummer"]))
+                        if player_to_update and parsed_details["aktionstyp"]:
+                            player_to_update["aktionen"].append(event)
+                    elif parsed_details["aktionstyp"]:
+                        if team_context == heim_name:
+                            data["aktionen_heim"].append(event)
+                        else:
+                            data["aktionen_gast"].append(event)
+    return data
 
-        full_text = "".join([p.extract_text(x_tolerance=2, y_tolerance=2) or "" for p in pdf.pages])
+class _KopfPruefung:
+    """Bricht das Parsen nach den Tabellen der ersten Seite ab, wenn die Spielnummer in db_name schon gespeichert ist."""
 
-        for page in pdf.pages:
-            if page.page_number > 2:
-                continue
-            gast_y_pos = None
+    def __init__(self, db_name):
+        self.db_name = db_name
+
+    def __call__(self, tabellen):
+        spielnummer = kopf_spielnummer(tabellen)
+        if spielnummer and database.spiel_existiert(spielnummer, self.db_name):
+            raise database.SpielberichtVorhanden(spielnummer)
+
+def parse_pdf_data(file_stream, mit_rohdaten=False, bekannte_in=None):
+    """
+    Extrahiert alle relevanten Daten aus dem PDF-Stream zu einem Dictionary.
+    Mit mit_rohdaten=True liegen die komprimierten Rohdaten zusätzlich unter '_rohdaten';
+    insert_spielbericht_data legt sie dann zum Hash der Datei ab.
+    Mit bekannte_in (Pfad der Datenbank) wird nach der Kopftabelle der ersten Seite geprüft, ob das
+    Spiel dort schon gespeichert ist; dann endet das Parsen vorzeitig mit SpielberichtVorhanden.
+    """
+    # Dauer von Tabellen-/Textextraktion und Aktionsauswertung für /metrics
+    stages = metrics.Stages()
+    start = time.perf_counter()
+    rohdaten = extrahiere_rohdaten(file_stream, stages, _KopfPruefung(bekannte_in) if bekannte_in else None)
+    data = interpretiere_rohdaten(rohdaten, stages)
+    if mit_rohdaten:
+        data["_rohdaten"] = database.packe_rohdaten(rohdaten)
+    stages.add('gesamt', time.perf_counter() - start)
+    stages.observe()
+    return data
+
+def werte_rohdaten_aus(gepackt):
+    """Wertet komprimiert gespeicherte Rohdaten aus (Worker-Funktion für neu_auswerten)."""
+    return interpretiere_rohdaten(database.entpacke_rohdaten(gepackt))
+
+def _speichergrenze():
+    """Speichergrenze der Parser-Prozesse in Bytes aus PARSE_MEMORY_MB, sonst None."""
+    megabytes = app.config['PARSE_MEMORY_MB']
+    return megabytes * 1024 * 1024 if megabytes else None
+
+# Gemeinsamer Prozesspool für Parsen und Neuauswertung, beim ersten Gebrauch angelegt
+_parser_pool = None
+_parser_pool_groesse = 0
+_parser_pool_limit = None
+_parser_pool_lock = threading.Lock()
+
+def _hole_parser_pool(workers, limit):
+    """
+    Liefert den gemeinsamen Prozesspool mit mindestens workers Prozessen. Er wird nur neu angelegt,
+    wenn mehr Prozesse oder eine andere Speichergrenze verlangt werden; der alte Pool arbeitet seine
+    laufenden Aufträge noch ab.
+    """
+    global _parser_pool, _parser_pool_groesse, _parser_pool_limit
+    with _parser_pool_lock:
+        if _parser_pool is None or workers > _parser_pool_groesse or limit != _parser_pool_limit:
+            if _parser_pool is not None:
+                _parser_pool.shutdown(wait=False)
+            _parser_pool = ProcessPoolExecutor(max_workers=workers, initializer=jobs.begrenze_speicher, initargs=(limit,))
+            _parser_pool_groesse, _parser_pool_limit = workers, limit
+        return _parser_pool
+
+def _verwerfe_parser_pool(pool=None):
+    """Beendet den gemeinsamen Pool (bzw. nur, wenn er noch pool ist, z. B. nach einem abgestürzten Prozess)."""
+    global _parser_pool
+    with _parser_pool_lock:
+        if _parser_pool is not None and (pool is None or _parser_pool is pool):
+            _parser_pool.shutdown(wait=False)
+            _parser_pool = None
+
+atexit.register(_verwerfe_parser_pool)
+
+def _verarbeite_batch(func, eingaben, workers, begrenzt=True):
+    """
+    Wendet func auf alle Eingaben an und liefert in der ursprünglichen Reihenfolge (ergebnis, fehler).
+    Bei workers > 1 in einem Prozesspool mit höchstens workers Aufträgen gleichzeitig. Ist
+    PARSE_MEMORY_MB gesetzt, läuft func immer im Pool, dessen Prozesse so begrenzt sind; eine
+    Eingabe, die mehr Speicher braucht, liefert MemoryError als Fehler. begrenzt=False bleibt bei
+    workers <= 1 im eigenen Prozess, für Eingaben, die sich nicht an den Pool übergeben lassen.
+    """
+    limit = _speichergrenze() if begrenzt else None
+    if workers <= 1 and not limit:
+        for eingabe in eingaben:
             try:
-                for word in page.extract_words(use_text_flow=True):
-                    if 'gast' in word['text'].lower():
-                        gast_y_pos = word['top']
-                        break
-            except Exception:
-                pass
+                yield func(eingabe), None
+            except Exception as e:
+                yield None, e
+        return
 
-            extracted_tables, found_tables = page.extract_tables(), page.find_tables()
-            if len(extracted_tables) != len(found_tables):
+    workers = max(workers, 1)
+    executor = _hole_parser_pool(workers, limit)
+    in_flight = deque()
+
+    def naechstes():
+        data, e = _future_result(in_flight.popleft())
+        if isinstance(e, BrokenProcessPool): # Ein Prozess ist abgestürzt; der nächste Aufruf legt einen neuen Pool an
+            _verwerfe_parser_pool(executor)
+        return data, e
+
+    try:
+        for eingabe in eingaben:
+            in_flight.append(executor.submit(metrics.Recorded(func), eingabe))
+            if len(in_flight) >= workers:
+                yield naechstes()
+        while in_flight:
+            yield naechstes()
+    except BrokenProcessPool:
+        _verwerfe_parser_pool(executor)
+        raise
+    finally:
+        for future in in_flight: # Abgebrochener Generator: nicht begonnene Aufträge verwerfen
+            future.cancel()
+
+def parse_pdf_batch(sources, workers=1, mit_rohdaten=False, bekannte_in=None):
+    """
+    Parst mehrere PDFs (Dateipfade oder Streams) und liefert für jede Eingabe in der ursprünglichen
+    Reihenfolge ein Tupel (daten, fehler). Bei workers > 1 und Dateipfaden übernimmt ein Prozesspool
+    das Parsen; es sind höchstens workers Dateien gleichzeitig in Arbeit, die Worker öffnen die
+    Dateien selbst, es werden also keine PDF-Inhalte zwischen den Prozessen kopiert.
+    Zu bekannte_in siehe parse_pdf_data; bekannte Spiele liefern SpielberichtVorhanden als Fehler.
+    """
+    sources = list(sources)
+    # Streams lassen sich nicht an andere Prozesse übergeben
+    pfade = all(isinstance(source, str) for source in sources)
+    if len(sources) <= 1 or not pfade:
+        workers = 1
+    parse = functools.partial(parse_pdf_data, mit_rohdaten=mit_rohdaten, bekannte_in=bekannte_in)
+    yield from _verarbeite_batch(parse, sources, min(workers, len(sources)), begrenzt=pfade)
+
+def _future_result(future):
+    try:
+        data, observations = future.result()
+        metrics.replay(observations)
+        return data, None
+    except Exception as e:
+        return None, e
+
+def _uebernehme_namen(data, gespeichert):
+    """
+    Setzt in einem neu ausgewerteten Bericht die gespeicherten Spielernamen ein, soweit sie vom
+    Spielbericht abweichen (manuelle Korrekturen, Kaderlisten). Gibt die Anzahl der Änderungen zurück.
+    """
+    info = data['spiel_info']
+    geaendert = 0
+    for team_type in ['heim', 'gast']:
+        for spieler in data[f'spieler_{team_type}']:
+            name = gespeichert.get((info['spielnummer'], info[f'{team_type}mannschaft'], spieler['trikotnummer']))
+            if name is not None and name != spieler['name']:
+                spieler['name'] = name
+                geaendert += 1
+    return geaendert
+
+def neu_auswerten(workers=1, blockgroesse=500, namen_aus_bericht=False):
+    """
+    Baut alle Spiele, deren Rohdaten gespeichert sind, mit den aktuellen Parser-Regeln neu auf,
+    ohne die PDFs erneut zu lesen. Die Spiele werden blockweise ersetzt. Gespeicherte Spielernamen,
+    die vom Spielbericht abweichen (z. B. aus /spieler/update oder Kaderlisten), bleiben erhalten;
+    mit namen_aus_bericht=True werden sie durch die Namen aus dem Spielbericht ersetzt. Liest der Parser
+    eine andere Spielnummer als gespeichert, wird der Bericht nicht geschrieben, sondern als Fehler gemeldet.
+    Gibt (Anzahl neu geschriebener Spiele, Liste der Fehler als (spielnummer, fehler)) zurück.
+    """
+    quellen = database.get_rohdaten_quellen()
+    print(f"{len(quellen)} Spiel(e) mit gespeicherten Rohdaten, {database.count_spiele() - len(quellen)} ohne (nur durch erneuten PDF-Import).")
+    geschrieben, uebernommen, fehler, block = 0, 0, [], []
+
+    def schreibe():
+        nonlocal geschrieben, uebernommen
+        if not namen_aus_bericht:
+            gespeichert = database.get_spielernamen(data['spiel_info']['spielnummer'] for data, _ in block)
+            uebernommen += sum(_uebernehme_namen(data, gespeichert) for data, _ in block)
+        result = database.insert_spielberichte_bulk([data for data, _ in block], chunk_size=len(block), ersetzen=True,
+                                                    datei_hashes=[sha256 for _, sha256 in block])
+        geschrieben += len(result["importiert"])
+        fehler.extend((spielnummer, e) for _, spielnummer, e in result["fehler"])
+        block.clear()
+
+    gepackt = (database.get_rohdaten(sha256) for _, sha256 in quellen)
+    for (spielnummer, sha256), (data, e) in zip(quellen, _verarbeite_batch(werte_rohdaten_aus, gepackt, workers)):
+        if e is not None:
+            fehler.append((spielnummer, e))
+            continue
+        if data["spiel_info"]["spielnummer"] != spielnummer:
+            # Nicht schreiben: ersetzen würde ein anderes Spiel mit dieser Nummer überschreiben
+            fehler.append((spielnummer, ValueError(f"Spielnummer wird jetzt als {data['spiel_info']['spielnummer']} gelesen; "
+                                                   "beide Spiele bleiben unverändert, Umnummern nur durch erneuten Import.")))
+            continue
+        block.append((data, sha256))
+        if len(block) >= blockgroesse:
+            schreibe()
+    if block:
+        schreibe()
+    if uebernommen:
+        print(f"{uebernommen} geänderte(r) Spielername(n) übernommen (--namen-aus-bericht verwirft sie).")
+    return geschrieben, fehler
+
+def ist_bereits_importiert(sha256):
+    """
+    Vorprüfung vor dem Parsen über den Hash der Datei. Eine andere Datei zu einem bereits gespeicherten
+    Spiel erkennt der Parser an der Kopftabelle der ersten Seite (parse_pdf_data mit bekannte_in),
+    ohne die übrigen Seiten zu lesen; ihr Hash wird dann mit vermerke_duplikat gespeichert.
+    """
+    return database.find_importierte_datei(sha256) is not None
+
+def vermerke_duplikat(sha256, fehler):
+    """Vermerkt den Hash einer Datei, die der Parser als bereits gespeichertes Spiel erkannt hat."""
+    if isinstance(fehler, database.SpielberichtVorhanden):
+        database.register_importierte_datei(sha256, fehler.spielnummer)
+
+def importiere_dateien(uploads, ersetzen=False, workers=1):
+    """
+    Importiert hochgeladene Dateien, übergeben als Liste von (dateiname, stream).
+    Die Dateien werden nicht in den Speicher kopiert: der Hash wird direkt aus dem
+    Stream gelesen, geparst wird über den Pfad der temporären Datei bzw. direkt auf dem Stream.
+    Gibt die Anzahl der importierten, bereits vorhandenen und fehlerhaften Dateien zurück.
+    """
+    success_count = warning_count = error_count = 0
+
+    pending = []
+    for filename, stream in uploads:
+        if not filename.endswith('.pdf'):
+            error_count += 1
+            continue
+        try:
+            sha256 = database.datei_hash(stream)
+            if not ersetzen and ist_bereits_importiert(sha256):
+                warning_count += 1
                 continue
+        except Exception as e:
+            error_count += 1
+            print(f"Fehler bei Datei {filename}: {e}")
+            continue
+        source = getattr(stream, 'name', None)
+        pending.append((filename, sha256, source if isinstance(source, str) else stream))
 
-            for i, table_data in enumerate(extracted_tables):
-                is_guest_table = gast_y_pos is not None and found_tables[i].bbox[1] > gast_y_pos
-                target_list = data["spieler_gast"] if is_guest_table else data["spieler_heim"]
-                for row in table_data:
-                    player_data = parse_player_row(row)
-                    if player_data and not any(p['trikotnummer'] == player_data['trikotnummer'] for p in target_list):
-                        target_list.append(player_data)
-
-        for line in full_text.splitlines():
-            line_strip = line.strip()
-            if line_strip.startswith('Spielklasse'):
-                data["spiel_info"]["spielklasse"] = line.split(':', 1)[1].strip()
-            elif line_strip.startswith('Heim:'):
-                data["spiel_info"]["heimmannschaft"] = line.split(':', 1)[1].strip()
-            elif line_strip.startswith('Gast:'):
-                data["spiel_info"]["gastmannschaft"] = line.split(':', 1)[1].strip()
-            elif 'Endstand' in line:
-                match = re.search(r'Endstand\s*([\d\s:]+)\s*\((\d+:\d+)\)', line)
-                if match:
-                    data["spiel_info"]["endstand"], data["spiel_info"]["halbzeitstand"] = match.group(1).strip(), match.group(2).strip()
-
-        player_map, heim_name, gast_name = {}, data["spiel_info"]["heimmannschaft"], data["spiel_info"]["gastmannschaft"]
-        for p in data["spieler_heim"]:
-            player_map[(heim_name, p["trikotnummer"])] = p
-        for p in data["spieler_gast"]:
-            player_map[(gast_name, p["trikotnummer"])] = p
-
-        if len(pdf.pages) > 2:
-            for page in pdf.pages[2:]:
-                for table in page.extract_tables():
-                    for row in table:
-                        if not row or len(row) < 4 or not row[3]:
-                            continue
-                        spielzeit, spielstand, aktion_string = row[1], row[2], row[3]
-                        parsed_details = parse_aktion(aktion_string)
-
-                        team_context = find_best_team_match(parsed_details["mannschaftsname"], heim_name, gast_name)
-                        if not team_context:
-                            continue
-
-                        event = {"spielzeit": spielzeit, "aktion": parsed_details["aktionstyp"], "spielstand": spielstand}
-                        if parsed_details["trikotnummer"]:
-                            player_to_update = player_map.get((team_context, parsed_details["trikotnummer"]))
-                            if player_to_update and parsed_details["aktionstyp"]:
-                                player_to_update["aktionen"].append(event)
-                        elif parsed_details["aktionstyp"]:
-                            if team_context == heim_name:
-                                data["aktionen_heim"].append(event)
-                            else:
-                                data["aktionen_gast"].append(event)
-    return data
+    # Parsen parallel, Schreiben in die DB weiterhin nacheinander
+    results = parse_pdf_batch([source for _, _, source in pending], workers, mit_rohdaten=True,
+                              bekannte_in=None if ersetzen else database.DB_NAME)
+    for (filename, sha256, _), (extracted_data, parse_error) in zip(pending, results):
+        try:
+            if parse_error is not None:
+                raise parse_error
+            database.insert_spielbericht_data(extracted_data, sha256, ersetzen=ersetzen)
+            success_count += 1
+        except sqlite3.IntegrityError as e:
+            if e is parse_error:
+                vermerke_duplikat(sha256, e)
+            warning_count += 1
+        except Exception as e:
+            error_count += 1
+            print(f"Fehler bei Datei {filename}: {e}")
+
+    return success_count, warning_count, error_count
+
+def parse_fuer_import(path):
+    """Parser der Importwarteschlange; bekannte Spiele enden nach der ersten Seite mit SpielberichtVorhanden."""
+    return parse_pdf_data(path, mit_rohdaten=True, bekannte_in=database.DB_NAME)
+
+import_queue = jobs.ImportQueue(app.config['SPOOL_DIR'], parse=parse_fuer_import,
+                                insert=database.insert_spielbericht_data, precheck=ist_bereits_importiert, duplicate=vermerke_duplikat,
+                                workers=app.config['IMPORT_WORKERS'], parse_workers=app.config['PARSE_WORKERS'],
+                                memory_limit=_speichergrenze())
+
+@app.before_request
+def start_import_queue():
+    """
+    Startet die Import-Worker mit der ersten Anfrage und nimmt unterbrochene Aufträge wieder auf.
+    Jeder WSGI-Worker hat eine eigene Warteschlange; die Sperren in jobs.ImportQueue sorgen dafür,
+    dass ein Auftrag nur von einem Prozess bearbeitet wird.
+    """
+    import_queue.start()
+
+@app.before_request
+def start_request_metrics():
+    g._metrics_start = time.perf_counter()
+    metrics.begin_request()
+
+@app.after_request
+def record_request_metrics(response):
+    """Laufzeit, Anzahl und Dauer der SQL-Anweisungen der Anfrage je Route erfassen."""
+    _observe_request(response.status_code)
+    return response
+
+@app.teardown_request
+def record_failed_request_metrics(exception=None):
+    # Bei unbehandelten Ausnahmen wird after_request nicht aufgerufen
+    if g.get('_metrics_start') is not None:
+        _observe_request(500)
+
+def _observe_request(status):
+    start = g.pop('_metrics_start', None)
+    sql = metrics.end_request()
+    if start is None:
+        return
+    route = request.url_rule.rule if request.url_rule else 'unbekannt'
+    metrics.REQUEST_DURATION.observe(time.perf_counter() - start, method=request.method, route=route, status=status)
+    if sql is not None:
+        metrics.REQUEST_SQL_QUERIES.observe(sql[0], route=route)
+        metrics.REQUEST_SQL_SECONDS.observe(sql[1], route=route)
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Histogramme im Prometheus-Textformat."""
+    return app.response_class(metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
 
 @app.route('/')
 def index():
@@ -227,28 +692,11 @@ def index():
     if spielklasse_filter == "alle":
         spielklasse_filter = None
 
-    spiele_raw = database.get_all_spiele(team_filter, spielklasse_filter, sort_by, order)
-
-    spiele_for_template = []
-    for spiel in spiele_raw:
-        # spiel: (spielnummer, spieldatum_db, heim, gast, endstand, spielklasse_voll)
-        spieldatum_db = spiel[1]
-        display_date = spieldatum_db
-        try:
-            # Konvertiere YYYY-MM-DD zurück zu DD.MM.YYYY für die Anzeige
-            display_date = datetime.strptime(spieldatum_db, '%Y-%m-%d').strftime('%d.%m.%Y')
-        except (ValueError, TypeError):
-            pass # Behalte das Datum aus der DB bei, wenn es nicht dem Format entspricht
-
-        full_spielklasse = spiel[5] or ""
-        abbreviation = ""
-        match = re.search(r'\((.*?)\)', full_spielklasse)
-        if match:
-            abbreviation = match.group(1)
-
-        spiele_for_template.append((spiel[0], display_date, spiel[2], spiel[3], spiel[4], abbreviation))
-
-    spiel_count = len(spiele_for_template)
+    # Anzeigedatum und Spielklassen-Kürzel werden beim Import vorberechnet
+    spiele_for_template, naechste_seite = database.get_spiele_seite(team_filter, spielklasse_filter, sort_by, order,
+                                                                     nach=request.args.get('nach'),
+                                                                     limit=app.config['SPIELE_PRO_SEITE'])
+    spiel_count = database.count_spiele(team_filter, spielklasse_filter)
     teams = database.get_all_teams()
     spielklassen = database.get_all_spielklassen()
 
@@ -257,6 +705,7 @@ def index():
     return render_template('index.html', 
                            spiele=spiele_for_template,
                            spiel_count=spiel_count,
+                           naechste_seite=naechste_seite,
                            teams=teams,
                            spielklassen=spielklassen,
                            current_team_filter=team_filter,
@@ -278,25 +727,10 @@ def upload_file():
         flash('Keine Dateien ausgewählt.', 'warning')
         return redirect(url_for('index'))
 
-    success_count = 0
-    error_count = 0
-    warning_count = 0
-
-    for file in files:
-        if file and file.filename.endswith('.pdf'):
-            try:
-                file.seek(0)
-                file_stream = io.BytesIO(file.read())
-                extracted_data = parse_pdf_data(file_stream)
-                database.insert_spielbericht_data(extracted_data)
-                success_count += 1
-            except sqlite3.IntegrityError:
-                warning_count += 1
-            except Exception as e:
-                error_count += 1
-                print(f"Fehler bei Datei {file.filename}: {e}")
-        else:
-            error_count += 1
+    # Mit ersetzen=1 werden bereits vorhandene Spiele neu eingelesen statt übersprungen
+    ersetzen = request.form.get('ersetzen') == '1'
+    uploads = [(file.filename, file.stream) for file in files if file]
+    success_count, warning_count, error_count = importiere_dateien(uploads, ersetzen, app.config['PARSE_WORKERS'])
 
     if success_count > 0:
         flash(f'{success_count} Spielbericht(e) erfolgreich importiert.', 'success')
@@ -307,6 +741,29 @@ def upload_file():
 
     return redirect(url_for('index'))
 
+@app.errorhandler(413)
+def upload_zu_gross(error):
+    """Upload über MAX_CONTENT_LENGTH: Anfrage abweisen, bevor Dateien gespeichert werden."""
+    flash(f"Der Upload ist zu groß (höchstens {app.config['MAX_CONTENT_LENGTH'] // (1024 * 1024)} MB pro Anfrage).", 'error')
+    return redirect(url_for('index'))
+
+@app.route('/import', methods=['POST'])
+def import_start():
+    """Legt hochgeladene PDFs im Spool ab und gibt sofort die ID des Importauftrags zurück."""
+    files = [f for f in request.files.getlist('pdf_file') if f and f.filename]
+    if not files:
+        return jsonify(error='Keine Dateien ausgewählt.'), 400
+    job_id = import_queue.submit([(f.filename, f.stream) for f in files])
+    return jsonify(job_id=job_id, status_url=url_for('import_status', job_id=job_id)), 202
+
+@app.route('/import/<job_id>')
+def import_status(job_id):
+    """Liefert den Zustand eines Importauftrags pro Datei (inkl. Fehlergrund und Zeiten) als JSON."""
+    job = import_queue.status(job_id)
+    if job is None:
+        return jsonify(error='Unbekannter Importauftrag.'), 404
+    return jsonify(job)
+
 @app.route('/spiel/<spielnummer>')
 def spiel_detail(spielnummer):
     """Zeigt die Detailansicht für ein einzelnes, aus der DB geladenes Spiel."""
@@ -377,6 +834,65 @@ def kopiere_kader_route():
 
     return redirect(url_for('spiel_detail', spielnummer=target_spielnummer))
 
+@app.route('/team/kader_uebertragen', methods=['POST'])
+def kader_uebertragen_route():
+    """Überträgt den Kader eines Spiels auf alle Spiele des Teams (optional Zeitraum/Spielklasse)."""
+    source_spielnummer = request.form['source_spielnummer']
+    mannschaftsname = request.form['mannschaftsname']
+    probelauf = request.form.get('probelauf') == '1'
+    try:
+        source_roster = database.get_roster(source_spielnummer, mannschaftsname)
+        if not source_roster:
+            flash('Der Quell-Kader war leer oder konnte nicht geladen werden.', 'warning')
+        else:
+            result = database.apply_roster_to_season(
+                mannschaftsname, source_roster,
+                von=request.form.get('von') or None,
+                bis=request.form.get('bis') or None,
+                spielklasse=request.form.get('spielklasse') or None,
+                nur_platzhalter=request.form.get('nur_platzhalter') == '1',
+                probelauf=probelauf
+            )
+            if probelauf:
+                flash(f"Probelauf: {result['zeilen']} Namen in {len(result['spiele'])} Spiel(en) würden geändert.", 'info')
+            else:
+                flash(f"Kader übertragen: {result['zeilen']} Namen in {len(result['spiele'])} Spiel(en) geändert.", 'success')
+    except Exception as e:
+        flash(f'Fehler beim Übertragen des Kaders: {e}', 'error')
+
+    return redirect(url_for('spiel_detail', spielnummer=source_spielnummer))
+
+@app.route('/spielernamen/<path:mannschaftsname>')
+def spielernamen(mannschaftsname):
+    """Autovervollständigung der Spielernamen eines Teams als JSON (?q=Präfix&limit=10)."""
+    limit = min(request.args.get('limit', 10, type=int), 50)
+    namen = database.suche_spielernamen(mannschaftsname, request.args.get('q', ''), max(limit, 1))
+    return jsonify(mannschaftsname=mannschaftsname, namen=namen)
+
+@app.route('/suche')
+def suche():
+    """Volltextsuche nach Spielern und Spielen als JSON (?q=Suchbegriff&limit=20)."""
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+    return jsonify(database.suche(request.args.get('q', ''), limit))
+
+@app.route('/spieler/<int:person_id>')
+def spieler_karriere(person_id):
+    """Karrierestatistik eines Spielers über alle Teams, Saisons und Spielklassen als JSON."""
+    karriere = database.get_karriere(person_id)
+    if karriere is None:
+        return jsonify(error=f"Person {person_id} nicht gefunden."), 404
+    return jsonify(karriere)
+
+@app.route('/spieler/zusammenfuehren', methods=['POST'])
+def spieler_zusammenfuehren():
+    """Führt doppelt angelegte Spieler zusammen via AJAX ({"ziel": id, "quellen": [id, ...]})."""
+    try:
+        req_data = request.get_json()
+        zeilen = database.merge_personen(int(req_data['ziel']), [int(person_id) for person_id in req_data['quellen']])
+        return jsonify(success=True, zeilen=zeilen)
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify(success=False, error=str(e)), 400
+
 @app.route('/statistik')
 def statistik_index():
     """Zeigt eine Liste aller Teams für die Statistik-Auswahl an."""
@@ -387,36 +903,134 @@ def statistik_index():
 def team_statistik(mannschaftsname):
     """Zeigt die aggregierten Statistiken für ein ausgewähltes Team an."""
     player_stats = database.get_player_stats_for_team(mannschaftsname)
-    game_results = database.get_team_game_results(mannschaftsname)
+    team_stats = database.get_team_bilanz(mannschaftsname)
+    verlauf = spielverlauf.get_team_verlauf(mannschaftsname)
 
-    team_stats = {
-        "spiele": len(game_results), "siege": 0, "unentschieden": 0, "niederlagen": 0,
-        "tore_geschossen": 0, "tore_kassiert": 0
-    }
+    return render_template('statistik_team.html', mannschaftsname=mannschaftsname,
+                           team_stats=team_stats, player_stats=player_stats, verlauf=verlauf)
 
-    for game in game_results:
-        try:
-            heim_tore, gast_tore = map(int, game['endstand'].replace(' ', '').split(':'))
-            if game['heimmannschaft'] == mannschaftsname:
-                team_stats['tore_geschossen'] += heim_tore
-                team_stats['tore_kassiert'] += gast_tore
-                if heim_tore > gast_tore: team_stats['siege'] += 1
-                elif heim_tore < gast_tore: team_stats['niederlagen'] += 1
-                else: team_stats['unentschieden'] += 1
-            else:
-                team_stats['tore_geschossen'] += gast_tore
-                team_stats['tore_kassiert'] += heim_tore
-                if gast_tore > heim_tore: team_stats['siege'] += 1
-                elif gast_tore < heim_tore: team_stats['niederlagen'] += 1
-                else: team_stats['unentschieden'] += 1
-        except (ValueError, IndexError):
-            continue
+@app.route('/tabelle/<path:spielklasse>')
+def tabelle(spielklasse):
+    """Liefert die Tabelle einer Spielklasse (Punkte, Tordifferenz, Platz) als JSON."""
+    return jsonify(spielklasse=spielklasse, tabelle=database.get_tabelle(spielklasse))
 
-    return render_template('statistik_team.html', mannschaftsname=mannschaftsname,
-                           team_stats=team_stats, player_stats=player_stats)
+def _export_filter(args):
+    return {name: args.get(name) or None for name in ('team', 'spielklasse', 'von', 'bis')}
 
+@app.route('/export/<tabelle>.<format>')
+def export_route(tabelle, format):
+    """Exportiert eine Tabelle als CSV (gestreamt) oder Parquet; Filter ?team=&spielklasse=&von=&bis=."""
+    try:
+        export.pruefe(tabelle, format)
+    except export.ExportFehler as e:
+        return jsonify(error=str(e)), 404 if tabelle not in database.EXPORT_SPALTEN else 400
+    filter = _export_filter(request.args)
+    dateiname = f"{tabelle}.{format}"
+
+    if format == 'csv':
+        return Response(stream_with_context(export.csv_stream(tabelle, **filter)), mimetype='text/csv',
+                        headers={'Content-Disposition': f'attachment; filename="{dateiname}"'})
+
+    # Parquet schreibt die Metadaten erst am Ende, daher über eine temporäre Datei statt im Speicher
+    datei = tempfile.TemporaryFile()
+    export.schreibe_parquet(tabelle, datei, **filter)
+    datei.seek(0)
+    return send_file(datei, mimetype='application/vnd.apache.parquet', as_attachment=True, download_name=dateiname)
+
+@app.route('/cache/statistik')
+def cache_statistik():
+    """Liefert Treffer- und Fehltrefferzähler des Lese-Caches als JSON."""
+    return jsonify(database.read_cache.stats())
+
+
+@app.cli.command('abfragen-pruefen')
+def abfragen_pruefen_command():
+    """Prüft, ob die häufigen Abfragen Indizes verwenden (Exit-Code 1 bei Tabellenscans)."""
+    database.init_db()
+    full_scans = database.check_query_plans()
+    for name, plan in full_scans.items():
+        print(f"Tabellenscan in {name}: {'; '.join(plan)}")
+    if full_scans:
+        raise SystemExit(1)
+    print(f"Alle {len(database.HOT_QUERIES)} Abfragen verwenden Indizes.")
+
+@app.cli.command('statistik-pruefen')
+@click.option('--reparieren', is_flag=True, help='Abweichende Spiele aus den Rohdaten neu berechnen.')
+def statistik_pruefen_command(reparieren):
+    """Vergleicht die vorberechnete Spielerstatistik mit den Rohdaten."""
+    database.init_db()
+    abweichend = database.verify_spieler_statistik()
+    if not abweichend:
+        print("Spielerstatistik ist konsistent.")
+        return
+    print(f"{len(abweichend)} Spiel(e) mit abweichender Statistik: {', '.join(abweichend)}")
+    if reparieren:
+        database.rebuild_spieler_statistik(abweichend)
+    else:
+        raise SystemExit(1)
+
+@app.cli.command('duplikate-bereinigen')
+def duplikate_bereinigen_command():
+    """Entfernt Kader- und Aktionszeilen aus mehrfach importierten Spielberichten."""
+    database.init_db()
+    result = database.remove_duplicate_rows()
+    if not result['spiele']:
+        print("Keine doppelten Zeilen gefunden.")
+        return
+    print(f"{len(result['spiele'])} Spiel(e) bereinigt: {result['spieler']} Kaderzeilen, "
+          f"{result['spieler_aktionen']} Spieleraktionen, {result['mannschafts_aktionen']} Mannschaftsaktionen entfernt.")
+
+@app.cli.command('spieler-zusammenfuehren')
+@click.argument('ziel', type=int)
+@click.argument('quellen', type=int, nargs=-1, required=True)
+def spieler_zusammenfuehren_command(ziel, quellen):
+    """Führt die Personen QUELLEN mit der Person ZIEL zusammen (z. B. Schreibvarianten eines Namens)."""
+    database.init_db()
+    try:
+        database.merge_personen(ziel, quellen)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+
+@app.cli.command('neu-auswerten')
+@click.option('--workers', type=int, default=os.cpu_count() or 1, show_default=True, help='Prozesse für die Auswertung.')
+@click.option('--block', 'blockgroesse', type=int, default=500, show_default=True, help='Spiele pro Transaktion.')
+@click.option('--namen-aus-bericht', is_flag=True, help='Geänderte Spielernamen durch die Namen aus dem Spielbericht ersetzen.')
+def neu_auswerten_command(workers, blockgroesse, namen_aus_bericht):
+    """Wertet alle Spiele aus den gespeicherten Rohdaten mit den aktuellen Parser-Regeln neu aus (ohne PDFs)."""
+    database.init_db()
+    start = time.perf_counter()
+    geschrieben, fehler = neu_auswerten(workers, blockgroesse, namen_aus_bericht)
+    print(f"{geschrieben} Spiel(e) in {time.perf_counter() - start:.1f} s neu ausgewertet, {len(fehler)} fehlgeschlagen.")
+    for spielnummer, e in fehler:
+        print(f"  {spielnummer}: {e}")
+    if fehler:
+        raise SystemExit(1)
+
+@app.cli.command('export')
+@click.argument('tabelle', type=click.Choice(list(database.EXPORT_SPALTEN)))
+@click.argument('ausgabe', type=click.Path(dir_okay=False))
+@click.option('--format', 'format', type=click.Choice(export.FORMATE), help='Standard: aus der Dateiendung, sonst csv.')
+@click.option('--team', help='Nur Spiele dieses Teams (Heim oder Gast).')
+@click.option('--spielklasse', help='Nur Spiele dieser Spielklasse.')
+@click.option('--von', help='Nur Spiele ab diesem Datum (YYYY-MM-DD).')
+@click.option('--bis', help='Nur Spiele bis zu diesem Datum (YYYY-MM-DD).')
+def export_command(tabelle, ausgabe, format, team, spielklasse, von, bis):
+    """Exportiert eine Tabelle als CSV oder Parquet in eine Datei."""
+    database.init_db()
+    format = format or ('parquet' if ausgabe.lower().endswith('.parquet') else 'csv')
+    try:
+        export.pruefe(tabelle, format)
+    except export.ExportFehler as e:
+        raise click.ClickException(str(e))
+    filter = {'team': team, 'spielklasse': spielklasse, 'von': von, 'bis': bis}
+    if format == 'parquet':
+        zeilen = export.schreibe_parquet(tabelle, ausgabe, **filter)
+    else:
+        with open(ausgabe, 'w', encoding='utf-8', newline='') as f:
+            zeilen = export.schreibe_csv(tabelle, f, **filter)
+    print(f"{tabelle}: {zeilen} Zeilen nach {ausgabe} exportiert.")
 
 if __name__ == '__main__':
-    if not os.path.exists(database.DB_NAME):
-        database.init_db()
+    # Legt die Datenbank an bzw. migriert eine bestehende Datei auf den aktuellen Schemastand
+    database.init_db()
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
@@ -0,0 +1,176 @@
+# metrics.py
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Obergrenzen der Histogramm-Buckets in Sekunden (wie die Standardwerte des Prometheus-Clients)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+slow_query_log = logging.getLogger('handball.slow_query')
+# Ab dieser Dauer (Sekunden) wird eine SQL-Anweisung ins Slow-Query-Log geschrieben; None = aus
+slow_query_threshold = None
+
+_local = threading.local()
+_registry = {}
+
+class Histogram:
+    """
+    Histogramm im Sinne von Prometheus: kumulative Buckets, Summe und Anzahl je Label-Kombination.
+    Thread-sicher; die Ausgabe im Textformat erzeugt render().
+    """
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        recording = getattr(_local, 'recording', None)
+        if recording is not None:
+            recording.append((self.name, labels, value))
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((key, ([*counts], total, count)) for key, (counts, total, count) in self._series.items())
+        for key, (counts, total, count) in series:
+            labels = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, key)]
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_labels(labels, bound)} {cumulative}")
+            lines.append(f"{self.name}_bucket{_labels(labels, '+Inf')} {count}")
+            lines.append(f"{self.name}_sum{_labels(labels)} {total}")
+            lines.append(f"{self.name}_count{_labels(labels)} {count}")
+        return lines
+
+def _labels(labels, le=None):
+    if le is not None:
+        labels = labels + [f'le="{le}"']
+    return "{" + ",".join(labels) + "}" if labels else ""
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def histogram(name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+    """Legt ein Histogramm an und registriert es für die Ausgabe unter /metrics."""
+    metric = _registry[name] = Histogram(name, documentation, labelnames, buckets)
+    return metric
+
+def render_prometheus():
+    """Alle registrierten Histogramme im Prometheus-Textformat."""
+    lines = []
+    for metric in _registry.values():
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+REQUEST_DURATION = histogram('http_request_duration_seconds', 'Laufzeit der Anfragen je Route.', ('method', 'route', 'status'))
+REQUEST_SQL_QUERIES = histogram('http_request_sql_queries', 'Anzahl der SQL-Anweisungen je Anfrage.', ('route',), QUERY_COUNT_BUCKETS)
+REQUEST_SQL_SECONDS = histogram('http_request_sql_seconds', 'Summe der SQL-Zeit je Anfrage.', ('route',))
+IMPORT_STAGE_SECONDS = histogram('spielbericht_import_stage_seconds', 'Dauer der Import-Stufen je Spielbericht.', ('stage',))
+
+# --- SQL-Zeiten der laufenden Anfrage ---
+
+def begin_request():
+    """Beginnt die Zählung der SQL-Anweisungen für die Anfrage im aktuellen Thread."""
+    _local.sql = [0, 0.0]
+
+def end_request():
+    """Beendet die Zählung und gibt (anzahl, sekunden) zurück bzw. None, wenn keine lief."""
+    sql = getattr(_local, 'sql', None)
+    _local.sql = None
+    return tuple(sql) if sql is not None else None
+
+def record_sql(duration, statement=None, count=True):
+    """
+    Wird von den instrumentierten Cursorn nach jeder Ausführung bzw. jedem Abruf aufgerufen.
+    Mit statement ist die Anweisung abgeschlossen und wird zusätzlich gegen die Slow-Query-Schwelle geprüft.
+    """
+    sql = getattr(_local, 'sql', None)
+    if sql is not None:
+        sql[0] += count
+        sql[1] += duration
+    if statement is not None:
+        check_slow_query(duration, statement)
+
+def check_slow_query(duration, statement):
+    """Meldet eine Anweisung, deren Gesamtdauer (Ausführen und Abholen) die Schwelle erreicht."""
+    if slow_query_threshold is not None and duration >= slow_query_threshold:
+        slow_query_log.warning("Langsame Abfrage (%.1f ms): %s", duration * 1000, " ".join(statement.split()))
+
+# --- Stufen eines Imports ---
+
+class Stages:
+    """Summiert die Dauer benannter Stufen über einen Spielbericht und meldet sie am Ende einmal."""
+
+    def __init__(self):
+        self.durations = {}
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name, duration):
+        self.durations[name] = self.durations.get(name, 0.0) + duration
+
+    def observe(self):
+        for name, duration in self.durations.items():
+            IMPORT_STAGE_SECONDS.observe(duration, stage=name)
+
+# --- Beobachtungen aus Worker-Prozessen ---
+
+@contextmanager
+def recording():
+    """Zeichnet alle Beobachtungen im aktuellen Thread auf, damit ein Worker-Prozess sie zurückgeben kann."""
+    _local.recording = observations = []
+    try:
+        yield observations
+    finally:
+        _local.recording = None
+
+def replay(observations):
+    """Überträgt in einem Worker-Prozess aufgezeichnete Beobachtungen in die Histogramme dieses Prozesses."""
+    for name, labels, value in observations:
+        metric = _registry.get(name)
+        if metric is not None:
+            metric.observe(value, **labels)
+
+class Recorded:
+    """
+    Aufrufbarer Wrapper für ProcessPoolExecutor: führt func aus und liefert (ergebnis, beobachtungen).
+    Im Hauptprozess mit replay() nachtragen, sonst gehen die Messwerte des Workers verloren.
+    """
+
+    def __init__(self, func):
+        self.func = func
+
+    def __call__(self, *args, **kwargs):
+        with recording() as observations:
+            result = self.func(*args, **kwargs)
+        return result, observations
+
+def run_recorded(executor, func, *args):
+    """Führt func im Prozesspool aus, übernimmt dessen Messwerte und gibt das Ergebnis zurück."""
+    result, observations = executor.submit(Recorded(func), *args).result()
+    replay(observations)
+    return result
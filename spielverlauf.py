@@ -0,0 +1,197 @@
+# spielverlauf.py
+"""
+Auswertung des Spielverlaufs aus den Spielständen der gespeicherten Aktionen.
+
+Die Zeitreihen vieler Spiele werden mit einer Abfrage geladen und als NumPy-Arrays gemeinsam
+ausgewertet (Führungswechsel, höchste Führung, Torserien, Tore je 10-Minuten-Abschnitt, Tore rund
+um Hinausstellungen). Die Ergebnisse werden pro Spiel bis zum nächsten Schreibvorgang gecacht.
+"""
+import json
+
+import numpy as np
+
+import database
+from cache import LRUCache
+
+# Abschnitte 0-10, 10-20, ..., 50-60 Minuten und ein gemeinsamer für Verlängerungen
+ABSCHNITT_SEKUNDEN = 600
+ANZAHL_ABSCHNITTE = 7
+# Betrachtetes Fenster vor und nach einer Hinausstellung (Dauer einer Zeitstrafe)
+HINAUSSTELLUNG_SEKUNDEN = 120
+HINAUSSTELLUNG_FELDER = ('anzahl', 'eigene_davor', 'gegner_davor', 'eigene_danach', 'gegner_danach')
+
+verlauf_cache = LRUCache(maxsize=10000)
+
+# Spielindex (Position in der übergebenen Liste), Sekunde, Stand heim/gast und Kennzeichen
+# (1 = Aktion des Heimteams, 2 = Hinausstellung) je Aktion; json_each liefert die Spiele und ihren Index.
+# Der Stand ändert sich nur mit Toren, daher genügen Tor- und Hinausstellungsaktionen.
+_EREIGNISSE_QUERY = """
+    SELECT j.key, e.spielzeit_sekunden, IFNULL(e.tore_heim, -1), IFNULL(e.tore_gast, -1),
+           (e.mannschaftsname = s.heimmannschaft) + 2 * (e.aktionstyp_id IN (SELECT id FROM aktionstypen WHERE ist_hinausstellung))
+    FROM json_each(:spiele) j
+    JOIN spiele s ON s.spielnummer = j.value
+    JOIN {tabelle} e ON e.spielnummer = j.value
+    WHERE e.spielzeit_sekunden IS NOT NULL
+      AND e.aktionstyp_id IN (SELECT id FROM aktionstypen WHERE ist_tor OR ist_hinausstellung)
+"""
+
+def _lade_ereignisse(spielnummern):
+    """Tor- und Hinausstellungsaktionen der Spiele als (n, 5)-Array, Spalten wie in _EREIGNISSE_QUERY."""
+    query = " UNION ALL ".join(_EREIGNISSE_QUERY.format(tabelle=tabelle) for tabelle in ('spieler_aktionen', 'mannschafts_aktionen'))
+    rows = database.get_connection().execute(query, {"spiele": json.dumps(spielnummern)}).fetchall()
+    return np.array(rows, dtype=np.int64).reshape(-1, 5)
+
+def berechne_verlauf(spielnummern):
+    """
+    Wertet die Spielverläufe ohne Cache aus. Liefert {spielnummer: ergebnis} für alle Spiele,
+    zu denen Aktionen mit Spielzeit gespeichert sind; alle Werte aus Sicht von Heim- bzw. Gastteam.
+    """
+    spielnummern = list(dict.fromkeys(spielnummern))
+    ereignisse = _lade_ereignisse(spielnummern)
+    if not len(ereignisse):
+        return {}
+    spiel, zeit, heim, gast, kennzeichen = ereignisse.T
+    ist_heim, hinausstellung = (kennzeichen & 1).astype(bool), (kennzeichen & 2).astype(bool)
+    n = len(spielnummern)
+
+    # Nach Spiel, Spielzeit und Gesamtstand sortieren; ein zusammengesetzter Schlüssel sortiert schneller als lexsort
+    gesamt = heim + gast + 2  # nicht lesbare Stände (-1) ergeben Werte ab 0
+    order = np.argsort((spiel * (zeit.max() + 1) + zeit) * (gesamt.max() + 1) + gesamt, kind='stable')
+    spiel, zeit, heim, gast = spiel[order], zeit[order], heim[order], gast[order]
+    ist_heim, hinausstellung = ist_heim[order], hinausstellung[order]
+    anzahl_ereignisse = np.bincount(spiel, minlength=n)
+
+    # --- Spielstände: nur Aktionen mit lesbarem Stand ---
+    lesbar = (heim >= 0) & (gast >= 0)
+    s_spiel, s_zeit, s_heim, s_gast = spiel[lesbar], zeit[lesbar], heim[lesbar], gast[lesbar]
+    spielbeginn = np.r_[True, s_spiel[1:] != s_spiel[:-1]] if len(s_spiel) else np.zeros(0, dtype=bool)
+    tore_heim = np.diff(s_heim, prepend=0)
+    tore_gast = np.diff(s_gast, prepend=0)
+    tore_heim[spielbeginn] = s_heim[spielbeginn]
+    tore_gast[spielbeginn] = s_gast[spielbeginn]
+    # Korrigierte oder falsch gelesene Stände nicht als negative Tore zählen
+    np.maximum(tore_heim, 0, out=tore_heim)
+    np.maximum(tore_gast, 0, out=tore_gast)
+
+    endstand = np.zeros((n, 2), dtype=np.int64)
+    np.maximum.at(endstand[:, 0], s_spiel, s_heim)
+    np.maximum.at(endstand[:, 1], s_spiel, s_gast)
+
+    # Führung und Führungswechsel (Unentschieden unterbrechen keine Führung)
+    differenz = s_heim - s_gast
+    fuehrung = np.zeros((n, 2), dtype=np.int64)
+    np.maximum.at(fuehrung[:, 0], s_spiel, differenz)
+    np.maximum.at(fuehrung[:, 1], s_spiel, -differenz)
+    mit_fuehrung = differenz != 0
+    vorzeichen, f_spiel = np.sign(differenz[mit_fuehrung]), s_spiel[mit_fuehrung]
+    wechsel = (vorzeichen[1:] != vorzeichen[:-1]) & (f_spiel[1:] == f_spiel[:-1])
+    fuehrungswechsel = np.bincount(f_spiel[1:][wechsel], minlength=n)
+
+    # Torserien: aufeinanderfolgende Tore desselben Teams
+    tor = (tore_heim > 0) | (tore_gast > 0)
+    t_spiel, t_heim = s_spiel[tor], tore_heim[tor] > 0
+    serie_beginn = np.r_[True, (t_heim[1:] != t_heim[:-1]) | (t_spiel[1:] != t_spiel[:-1])] if len(t_spiel) else np.zeros(0, dtype=bool)
+    serie = np.cumsum(serie_beginn) - 1
+    serie_laenge = np.bincount(serie, weights=(tore_heim + tore_gast)[tor]).astype(np.int64)
+    serie_spiel, serie_heim = t_spiel[serie_beginn], t_heim[serie_beginn]
+    laengster_lauf = np.zeros((n, 2), dtype=np.int64)
+    np.maximum.at(laengster_lauf[:, 0], serie_spiel[serie_heim], serie_laenge[serie_heim])
+    np.maximum.at(laengster_lauf[:, 1], serie_spiel[~serie_heim], serie_laenge[~serie_heim])
+
+    # Tore je Abschnitt; ein Tor bei genau 10:00 gehört noch zum ersten Abschnitt
+    abschnitt = np.clip((s_zeit - 1) // ABSCHNITT_SEKUNDEN, 0, ANZAHL_ABSCHNITTE - 1)
+    abschnitte = np.zeros((n, 2, ANZAHL_ABSCHNITTE), dtype=np.int64)
+    np.add.at(abschnitte[:, 0], (s_spiel, abschnitt), tore_heim)
+    np.add.at(abschnitte[:, 1], (s_spiel, abschnitt), tore_gast)
+
+    # Tore in den zwei Minuten vor (einschließlich der Sekunde der Strafe) und nach einer Hinausstellung.
+    # Die kumulierten Tore werden über einen Schlüssel aus Spiel und Sekunde per Binärsuche abgegriffen.
+    schluessel_faktor = int(max(zeit.max(), 0)) + 2 * HINAUSSTELLUNG_SEKUNDEN + 1
+    schluessel = s_spiel * schluessel_faktor + s_zeit
+    kumuliert_heim = np.r_[0, np.cumsum(tore_heim)]
+    kumuliert_gast = np.r_[0, np.cumsum(tore_gast)]
+    h_spiel, h_zeit, h_heim = spiel[hinausstellung], zeit[hinausstellung], ist_heim[hinausstellung]
+    h_schluessel = h_spiel * schluessel_faktor + h_zeit
+
+    def tore_bis(offset):
+        index = np.searchsorted(schluessel, h_schluessel + offset, side='right')
+        return kumuliert_heim[index], kumuliert_gast[index]
+
+    vorher_heim, vorher_gast = tore_bis(-HINAUSSTELLUNG_SEKUNDEN)
+    strafe_heim, strafe_gast = tore_bis(0)
+    nachher_heim, nachher_gast = tore_bis(HINAUSSTELLUNG_SEKUNDEN)
+    davor_heim, davor_gast = strafe_heim - vorher_heim, strafe_gast - vorher_gast
+    danach_heim, danach_gast = nachher_heim - strafe_heim, nachher_gast - strafe_gast
+    werte = np.stack([np.ones(len(h_spiel), dtype=np.int64),
+                      np.where(h_heim, davor_heim, davor_gast), np.where(h_heim, davor_gast, davor_heim),
+                      np.where(h_heim, danach_heim, danach_gast), np.where(h_heim, danach_gast, danach_heim)], axis=1)
+    hinausstellungen = np.zeros((n, 2, len(HINAUSSTELLUNG_FELDER)), dtype=np.int64)
+    np.add.at(hinausstellungen, (h_spiel, np.where(h_heim, 0, 1)), werte)
+
+    # Einmal als Listen umwandeln statt pro Spiel einzelne Array-Zeilen
+    spalten = zip(endstand.tolist(), fuehrungswechsel.tolist(), fuehrung.tolist(), laengster_lauf.tolist(),
+                  abschnitte.tolist(), hinausstellungen.tolist())
+    ergebnisse = {}
+    for index, (stand, wechsel, groesste, lauf, pro_abschnitt, strafen) in enumerate(spalten):
+        if anzahl_ereignisse[index]:
+            ergebnisse[spielnummern[index]] = {
+                "endstand": stand,
+                "fuehrungswechsel": wechsel,
+                "groesste_fuehrung": groesste,
+                "laengster_lauf": lauf,
+                "tore_pro_abschnitt": pro_abschnitt,
+                "hinausstellungen": [dict(zip(HINAUSSTELLUNG_FELDER, seite)) for seite in strafen],
+            }
+    return ergebnisse
+
+def get_verlauf(spielnummern):
+    """
+    Spielverläufe mit Cache: nur Spiele ohne gültigen Cache-Eintrag werden gemeinsam neu berechnet.
+    Spiele ohne auswertbare Aktionen ergeben None. Listen in den Ergebnissen stehen für [heim, gast].
+    """
+    generation = database.get_write_generation()
+    ergebnisse, fehlend = {}, []
+    for spielnummer in dict.fromkeys(spielnummern):
+        eintrag = verlauf_cache.get((database.DB_NAME, spielnummer), generation)
+        if eintrag is LRUCache.MISSING:
+            fehlend.append(spielnummer)
+        else:
+            ergebnisse[spielnummer] = eintrag
+    if fehlend:
+        berechnet = berechne_verlauf(fehlend)
+        for spielnummer in fehlend:
+            ergebnisse[spielnummer] = berechnet.get(spielnummer)
+            verlauf_cache.set((database.DB_NAME, spielnummer), generation, ergebnisse[spielnummer])
+    return ergebnisse
+
+def get_team_verlauf(mannschaftsname):
+    """Fasst die Spielverläufe aller Spiele eines Teams aus dessen Sicht (eigene/gegner) zusammen."""
+    spiele = database.get_spiele_by_team(mannschaftsname)
+    verlaeufe = get_verlauf([spiel['spielnummer'] for spiel in spiele])
+    zusammenfassung = {
+        "spiele": 0, "fuehrungswechsel": 0, "groesste_fuehrung": 0, "groesster_rueckstand": 0,
+        "laengster_lauf": 0, "laengster_gegenlauf": 0,
+        "tore_pro_abschnitt": {"eigene": [0] * ANZAHL_ABSCHNITTE, "gegner": [0] * ANZAHL_ABSCHNITTE},
+        "eigene_hinausstellungen": dict.fromkeys(HINAUSSTELLUNG_FELDER, 0),
+        "gegnerische_hinausstellungen": dict.fromkeys(HINAUSSTELLUNG_FELDER, 0),
+    }
+    for spiel in spiele:
+        verlauf = verlaeufe.get(spiel['spielnummer'])
+        if verlauf is None:
+            continue
+        eigen, gegner = (0, 1) if spiel['heimmannschaft'] == mannschaftsname else (1, 0)
+        zusammenfassung["spiele"] += 1
+        zusammenfassung["fuehrungswechsel"] += verlauf["fuehrungswechsel"]
+        zusammenfassung["groesste_fuehrung"] = max(zusammenfassung["groesste_fuehrung"], verlauf["groesste_fuehrung"][eigen])
+        zusammenfassung["groesster_rueckstand"] = max(zusammenfassung["groesster_rueckstand"], verlauf["groesste_fuehrung"][gegner])
+        zusammenfassung["laengster_lauf"] = max(zusammenfassung["laengster_lauf"], verlauf["laengster_lauf"][eigen])
+        zusammenfassung["laengster_gegenlauf"] = max(zusammenfassung["laengster_gegenlauf"], verlauf["laengster_lauf"][gegner])
+        for i in range(ANZAHL_ABSCHNITTE):
+            zusammenfassung["tore_pro_abschnitt"]["eigene"][i] += verlauf["tore_pro_abschnitt"][eigen][i]
+            zusammenfassung["tore_pro_abschnitt"]["gegner"][i] += verlauf["tore_pro_abschnitt"][gegner][i]
+        for feld in HINAUSSTELLUNG_FELDER:
+            zusammenfassung["eigene_hinausstellungen"][feld] += verlauf["hinausstellungen"][eigen][feld]
+            zusammenfassung["gegnerische_hinausstellungen"][feld] += verlauf["hinausstellungen"][gegner][feld]
+    if zusammenfassung["spiele"]:
+        zusammenfassung["fuehrungswechsel_pro_spiel"] = round(zusammenfassung["fuehrungswechsel"] / zusammenfassung["spiele"], 2)
+    return zusammenfassung
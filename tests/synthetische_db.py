@@ -0,0 +1,47 @@
+# tests/synthetische_db.py
+"""
+Gemeinsame Grundlage der Tests: eine frische SQLite-Datei im Temp-Verzeichnis, migriert und mit
+synthetischen Spielberichten aus benchmarks/generator.py gefüllt. Jeder Test erhält seine eigene
+Datenbank, damit schreibende Tests sich nicht gegenseitig beeinflussen.
+"""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(TEST_DIR, '..'))
+sys.path.insert(0, os.path.join(TEST_DIR, '..', 'benchmarks'))
+
+import database
+import generator
+
+
+class SynthetischeDB(unittest.TestCase):
+    """Testfall mit eigener Datenbank aus anzahl_spiele synthetischen Berichten (self.tmpdir, self.conn)."""
+
+    anzahl_spiele = 40
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        db_name = database.DB_NAME
+        database.DB_NAME = os.path.join(self.tmpdir, 'test.db')
+        self.addCleanup(setattr, database, 'DB_NAME', db_name)
+        self.addCleanup(database.close_connection)
+        database.read_cache.clear()
+        database.migrate()
+        if self.anzahl_spiele:
+            database.insert_spielberichte_bulk(self.berichte(self.anzahl_spiele))
+        self.conn = database.get_connection()
+
+    @staticmethod
+    def berichte(anzahl, seed=1, erste_spielnummer=100000):
+        """Synthetische Spielberichte im Format von main.parse_pdf_data."""
+        return list(generator.erzeuge_spielberichte(anzahl, seed=seed, erste_spielnummer=erste_spielnummer))
+
+    def wert(self, sql, params=()):
+        """Erste Spalte der ersten Zeile einer Abfrage."""
+        row = self.conn.execute(sql, params).fetchone()
+        return row[0] if row else None
@@ -0,0 +1,70 @@
+# tests/test_aktionen.py
+"""Zerlegen der Aktionszeilen (AktionsParser) und Zuordnung verkürzter Mannschaftsnamen."""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(TEST_DIR, '..'))
+sys.path.insert(0, os.path.join(TEST_DIR, '..', 'benchmarks'))
+import generator
+import main
+
+
+class AktionsParserTest(unittest.TestCase):
+
+    def test_formate(self):
+        faelle = {
+            "Tor durch Moritz Klein (11, SV Aldornbach)":
+                {"aktionstyp": "Tor", "spieler_name": "Moritz Klein", "trikotnummer": "11", "mannschaftsname": "SV Aldornbach"},
+            "2-min Strafe für Jan Koch (21, HC Alb)":
+                {"aktionstyp": "2-min Strafe", "spieler_name": "Jan Koch", "trikotnummer": "21", "mannschaftsname": "HC Alb"},
+            "7m-Tor (7, SV Aldornbach)":
+                {"aktionstyp": "7m-Tor", "spieler_name": None, "trikotnummer": "7", "mannschaftsname": "SV Aldornbach"},
+            "Tor durch Spieler 7, SV Aldornbach":
+                {"aktionstyp": "Tor", "spieler_name": "Spieler 7", "trikotnummer": "7", "mannschaftsname": "SV Aldornbach"},
+            "Auszeit HC Albernbach":
+                {"aktionstyp": "Auszeit", "spieler_name": None, "trikotnummer": None, "mannschaftsname": "HC Albernbach"},
+            "": {"aktionstyp": None, "spieler_name": None, "trikotnummer": None, "mannschaftsname": None},
+        }
+        for zeile, erwartet in faelle.items():
+            with self.subTest(zeile=zeile):
+                self.assertEqual(main.parse_aktion(zeile), erwartet)
+                self.assertEqual(main.AktionsParser.parse(zeile), erwartet)
+
+    def test_verkuerzte_mannschaftsnamen(self):
+        parser = main.AktionsParser("HC Albernbach 2", "SV Aldornbach")
+        self.assertEqual(parser.team("HC Albernbach"), "HC Albernbach 2")
+        self.assertEqual(parser.team("aldornbach"), "SV Aldornbach")
+        self.assertEqual(parser.team("Albernbach II HC"), "HC Albernbach 2")
+        self.assertIsNone(parser.team("TV Unbekannt"))
+        self.assertIsNone(parser.team(None))
+        # Gemerkte Zuordnung und Funktion ohne Parser-Objekt liefern dasselbe
+        self.assertEqual(parser.team("HC Albernbach"), main.find_best_team_match("HC Albernbach", "HC Albernbach 2", "SV Aldornbach"))
+
+    def test_parse_zeile(self):
+        parser = main.AktionsParser("HC Albernbach", "SV Aldornbach")
+        bestandteile, team = parser.parse_zeile("Tor durch Jonas Richter (24, Albernbach)")
+        self.assertEqual((bestandteile["trikotnummer"], team), ("24", "HC Albernbach"))
+
+
+class PdfRundlaufTest(unittest.TestCase):
+
+    def test_generierter_bericht_wird_unveraendert_gelesen(self):
+        try:
+            import reportlab  # noqa: F401
+        except ImportError:
+            self.skipTest("reportlab fehlt")
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        for data in generator.erzeuge_spielberichte(2, seed=5):
+            with self.subTest(spielnummer=data['spiel_info']['spielnummer']):
+                pfad = os.path.join(tmpdir, 'bericht.pdf')
+                generator.schreibe_pdf(data, pfad)
+                self.assertEqual(main.parse_pdf_data(pfad), generator.ohne_protokoll(data))
+
+
+if __name__ == '__main__':
+    unittest.main()
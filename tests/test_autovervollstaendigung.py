@@ -0,0 +1,52 @@
+# tests/test_autovervollstaendigung.py
+"""Autovervollständigung der Spielernamen eines Teams (suche_spielernamen und Route /spielernamen)."""
+import unittest
+from unittest import mock
+
+from synthetische_db import SynthetischeDB, database
+
+
+class AutovervollstaendigungTest(SynthetischeDB):
+    anzahl_spiele = 10
+
+    def setUp(self):
+        super().setUp()
+        self.team = self.wert("SELECT heimmannschaft FROM spiele LIMIT 1")
+        spiele = [row[0] for row in self.conn.execute(
+            "SELECT spielnummer FROM spiele WHERE heimmannschaft = ? OR gastmannschaft = ? ORDER BY spielnummer", (self.team, self.team))]
+        self.assertGreaterEqual(len(spiele), 2)
+        self.benenne(spiele[0], 'Müller  Änne')
+        self.benenne(spiele[1], 'müller änne')
+        self.benenne(spiele[0], 'Mül%ler_x', anderer=True)
+        self.benenne(spiele[1], 'Spieler 99', anderer=True)
+
+    def benenne(self, spielnummer, name, anderer=False):
+        trikotnummer = self.wert(f"SELECT trikotnummer FROM spieler WHERE spielnummer = ? AND mannschaftsname = ? ORDER BY trikotnummer {'DESC' if anderer else 'ASC'} LIMIT 1",
+                                 (spielnummer, self.team))
+        database.update_player_name(spielnummer, trikotnummer, self.team, name)
+
+    def namen(self, praefix, limit=10):
+        return [eintrag['name'] for eintrag in database.suche_spielernamen(self.team, praefix, limit)]
+
+    def test_praefix_ohne_gross_klein_und_leerraum(self):
+        self.assertEqual(set(self.namen('MÜLLER   ä')), {'Müller  Änne', 'müller änne'})
+        self.assertEqual(self.namen('mül%'), ['Mül%ler_x'])
+        self.assertEqual(self.namen('mül_'), [])
+        self.assertEqual(self.namen('spieler 9'), [])
+
+    def test_haeufigste_zuerst_und_limit(self):
+        haeufigster = self.conn.execute("""SELECT name, COUNT(*) FROM spieler WHERE mannschaftsname = ? AND name_norm IS NOT NULL
+                                           GROUP BY name ORDER BY 2 DESC, name LIMIT 1""", (self.team,)).fetchone()
+        self.assertEqual(database.suche_spielernamen(self.team, '', 1), [{"name": haeufigster[0], "spiele": haeufigster[1]}])
+        self.assertEqual(len(self.namen('', limit=3)), 3)
+
+    def test_route(self):
+        import main
+        with mock.patch.object(main.import_queue, 'start'):
+            antwort = main.app.test_client().get(f'/spielernamen/{self.team}', query_string={'q': 'müller', 'limit': 500})
+        self.assertEqual(antwort.status_code, 200)
+        self.assertEqual({eintrag['name'] for eintrag in antwort.get_json()['namen']}, {'Müller  Änne', 'müller änne'})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+# tests/test_bulk_insert.py
+"""Gesammelter Import (insert_spielberichte_bulk): Savepoints je Bericht und abgeleitete Tabellen."""
+import unittest
+
+from synthetische_db import SynthetischeDB, database
+
+
+class BulkInsertTest(SynthetischeDB):
+
+    def test_fehlerhafter_bericht_wird_einzeln_zurueckgerollt(self):
+        berichte = self.berichte(3, seed=2, erste_spielnummer=200000)
+        berichte[1]['spieler_heim'][0]['name'] = 'Zacharias Einmalig'
+        del berichte[1]['aktionen_gast']
+        spielnummern = [data['spiel_info']['spielnummer'] for data in berichte]
+
+        result = database.insert_spielberichte_bulk(berichte)
+
+        self.assertEqual(result['importiert'], [spielnummern[0], spielnummern[2]])
+        self.assertEqual([(index, spielnummer) for index, spielnummer, _ in result['fehler']], [(1, spielnummern[1])])
+        self.assertIsInstance(result['fehler'][0][2], KeyError)
+        self.assertIsNone(self.wert("SELECT 1 FROM spiele WHERE spielnummer = ?", (spielnummern[1],)))
+        self.assertEqual(self.wert("SELECT COUNT(*) FROM spieler WHERE spielnummer = ?", (spielnummern[1],)), 0)
+        self.assertEqual(database.verify_spieler_statistik(), [])
+
+    def test_beliebige_ausnahme_rollt_nur_den_bericht_zurueck(self):
+        berichte = self.berichte(3, seed=2, erste_spielnummer=200000)
+        berichte[1]['spieler_gast'][0]['name'] = 17 # kein Text: AttributeError beim Normalisieren
+
+        result = database.insert_spielberichte_bulk(berichte, chunk_size=3)
+
+        self.assertEqual(len(result['importiert']), 2)
+        self.assertIsInstance(result['fehler'][0][2], AttributeError)
+        self.assertEqual(self.wert("SELECT COUNT(*) FROM spiele WHERE spielnummer IN (?, ?)",
+                                   (berichte[0]['spiel_info']['spielnummer'], berichte[2]['spiel_info']['spielnummer'])), 2)
+        self.assertEqual(database.verify_spieler_statistik(), [])
+
+    def test_zurueckgerollter_bericht_hinterlaesst_keine_personen(self):
+        berichte = self.berichte(2, seed=2, erste_spielnummer=200000)
+        berichte[1]['spieler_heim'][0]['name'] = 'Zacharias Einmalig'
+        del berichte[1]['aktionen_gast']
+
+        database.insert_spielberichte_bulk(berichte)
+
+        self.assertIsNone(self.wert("SELECT person_id FROM personen_schluessel WHERE name_norm = 'zacharias einmalig'"))
+        self.assertEqual(self.wert("SELECT COUNT(*) FROM personen p WHERE NOT EXISTS (SELECT 1 FROM spieler s WHERE s.person_id = p.id)"), 0)
+        self.assertEqual(database.suche('Zacharias')['spieler'], [])
+
+    def assertAbgeleiteteAktuell(self):
+        self.assertEqual(database.verify_spieler_statistik(), [])
+        erwartet = self.conn.execute("""SELECT mannschaftsname, name, COUNT(*) FROM spieler WHERE name_norm IS NOT NULL
+                                        GROUP BY mannschaftsname, name ORDER BY 1, 2""").fetchall()
+        self.assertEqual(self.conn.execute("SELECT mannschaftsname, name, spiele FROM spielernamen ORDER BY 1, 2").fetchall(), erwartet)
+        self.assertEqual(self.wert("SELECT COUNT(*) FROM spiele_suche"), self.wert("SELECT COUNT(*) FROM spiele"))
+
+    def test_derselbe_bericht_zweimal_im_block_mit_ersetzen(self):
+        neu = self.berichte(2, seed=3, erste_spielnummer=300000)
+        vorhanden = self.berichte(1)[0]
+        geaendert = self.berichte(1)[0]
+        geaendert['spieler_heim'][0]['name'] = 'Umbenannt Zweitfassung'
+
+        result = database.insert_spielberichte_bulk([neu[0], vorhanden, neu[1], neu[0], geaendert], ersetzen=True)
+
+        self.assertEqual(result['fehler'], [])
+        self.assertAbgeleiteteAktuell()
+        self.assertEqual(self.wert("SELECT spiele FROM spielernamen WHERE name = 'Umbenannt Zweitfassung'"), 1)
+
+    def test_abgeleitete_tabellen_nach_zurueckgerolltem_bericht_und_duplikat(self):
+        berichte = self.berichte(3, seed=3, erste_spielnummer=300000)
+        del berichte[1]['aktionen_heim']
+
+        result = database.insert_spielberichte_bulk(berichte + self.berichte(1))
+
+        self.assertEqual([type(e) for _, _, e in result['fehler']], [KeyError, database.SpielberichtVorhanden])
+        self.assertAbgeleiteteAktuell()
+
+
+if __name__ == '__main__':
+    unittest.main()
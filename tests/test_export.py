@@ -0,0 +1,69 @@
+# tests/test_export.py
+"""Export (export.py, iter_export_bloecke): Blöcke, Filter, CSV-Stream und Parquet."""
+import csv
+import io
+import os
+import unittest
+from unittest import mock
+
+from synthetische_db import SynthetischeDB, database
+import export
+
+
+class ExportTest(SynthetischeDB):
+    anzahl_spiele = 12
+
+    def test_bloecke_und_filter(self):
+        bloecke = list(database.iter_export_bloecke('spieler', blockgroesse=50))
+        self.assertTrue(all(len(block) <= 50 for block in bloecke))
+        self.assertEqual(sum(len(block) for block in bloecke), self.wert("SELECT COUNT(*) FROM spieler"))
+
+        team = self.wert("SELECT heimmannschaft FROM spiele LIMIT 1")
+        spiele = [row[0] for block in database.iter_export_bloecke('spiele', team=team) for row in block]
+        self.assertEqual(spiele, [row[0] for row in self.conn.execute(
+            "SELECT spielnummer FROM spiele WHERE heimmannschaft = ? OR gastmannschaft = ? ORDER BY spielnummer", (team, team))])
+        aktionen = [row for block in database.iter_export_bloecke('spieler_aktionen', team=team) for row in block]
+        self.assertEqual({row[1] for row in aktionen}, set(spiele))
+
+        von, bis = self.conn.execute("SELECT MIN(spieldatum), MAX(spieldatum) FROM spiele").fetchone()
+        self.assertEqual(list(database.iter_export_bloecke('spiele', von=bis, bis=von)), [])
+
+    def test_csv_stream_entspricht_datei(self):
+        stream = "".join(export.csv_stream('spiele'))
+        datei = io.StringIO(newline='')
+        self.assertEqual(export.schreibe_csv('spiele', datei), self.anzahl_spiele)
+        self.assertEqual(stream, datei.getvalue())
+
+        zeilen = list(csv.reader(io.StringIO(stream)))
+        self.assertEqual(tuple(zeilen[0]), database.EXPORT_SPALTEN['spiele'])
+        self.assertEqual(len(zeilen), self.anzahl_spiele + 1)
+
+    def test_csv_wird_blockweise_erzeugt(self):
+        anzahl = self.wert("SELECT COUNT(*) FROM spieler_aktionen")
+        with mock.patch.object(database.InstrumentedCursor, 'fetchall', side_effect=AssertionError("fetchall beim Export")):
+            teile = list(export.csv_stream('spieler_aktionen', blockgroesse=100))
+        self.assertEqual(len(teile), 1 + -(-anzahl // 100))
+
+    def test_parquet(self):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            self.skipTest("pyarrow fehlt")
+        ziel = os.path.join(self.tmpdir, 'spieler.parquet')
+        self.assertEqual(export.schreibe_parquet('spieler', ziel, blockgroesse=100), self.wert("SELECT COUNT(*) FROM spieler"))
+
+        tabelle = pq.read_table(ziel)
+        self.assertEqual(tuple(tabelle.column_names), database.EXPORT_SPALTEN['spieler'])
+        self.assertEqual(tabelle.num_rows, self.wert("SELECT COUNT(*) FROM spieler"))
+        self.assertGreater(pq.ParquetFile(ziel).num_row_groups, 1)
+        self.assertEqual(sum(tabelle.column('tore').to_pylist()), self.wert("SELECT SUM(tore) FROM spieler"))
+
+    def test_unbekannte_tabelle_und_format(self):
+        with self.assertRaises(export.ExportFehler):
+            export.pruefe('personen', 'csv')
+        with self.assertRaises(export.ExportFehler):
+            export.pruefe('spiele', 'xlsx')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+# tests/test_import_duplikate.py
+"""Erkennen bereits importierter Berichte (Dateihash, Spielnummer) und wiederholtes Ersetzen."""
+import os
+import unittest
+from unittest import mock
+
+from synthetische_db import SynthetischeDB, database
+
+
+class DuplikatTest(SynthetischeDB):
+
+    def zeilen(self):
+        return {tabelle: self.wert(f"SELECT COUNT(*) FROM {tabelle}")
+                for tabelle in ('spiele', 'spieler', 'spieler_aktionen', 'mannschafts_aktionen', 'spieler_statistik', 'spiele_suche', 'personen')}
+
+    def test_duplikat_im_sammelimport_vermerkt_den_hash(self):
+        bericht = self.berichte(1)[0]
+        spielnummer = bericht['spiel_info']['spielnummer']
+
+        result = database.insert_spielberichte_bulk([bericht], datei_hashes=['a' * 64])
+
+        self.assertEqual(result['importiert'], [])
+        self.assertIsInstance(result['fehler'][0][2], database.SpielberichtVorhanden)
+        self.assertEqual(database.find_importierte_datei('a' * 64), spielnummer)
+
+    def test_einzelimport_eines_duplikats_vermerkt_den_hash_ohne_rohdaten(self):
+        bericht = self.berichte(1)[0]
+        bericht['_rohdaten'] = b'rohdaten'
+
+        with self.assertRaises(database.SpielberichtVorhanden):
+            database.insert_spielbericht_data(bericht, 'b' * 64)
+
+        self.assertEqual(database.find_importierte_datei('b' * 64), bericht['spiel_info']['spielnummer'])
+        self.assertIsNone(database.get_rohdaten('b' * 64))
+
+    def test_ersetzen_ist_idempotent(self):
+        vorher = self.zeilen()
+        berichte = self.berichte(self.anzahl_spiele)
+
+        for _ in range(2):
+            result = database.insert_spielberichte_bulk(berichte, chunk_size=15, ersetzen=True)
+            self.assertEqual(result['fehler'], [])
+        database.insert_spielbericht_data(berichte[0], ersetzen=True)
+
+        self.assertEqual(self.zeilen(), vorher)
+        self.assertEqual(database.verify_spieler_statistik(), [])
+
+    def test_bekanntes_spiel_wird_am_kopf_der_ersten_seite_erkannt(self):
+        try:
+            import reportlab  # noqa: F401
+        except ImportError:
+            self.skipTest("reportlab fehlt")
+        import generator
+        import main
+        bekannt, neu = self.berichte(1)[0], self.berichte(1, erste_spielnummer=900000)[0]
+        for name, bericht in (('bekannt.pdf', bekannt), ('neu.pdf', neu)):
+            generator.schreibe_pdf(bericht, os.path.join(self.tmpdir, name))
+        gelesen = []
+        original = main.PageAnalysis
+
+        def zaehlende_analyse(*args, **kwargs):
+            gelesen.append(args)
+            return original(*args, **kwargs)
+        patcher = mock.patch.object(main, 'PageAnalysis', side_effect=zaehlende_analyse)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        with self.assertRaises(database.SpielberichtVorhanden) as fehler:
+            main.parse_pdf_data(os.path.join(self.tmpdir, 'bekannt.pdf'), bekannte_in=database.DB_NAME)
+        self.assertEqual(fehler.exception.spielnummer, bekannt['spiel_info']['spielnummer'])
+        self.assertEqual(len(gelesen), 1)
+
+        daten = main.parse_pdf_data(os.path.join(self.tmpdir, 'neu.pdf'), bekannte_in=database.DB_NAME)
+        self.assertEqual(daten['spiel_info']['spielnummer'], neu['spiel_info']['spielnummer'])
+        self.assertGreater(len(gelesen), 2)
+
+        with open(os.path.join(self.tmpdir, 'bekannt.pdf'), 'rb') as f:
+            sha256 = database.datei_hash(f)
+        with open(os.path.join(self.tmpdir, 'bekannt.pdf'), 'rb') as f:
+            main.importiere_dateien([('bekannt.pdf', f)])
+        self.assertEqual(database.find_importierte_datei(sha256), bekannt['spiel_info']['spielnummer'])
+
+
+if __name__ == '__main__':
+    unittest.main()
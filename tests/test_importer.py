@@ -0,0 +1,82 @@
+# tests/test_importer.py
+"""Import ganzer Archive (importer.py): Status je Datei, Checkpoint und Fortsetzen nach einem Abbruch."""
+import os
+import unittest
+
+from synthetische_db import SynthetischeDB, database
+import generator
+import importer
+
+
+class ImporterTest(SynthetischeDB):
+    anzahl_spiele = 2
+
+    def setUp(self):
+        super().setUp()
+        try:
+            import reportlab  # noqa: F401
+        except ImportError:
+            self.skipTest("reportlab fehlt")
+        self.archiv = os.path.join(self.tmpdir, 'archiv')
+        os.makedirs(os.path.join(self.archiv, 'saison'))
+        self.checkpoint = os.path.join(self.tmpdir, 'checkpoint.jsonl')
+        self.neu = self.berichte(3, seed=4, erste_spielnummer=400000)
+        for nummer, data in enumerate(self.neu):
+            generator.schreibe_pdf(data, os.path.join(self.archiv, 'saison', f'neu{nummer}.pdf'))
+        generator.schreibe_pdf(self.berichte(1)[0], os.path.join(self.archiv, 'bekannt.pdf'))
+        with open(os.path.join(self.archiv, 'kaputt.pdf'), 'wb') as f:
+            f.write(b'%PDF-1.4 kein Spielbericht')
+
+    def pfad(self, name):
+        return os.path.abspath(os.path.join(self.archiv, name))
+
+    def status(self):
+        return {os.path.relpath(pfad, self.archiv): eintrag['status'] for pfad, eintrag in importer.lade_checkpoint(self.checkpoint).items()}
+
+    def importiere(self, **kwargs):
+        return importer.importiere(self.archiv, 1, 2, self.checkpoint, **kwargs)
+
+    def test_import_und_erneuter_lauf(self):
+        self.assertEqual(self.importiere(), 1)
+        self.assertEqual(self.status(), {
+            'bekannt.pdf': importer.VORHANDEN, 'kaputt.pdf': importer.FEHLER,
+            os.path.join('saison', 'neu0.pdf'): importer.IMPORTIERT, os.path.join('saison', 'neu1.pdf'): importer.IMPORTIERT,
+            os.path.join('saison', 'neu2.pdf'): importer.IMPORTIERT,
+        })
+        self.assertEqual(self.wert("SELECT COUNT(*) FROM spiele"), self.anzahl_spiele + 3)
+        self.assertEqual(self.wert("SELECT COUNT(*) FROM importierte_dateien"), 4)
+
+        # Zweiter Lauf: alles laut Checkpoint erledigt, nur die fehlerhafte Datei wird auf Wunsch wiederholt
+        zeilen = sum(1 for _ in open(self.checkpoint, encoding='utf-8'))
+        self.assertEqual(self.importiere(), 0)
+        self.assertEqual(sum(1 for _ in open(self.checkpoint, encoding='utf-8')), zeilen)
+        self.assertEqual(self.importiere(fehler_wiederholen=True), 1)
+        self.assertEqual(sum(1 for _ in open(self.checkpoint, encoding='utf-8')), zeilen + 1)
+
+    def test_fortsetzen_nach_abbruch(self):
+        # Stand nach einem Abbruch: ein Block geschrieben, die letzte Zeile nur halb
+        with open(self.pfad(os.path.join('saison', 'neu0.pdf')), 'rb') as f:
+            sha256 = database.datei_hash(f)
+        database.insert_spielbericht_data(self.neu[0], sha256)
+        with open(self.checkpoint, 'w', encoding='utf-8') as f:
+            f.write(f'{{"datei": "{self.pfad(os.path.join("saison", "neu0.pdf"))}", "sha256": "{sha256}", "status": "importiert", '
+                    f'"spielnummer": "{self.neu[0]["spiel_info"]["spielnummer"]}", "grund": null}}\n{{"datei": "{self.archiv}')
+
+        self.importiere()
+
+        status = self.status()
+        self.assertEqual(status[os.path.join('saison', 'neu0.pdf')], importer.IMPORTIERT) # nicht erneut verarbeitet
+        self.assertEqual(status[os.path.join('saison', 'neu1.pdf')], importer.IMPORTIERT)
+        self.assertEqual(status[os.path.join('saison', 'neu2.pdf')], importer.IMPORTIERT)
+        self.assertEqual(self.wert("SELECT COUNT(*) FROM spiele"), self.anzahl_spiele + 3)
+        self.assertEqual(database.verify_spieler_statistik(), [])
+
+    def test_bekanntes_spiel_mit_neuer_datei_wird_am_kopf_erkannt(self):
+        self.importiere()
+        eintrag = importer.lade_checkpoint(self.checkpoint)[self.pfad('bekannt.pdf')]
+        self.assertEqual(eintrag['spielnummer'], self.berichte(1)[0]['spiel_info']['spielnummer'])
+        self.assertEqual(database.find_importierte_datei(eintrag['sha256']), eintrag['spielnummer'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+# tests/test_jobs.py
+"""Importwarteschlange: Einreichen, Spool, Parsen, Einfügen und Status, auch mit zwei Prozessen auf einem Spool."""
+import os
+import unittest
+
+from synthetische_db import SynthetischeDB, database
+import generator
+import jobs
+
+
+class ImportQueueTest(SynthetischeDB):
+    anzahl_spiele = 2
+
+    def setUp(self):
+        super().setUp()
+        try:
+            import reportlab  # noqa: F401
+        except ImportError:
+            self.skipTest("reportlab fehlt")
+        import main
+        self.main = main
+        self.spool_dir = os.path.join(self.tmpdir, 'spool')
+
+    def warteschlange(self):
+        return jobs.ImportQueue(self.spool_dir, parse=self.main.parse_fuer_import, insert=database.insert_spielbericht_data,
+                                precheck=self.main.ist_bereits_importiert, duplicate=self.main.vermerke_duplikat, workers=0)
+
+    def pdf(self, bericht, name):
+        pfad = os.path.join(self.tmpdir, name)
+        generator.schreibe_pdf(bericht, pfad)
+        return pfad
+
+    def einreichen(self, queue, pfade):
+        dateien = [open(pfad, 'rb') for pfad in pfade]
+        try:
+            return queue.submit([(os.path.basename(pfad), f) for pfad, f in zip(pfade, dateien)])
+        finally:
+            for f in dateien:
+                f.close()
+
+    def test_einreichen_bis_status(self):
+        neu = self.berichte(1, erste_spielnummer=900000)[0]
+        pfade = [self.pdf(neu, 'neu.pdf'), self.pdf(self.berichte(1)[0], 'bekannt.pdf')]
+        queue = self.warteschlange()
+
+        job_id = self.einreichen(queue, pfade)
+        self.assertEqual([d['status'] for d in queue.status(job_id)['dateien']], [jobs.QUEUED, jobs.QUEUED])
+        self.assertEqual(len([n for n in os.listdir(os.path.join(self.spool_dir, job_id)) if n.endswith('.pdf')]), 2)
+
+        queue.run_pending()
+
+        job = queue.status(job_id)
+        self.assertEqual(job['status'], 'done')
+        self.assertEqual([d['status'] for d in job['dateien']], [jobs.INSERTED, jobs.DUPLICATE])
+        self.assertEqual(self.wert("SELECT COUNT(*) FROM spiele WHERE spielnummer = ?", (neu['spiel_info']['spielnummer'],)), 1)
+        self.assertEqual([n for n in os.listdir(os.path.join(self.spool_dir, job_id)) if n.endswith('.pdf')], [])
+
+        # Ein zweiter Upload derselben Datei wird schon über den Hash erkannt
+        job_id = self.einreichen(queue, pfade[1:])
+        queue.run_pending()
+        self.assertEqual(queue.status(job_id)['dateien'][0]['grund'], "Bereits importiert (Vorprüfung)")
+
+    @unittest.skipIf(jobs.fcntl is None, "Aufträge werden ohne fcntl nicht gesperrt")
+    def test_auftrag_wird_nur_von_einem_prozess_bearbeitet(self):
+        pfad = self.pdf(self.berichte(1, erste_spielnummer=900000)[0], 'neu.pdf')
+        erste, zweite = self.warteschlange(), self.warteschlange()
+
+        job_id = self.einreichen(erste, [pfad])
+        self.assertEqual(zweite.resume(), 0)
+
+        erste.run_pending()
+        zweite.run_pending()
+        self.assertEqual(zweite.status(job_id)['status'], 'done')
+        self.assertEqual(zweite.status(job_id)['dateien'][0]['status'], jobs.INSERTED)
+
+    @unittest.skipIf(jobs.fcntl is None, "Aufträge werden ohne fcntl nicht gesperrt")
+    def test_verwaister_auftrag_wird_uebernommen(self):
+        pfad = self.pdf(self.berichte(1, erste_spielnummer=900000)[0], 'neu.pdf')
+        abgestuerzt, neu_gestartet = self.warteschlange(), self.warteschlange()
+
+        job_id = self.einreichen(abgestuerzt, [pfad])
+        abgestuerzt._release(job_id) # wie beim Ende des Prozesses
+
+        self.assertEqual(neu_gestartet.resume(), 1)
+        neu_gestartet.run_pending()
+        self.assertEqual(neu_gestartet.status(job_id)['dateien'][0]['status'], jobs.INSERTED)
+
+
+if __name__ == '__main__':
+    unittest.main()
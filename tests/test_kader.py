@@ -0,0 +1,54 @@
+# tests/test_kader.py
+"""Kader auf die Spiele einer Saison übertragen (apply_roster_to_season): Probelauf und Schreiben."""
+import unittest
+
+from synthetische_db import SynthetischeDB, database
+
+
+class KaderTest(SynthetischeDB):
+
+    def setUp(self):
+        super().setUp()
+        self.team = self.wert("SELECT heimmannschaft FROM spiele LIMIT 1")
+        self.trikotnummer = self.wert("SELECT trikotnummer FROM spieler WHERE mannschaftsname = ? GROUP BY trikotnummer ORDER BY COUNT(*) DESC LIMIT 1",
+                                      (self.team,))
+        self.kader = {self.trikotnummer: 'Kader Übernahme'}
+
+    def namen(self):
+        return self.conn.execute("SELECT spielnummer, name FROM spieler WHERE mannschaftsname = ? AND trikotnummer = ? ORDER BY spielnummer",
+                                 (self.team, self.trikotnummer)).fetchall()
+
+    def test_probelauf_schreibt_nichts_und_meldet_dasselbe(self):
+        vorher, generation = self.namen(), database.get_write_generation()
+
+        probe = database.apply_roster_to_season(self.team, self.kader, probelauf=True)
+
+        self.assertEqual(self.namen(), vorher)
+        self.assertEqual(database.get_write_generation(), generation)
+        self.assertEqual(probe['zeilen'], len(vorher))
+        self.assertEqual(probe['spiele'], [spielnummer for spielnummer, _ in vorher])
+
+        self.assertEqual(database.apply_roster_to_season(self.team, self.kader), probe)
+        self.assertEqual({name for _, name in self.namen()}, {'Kader Übernahme'})
+        self.assertEqual(database.verify_spieler_statistik(), [])
+        self.assertEqual(len(database.suche('kader ubernahme')['spieler']), 1)
+        self.assertEqual(self.wert("SELECT COUNT(DISTINCT person_id) FROM spieler WHERE name = 'Kader Übernahme'"), 1)
+
+        # Bereits übernommene Namen zählen nicht erneut
+        self.assertEqual(database.apply_roster_to_season(self.team, self.kader, probelauf=True), {"zeilen": 0, "spiele": []})
+
+    def test_filter_und_nur_platzhalter(self):
+        spiele = [spielnummer for spielnummer, _ in self.namen()]
+        with database.write_transaction() as cursor:
+            cursor.execute("UPDATE spieler SET name = ?, name_norm = NULL WHERE spielnummer = ? AND mannschaftsname = ? AND trikotnummer = ?",
+                           (f'Spieler {self.trikotnummer}', spiele[0], self.team, self.trikotnummer))
+
+        result = database.apply_roster_to_season(self.team, self.kader, nur_platzhalter=True)
+        self.assertEqual(result, {"zeilen": 1, "spiele": [spiele[0]]})
+
+        andere_klasse = database.apply_roster_to_season(self.team, self.kader, spielklasse='Gibt es nicht', probelauf=True)
+        self.assertEqual(andere_klasse, {"zeilen": 0, "spiele": []})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+# tests/test_neu_auswerten.py
+"""Neuauswertung aus gespeicherten Rohdaten (neu_auswerten): Namen, Spielnummern und Dateien."""
+import os
+import unittest
+
+from synthetische_db import SynthetischeDB, database
+import generator
+
+
+class NeuAuswertenTest(SynthetischeDB):
+    anzahl_spiele = 0
+
+    def setUp(self):
+        super().setUp()
+        try:
+            import reportlab  # noqa: F401
+        except ImportError:
+            self.skipTest("reportlab fehlt")
+        import main
+        self.main = main
+        self.berichte_pdf = self.berichte(2, seed=6, erste_spielnummer=600000)
+        dateien = []
+        for data in self.berichte_pdf:
+            pfad = os.path.join(self.tmpdir, f"{data['spiel_info']['spielnummer']}.pdf")
+            generator.schreibe_pdf(data, pfad)
+            dateien.append(open(pfad, 'rb'))
+        try:
+            self.assertEqual(main.importiere_dateien([(os.path.basename(f.name), f) for f in dateien]), (2, 0, 0))
+        finally:
+            for f in dateien:
+                f.close()
+        self.spielnummer = self.berichte_pdf[0]['spiel_info']['spielnummer']
+        self.team = self.berichte_pdf[0]['spiel_info']['heimmannschaft']
+        self.spieler = self.berichte_pdf[0]['spieler_heim'][0]
+
+    def name(self):
+        return self.wert("SELECT name FROM spieler WHERE spielnummer = ? AND mannschaftsname = ? AND trikotnummer = ?",
+                         (self.spielnummer, self.team, self.spieler['trikotnummer']))
+
+    def inhalt(self, spielnummer):
+        """Spielinfo und Kader eines Spiels ohne die beim Neuschreiben vergebenen Zeilen-IDs."""
+        details = database.get_spiel_details(spielnummer)
+        kader = [(s['mannschaftsname'], s['trikotnummer'], s['name'], s['tore'], len(s['aktionen']))
+                 for team_type in ('heim', 'gast') for s in details[f'spieler_{team_type}']]
+        return details['spiel_info'], kader
+
+    def test_korrigierte_namen_bleiben_erhalten(self):
+        database.update_player_name(self.spielnummer, self.spieler['trikotnummer'], self.team, 'Von Hand Korrigiert')
+
+        self.assertEqual(self.main.neu_auswerten(), (2, []))
+        self.assertEqual(self.name(), 'Von Hand Korrigiert')
+        self.assertEqual(database.verify_spieler_statistik(), [])
+        self.assertEqual(len(database.get_rohdaten_quellen()), 2)
+
+        self.assertEqual(self.main.neu_auswerten(namen_aus_bericht=True), (2, []))
+        self.assertEqual(self.name(), self.spieler['name'])
+
+    def test_geaenderte_spielnummer_wird_nicht_geschrieben(self):
+        andere = self.berichte_pdf[1]['spiel_info']['spielnummer']
+        vorher = {spielnummer: self.inhalt(spielnummer) for spielnummer in (self.spielnummer, andere)}
+        sha256 = dict(database.get_rohdaten_quellen())[self.spielnummer]
+        rohdaten = database.entpacke_rohdaten(database.get_rohdaten(sha256))
+        for tabelle in rohdaten['seiten'][0]['tabellen']:
+            for zeile in tabelle['zeilen']:
+                if zeile and zeile[0] and 'Spiel/Datum' in zeile[0]:
+                    zeile[1] = zeile[1].replace(self.spielnummer, andere)
+        with database.write_transaction() as cursor:
+            cursor.execute("UPDATE rohdaten SET daten = ? WHERE sha256 = ?", (database.packe_rohdaten(rohdaten), sha256))
+
+        geschrieben, fehler = self.main.neu_auswerten()
+
+        self.assertEqual(geschrieben, 1)
+        self.assertEqual([spielnummer for spielnummer, _ in fehler], [self.spielnummer])
+        self.assertIn(andere, str(fehler[0][1]))
+        self.assertEqual({spielnummer: self.inhalt(spielnummer) for spielnummer in vorher}, vorher)
+
+    def test_loeschen_entfernt_dateien_und_rohdaten(self):
+        sha256 = dict(database.get_rohdaten_quellen())[self.spielnummer]
+        database.delete_spiel(self.spielnummer)
+
+        self.assertIsNone(database.find_importierte_datei(sha256))
+        self.assertIsNone(database.get_rohdaten(sha256))
+        self.assertEqual(self.main.neu_auswerten(), (1, []))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+# tests/test_parse_speicher.py
+"""Speichergrenze der Parser-Prozesse (PARSE_MEMORY_MB)."""
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import jobs
+import main
+
+
+def belege(megabytes):
+    return len(bytearray(megabytes * 1024 * 1024))
+
+
+@unittest.skipIf(jobs.resource is None, "resource fehlt")
+class SpeichergrenzeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.addCleanup(main._verwerfe_parser_pool)
+
+    def test_parser_prozess_scheitert_oberhalb_der_grenze(self):
+        with mock.patch.dict(main.app.config, PARSE_MEMORY_MB=512):
+            ergebnisse = list(main._verarbeite_batch(belege, [8, 2048], 1))
+
+        self.assertEqual(ergebnisse[0], (8 * 1024 * 1024, None))
+        self.assertIsNone(ergebnisse[1][0])
+        self.assertIsInstance(ergebnisse[1][1], MemoryError)
+
+    def test_ohne_grenze_im_eigenen_prozess(self):
+        with mock.patch.dict(main.app.config, PARSE_MEMORY_MB=None), \
+                mock.patch.object(main, 'ProcessPoolExecutor', side_effect=AssertionError("kein Pool erwartet")):
+            self.assertEqual(list(main._verarbeite_batch(belege, [1], 1)), [(1024 * 1024, None)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+# tests/test_parser_pool.py
+"""Gemeinsamer Prozesspool für _verarbeite_batch."""
+import os
+import sys
+import unittest
+from concurrent.futures.process import BrokenProcessPool
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import main
+
+
+def prozess_id(_):
+    return os.getpid()
+
+
+def absturz(_):
+    os._exit(1)
+
+
+class ParserPoolTest(unittest.TestCase):
+
+    def setUp(self):
+        main._verwerfe_parser_pool()
+        self.addCleanup(main._verwerfe_parser_pool)
+        patcher = mock.patch.dict(main.app.config, PARSE_MEMORY_MB=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def pids(self, anzahl, workers):
+        ergebnisse = list(main._verarbeite_batch(prozess_id, range(anzahl), workers))
+        self.assertTrue(all(e is None for _, e in ergebnisse))
+        return {pid for pid, _ in ergebnisse}
+
+    def test_pool_wird_zwischen_aufrufen_wiederverwendet(self):
+        erste = self.pids(6, 2)
+        pool = main._parser_pool
+        zweite = self.pids(6, 2)
+
+        self.assertIs(main._parser_pool, pool)
+        self.assertNotIn(os.getpid(), erste)
+        self.assertTrue(erste & zweite)
+
+        self.pids(2, 2) # weniger Prozesse verlangt: derselbe Pool
+        self.assertIs(main._parser_pool, pool)
+        self.pids(6, 3)
+        self.assertIsNot(main._parser_pool, pool)
+
+    def test_abgestuerzter_pool_wird_ersetzt(self):
+        ergebnisse = list(main._verarbeite_batch(absturz, [1, 2], 2))
+        self.assertTrue(any(isinstance(e, BrokenProcessPool) for _, e in ergebnisse))
+        self.assertIsNone(main._parser_pool)
+
+        self.assertTrue(self.pids(2, 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
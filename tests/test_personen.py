@@ -0,0 +1,85 @@
+# tests/test_personen.py
+"""Spieleridentitäten: Zuordnung über Name und Jahrgang, fehlender Jahrgang und merge_personen."""
+import unittest
+
+from synthetische_db import SynthetischeDB, database
+
+
+class PersonenTest(SynthetischeDB):
+    anzahl_spiele = 0
+
+    def bericht(self, spielnummer, name, jahrgang, nummer=0):
+        """Ein synthetischer Bericht, in dem der erste Heimspieler name/jahrgang trägt."""
+        data = self.berichte(1, seed=7, erste_spielnummer=spielnummer)[0]
+        spieler = data['spieler_heim'][nummer]
+        spieler['name'], spieler['jahrgang'] = name, jahrgang
+        return data
+
+    def person(self, spielnummer, nummer=0):
+        data = self.berichte(1, seed=7, erste_spielnummer=spielnummer)[0]
+        return self.wert("SELECT person_id FROM spieler WHERE spielnummer = ? AND mannschaftsname = ? AND trikotnummer = ?",
+                         (str(spielnummer), data['spiel_info']['heimmannschaft'], data['spieler_heim'][nummer]['trikotnummer']))
+
+    def test_fehlender_jahrgang_wird_der_einzigen_person_zugeordnet(self):
+        database.insert_spielberichte_bulk([self.bericht(500000, 'Lena Sommer', '2001'), self.bericht(500001, 'lena  sommer', '')])
+        database.insert_spielbericht_data(self.bericht(500002, 'Lena Sommer', None))
+        self.assertEqual(self.person(500000), self.person(500001))
+        self.assertEqual(self.person(500000), self.person(500002))
+
+        # Umgekehrt: zuerst ohne, dann mit Jahrgang
+        database.insert_spielbericht_data(self.bericht(500003, 'Tom Winter', ''))
+        database.insert_spielbericht_data(self.bericht(500004, 'Tom Winter', '1999'))
+        self.assertEqual(self.person(500003), self.person(500004))
+
+    def test_namensvettern_mit_verschiedenem_jahrgang_bleiben_getrennt(self):
+        database.insert_spielberichte_bulk([self.bericht(510000, 'Max Berg', '1990'), self.bericht(510001, 'Max Berg', '2004'),
+                                            self.bericht(510002, 'Max Berg', '')])
+        self.assertEqual(len({self.person(510000), self.person(510001), self.person(510002)}), 3)
+
+    def test_mannschaftsstatistik_fasst_person_ohne_jahrgang_zusammen(self):
+        berichte = [self.bericht(520000, 'Ida Stern', '1995'), self.bericht(520001, 'Ida Stern', '')]
+        andere = self.bericht(520002, 'Ida Stern', '2003')
+        andere['spiel_info']['heimmannschaft'] = 'TSV Anderswo'
+        database.insert_spielberichte_bulk(berichte + [andere])
+        team = berichte[0]['spiel_info']['heimmannschaft']
+
+        zeilen = [row for row in database.get_player_stats_for_team(team) if row['name'] == 'Ida Stern']
+        self.assertEqual(len(zeilen), 1)
+        self.assertEqual(zeilen[0]['spiele'], 2)
+
+    def test_mannschaftsstatistik_zeigt_aktuelle_schreibweise(self):
+        data = self.bericht(530000, 'Pia Mond', '1998')
+        database.insert_spielbericht_data(data)
+        team, trikotnummer = data['spiel_info']['heimmannschaft'], data['spieler_heim'][0]['trikotnummer']
+
+        database.update_player_name('530000', trikotnummer, team, 'PIA MOND')
+
+        self.assertIn('PIA MOND', [row['name'] for row in database.get_player_stats_for_team(team)])
+
+    def test_merge_personen(self):
+        database.insert_spielberichte_bulk([self.bericht(540000, 'Jonas Feld', '2000'), self.bericht(540001, 'Jonas Felt', '2000')])
+        ziel, quelle = self.person(540000), self.person(540001)
+        self.assertNotEqual(ziel, quelle)
+
+        with self.assertRaises(ValueError):
+            database.merge_personen(ziel, [quelle, 999999])
+        self.assertIsNotNone(self.wert("SELECT 1 FROM personen WHERE id = ?", (quelle,)))
+
+        self.assertEqual(database.merge_personen(ziel, [quelle, ziel]), 1)
+
+        self.assertIsNone(self.wert("SELECT 1 FROM personen WHERE id = ?", (quelle,)))
+        self.assertEqual(self.person(540001), ziel)
+        self.assertEqual(self.wert("SELECT COUNT(*) FROM spieler_statistik WHERE person_id = ?", (quelle,)), 0)
+        karriere = database.get_karriere(ziel)
+        self.assertEqual(karriere['gesamt']['spiele'], 2)
+        self.assertEqual({s['name'] for s in karriere['person']['schreibweisen']}, {'Jonas Feld', 'Jonas Felt'})
+        self.assertIsNone(database.get_karriere(quelle))
+
+        # Die Schreibvariante bleibt der Person zugeordnet
+        database.insert_spielbericht_data(self.bericht(540002, 'Jonas Felt', '2000'))
+        self.assertEqual(self.person(540002), ziel)
+        self.assertEqual(database.merge_personen(ziel, [ziel]), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+# tests/test_query_plans.py
+"""
+Regressionstest für die Abfragepläne der Ansichten: Die lesenden Funktionen werden auf einer kleinen
+synthetischen Datenbank aufgerufen, jede dabei tatsächlich ausgeführte Abfrage wird (mit den
+eingesetzten Parametern) per EXPLAIN QUERY PLAN geprüft. Zusätzlich muss check_query_plans,
+das flask abfragen-pruefen verwendet, ohne Befund bleiben.
+
+    python -m pytest tests
+"""
+import unittest
+
+from synthetische_db import SynthetischeDB, database
+
+
+class QueryPlanTest(SynthetischeDB):
+
+    def ausgefuehrte_abfragen(self, aufruf):
+        """Alle SELECT-Anweisungen, die aufruf() ausführt, mit eingesetzten Parametern."""
+        abfragen = []
+        conn = database.get_connection()
+        conn.set_trace_callback(abfragen.append)
+        try:
+            aufruf()
+        finally:
+            conn.set_trace_callback(None)
+        return [abfrage for abfrage in abfragen if abfrage.lstrip().upper().startswith(('SELECT', 'WITH'))]
+
+    def test_ausgefuehrte_abfragen_nutzen_indizes(self):
+        conn = database.get_connection()
+        spielnummer, team, spielklasse = conn.execute("SELECT spielnummer, heimmannschaft, spielklasse FROM spiele LIMIT 1").fetchone()
+        person_id = conn.execute("SELECT person_id FROM spieler WHERE person_id IS NOT NULL LIMIT 1").fetchone()[0]
+        _, nach = database.get_spiele_seite(team_filter=team, limit=2)
+        aufrufe = {
+            "get_spiele_seite": lambda: database.get_spiele_seite(team_filter=team, nach=nach, limit=2),
+            "get_spiele_seite_spielklasse": lambda: database.get_spiele_seite(spielklasse_filter=spielklasse, sort_by='spielnummer', order='asc'),
+            "get_spiele_details": lambda: database.get_spiele_details([spielnummer]),
+            "get_roster": lambda: database.get_roster(spielnummer, team),
+            "get_spiele_by_team": lambda: database.get_spiele_by_team.__wrapped__(team),
+            "get_team_bilanz": lambda: database.get_team_bilanz.__wrapped__(team),
+            "get_tabelle": lambda: database.get_tabelle.__wrapped__(spielklasse),
+            "get_unique_player_names_by_team": lambda: database.get_unique_player_names_by_team.__wrapped__(team),
+            "suche_spielernamen": lambda: database.suche_spielernamen.__wrapped__(team, 'a'),
+            "suche": lambda: database.suche.__wrapped__(team),
+            "get_player_stats_for_team": lambda: database.get_player_stats_for_team.__wrapped__(team),
+            "get_karriere": lambda: database.get_karriere.__wrapped__(person_id),
+        }
+        cursor = conn.cursor()
+        for name, aufruf in aufrufe.items():
+            abfragen = self.ausgefuehrte_abfragen(aufruf)
+            with self.subTest(funktion=name):
+                self.assertTrue(abfragen, "keine Abfrage ausgeführt")
+                for abfrage in abfragen:
+                    self.assertIsNone(database._full_scan_plan(cursor, abfrage), abfrage)
+
+    def test_check_query_plans(self):
+        self.assertEqual(database.check_query_plans(), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
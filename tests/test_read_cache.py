@@ -0,0 +1,59 @@
+# tests/test_read_cache.py
+"""Lese-Cache (cached_reader): Treffer, Kopien und Invalidierung über die Schreib-Generation."""
+import sqlite3
+import unittest
+
+from synthetische_db import SynthetischeDB, database
+
+
+class ReadCacheTest(SynthetischeDB):
+    anzahl_spiele = 10
+
+    def setUp(self):
+        super().setUp()
+        self.spielnummer, self.team, self.trikotnummer = self.conn.execute(
+            "SELECT spielnummer, mannschaftsname, trikotnummer FROM spieler WHERE name_norm IS NOT NULL LIMIT 1").fetchone()
+
+    def namen(self):
+        return database.get_unique_player_names_by_team(self.team)
+
+    def test_treffer_bis_zum_naechsten_schreibvorgang(self):
+        vorher = self.namen()
+        treffer = database.read_cache.hits
+        self.assertEqual(self.namen(), vorher)
+        self.assertEqual(database.read_cache.hits, treffer + 1)
+
+        generation = database.get_write_generation()
+        database.update_player_name(self.spielnummer, self.trikotnummer, self.team, 'Neuer Cachename')
+
+        self.assertEqual(database.get_write_generation(), generation + 1)
+        self.assertIn('Neuer Cachename', self.namen())
+
+    def test_schreibvorgang_einer_anderen_verbindung_invalidiert(self):
+        vorher = self.namen()
+        # Wie ein anderer Worker-Prozess: eigene Verbindung, eigene Transaktion
+        with sqlite3.connect(database.DB_NAME) as anderer:
+            anderer.execute("UPDATE spieler SET name = 'Anderer Prozess' WHERE spielnummer = ? AND mannschaftsname = ? AND trikotnummer = ?",
+                            (self.spielnummer, self.team, self.trikotnummer))
+            self.assertEqual(self.namen(), vorher) # Generation noch nicht erhöht: weiter aus dem Cache
+            anderer.execute("UPDATE meta SET wert = wert + 1 WHERE schluessel = 'schreib_generation'")
+        anderer.close()
+
+        self.assertIn('Anderer Prozess', self.namen())
+
+    def test_aufrufer_erhalten_kopien(self):
+        self.namen().append('Nur lokal')
+        self.assertNotIn('Nur lokal', self.namen())
+
+    def test_in_transaktion_wird_nicht_gecacht(self):
+        with self.assertRaises(RuntimeError):
+            with database.write_transaction() as cursor:
+                cursor.execute("UPDATE spieler SET name = 'Nicht committet' WHERE spielnummer = ? AND mannschaftsname = ? AND trikotnummer = ?",
+                               (self.spielnummer, self.team, self.trikotnummer))
+                self.assertIn('Nicht committet', self.namen())
+                raise RuntimeError("zurückrollen")
+
+        self.assertNotIn('Nicht committet', self.namen())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+# tests/test_spielliste.py
+"""Keyset-Paginierung der Spielliste: jede Sortierung liefert über alle Seiten jedes Spiel genau einmal."""
+import unittest
+
+from synthetische_db import SynthetischeDB, database
+
+
+class SpiellisteTest(SynthetischeDB):
+    anzahl_spiele = 30
+
+    def setUp(self):
+        super().setUp()
+        with database.write_transaction() as cursor:
+            # Lücken, wie sie unvollständige Spielberichte hinterlassen
+            cursor.execute("UPDATE spiele SET spieldatum = NULL, heimmannschaft = NULL, spielklasse = NULL WHERE rowid % 4 = 0")
+            cursor.execute("UPDATE spiele SET endstand = NULL, tore_heim = NULL, tore_gast = NULL WHERE rowid % 5 = 0")
+
+    def alle_seiten(self, **kwargs):
+        zeilen, nach, seiten = [], None, 0
+        while True:
+            seite, nach = database.get_spiele_seite(nach=nach, limit=7, **kwargs)
+            zeilen.extend(seite)
+            seiten += 1
+            self.assertLess(seiten, 20, "Paginierung endet nicht")
+            if nach is None:
+                return zeilen
+
+    def test_jede_sortierung_liefert_jedes_spiel_genau_einmal(self):
+        alle = sorted(row[0] for row in self.conn.execute("SELECT spielnummer FROM spiele"))
+        for sort_by in database.SPIELLISTE_SORT_COLUMNS:
+            for order in ('ASC', 'DESC'):
+                with self.subTest(sort_by=sort_by, order=order):
+                    zeilen = self.alle_seiten(sort_by=sort_by, order=order)
+                    self.assertEqual(sorted(row[0] for row in zeilen), alle)
+
+    def test_endstand_wird_numerisch_sortiert(self):
+        with database.write_transaction() as cursor:
+            cursor.execute("UPDATE spiele SET tore_heim = MIN(tore_heim, 8) WHERE tore_heim IS NOT NULL")
+            cursor.execute("UPDATE spiele SET endstand = '9:8', tore_heim = 9, tore_gast = 8 WHERE spielnummer = (SELECT MIN(spielnummer) FROM spiele)")
+            cursor.execute("UPDATE spiele SET endstand = '10:9', tore_heim = 10, tore_gast = 9 WHERE spielnummer = (SELECT MAX(spielnummer) FROM spiele)")
+
+        endstaende = [row[4] for row in self.alle_seiten(sort_by='endstand', order='DESC')]
+        self.assertEqual(endstaende[:2], ['10:9', '9:8'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+# tests/test_suche.py
+"""Volltextsuche (suche): Umlaute, Akzente, Präfixe und Aktualität des Index nach Änderungen."""
+import unittest
+
+from synthetische_db import SynthetischeDB, database
+
+
+class SucheTest(SynthetischeDB):
+    anzahl_spiele = 10
+
+    def setUp(self):
+        super().setUp()
+        self.spielnummer, self.team, self.spielklasse = self.conn.execute(
+            "SELECT spielnummer, heimmannschaft, spielklasse FROM spiele ORDER BY spielnummer LIMIT 1").fetchone()
+        trikotnummern = [row[0] for row in self.conn.execute(
+            "SELECT trikotnummer FROM spieler WHERE spielnummer = ? AND mannschaftsname = ? ORDER BY trikotnummer LIMIT 3", (self.spielnummer, self.team))]
+        self.trikotnummer = trikotnummern[0]
+        for trikotnummer, name in zip(trikotnummern, ('Jörg Müßig', 'José Núñez', 'Björn Weiß')):
+            database.update_player_name(self.spielnummer, trikotnummer, self.team, name)
+
+    def spielernamen(self, eingabe):
+        return {eintrag['name'] for eintrag in database.suche(eingabe)['spieler']}
+
+    def test_umlaute_und_akzente(self):
+        for eingabe in ('Müßig', 'müssig', 'muessig', 'MÜS', 'jörg m', 'joerg'):
+            with self.subTest(eingabe=eingabe):
+                self.assertEqual(self.spielernamen(eingabe), {'Jörg Müßig'})
+        for eingabe in ('Núñez', 'nunez', 'jose nu'):
+            with self.subTest(eingabe=eingabe):
+                self.assertEqual(self.spielernamen(eingabe), {'José Núñez'})
+        self.assertEqual(self.spielernamen('weiss bjoern'), {'Björn Weiß'})
+        self.assertEqual(self.spielernamen('mussig nunez'), set())
+
+    def test_spiele_nach_mannschaft_und_spielnummer(self):
+        spiele = {spiel['spielnummer'] for spiel in database.suche(self.team, limit=100)['spiele']}
+        erwartet = {row[0] for row in self.conn.execute(
+            "SELECT spielnummer FROM spiele WHERE heimmannschaft = ? OR gastmannschaft = ?", (self.team, self.team))}
+        self.assertEqual(spiele, erwartet)
+        self.assertEqual([spiel['spielnummer'] for spiel in database.suche(self.spielnummer)['spiele']], [self.spielnummer])
+
+    def test_index_folgt_umbenennen_und_loeschen(self):
+        database.update_player_name(self.spielnummer, self.trikotnummer, self.team, 'Neu Benannt')
+        self.assertEqual(self.spielernamen('müßig'), set())
+        self.assertEqual(self.spielernamen('neu benannt'), {'Neu Benannt'})
+
+        database.delete_spiel(self.spielnummer)
+        self.assertEqual(database.suche(self.spielnummer)['spiele'], [])
+        self.assertEqual(self.spielernamen('nunez'), set())
+
+    def test_sonderzeichen_in_der_eingabe(self):
+        self.assertEqual(database.suche('"*()'), {"spieler": [], "spiele": []})
+        self.assertEqual(self.spielernamen('"Núñez"'), {'José Núñez'})
+
+
+if __name__ == '__main__':
+    unittest.main()